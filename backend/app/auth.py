@@ -1,40 +1,301 @@
 """Authentication module for decoding Supabase JWT tokens using JWKS."""
+import asyncio
+import hashlib
+import logging
+import time
 import jwt
-from jwt import PyJWKClient
-from typing import Optional
-from fastapi import HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import Depends, Header, HTTPException, status
+from app.cache import TTLCache
 from app.config import settings
+from app.jwks import JWKSKeyStore
 
-# Cache for JWKS client (fetches keys from Supabase)
-_jwks_client: Optional[PyJWKClient] = None
+logger = logging.getLogger(__name__)
 
+# Supabase signing keys, prefetched at startup and refreshed in the background
+# (see app.main lifespan). Verification never fetches keys on the request path.
+jwks_store = JWKSKeyStore(
+    url=settings.SUPABASE_JWKS_URL,
+    refresh_interval=settings.JWKS_REFRESH_INTERVAL_SECONDS,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL_SECONDS,
+    timeout=settings.JWKS_FETCH_TIMEOUT_SECONDS,
+)
 
-def get_jwks_client() -> PyJWKClient:
+
+def get_signing_key(token: str) -> jwt.PyJWK:
     """
-    Get or create a JWKS client for Supabase token verification.
-    Uses the JWKS endpoint to fetch public keys for token verification.
+    Find the public key for a token's `kid` in the prefetched JWKS.
+    
+    Raises:
+        HTTPException: 500 if SUPABASE_URL is not configured, 401 if the key is
+                       unknown (a background refresh picks up rotated keys)
     """
-    global _jwks_client
-    if _jwks_client is None:
-        if not settings.SUPABASE_URL:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="SUPABASE_URL not configured"
-            )
-        # Supabase JWKS endpoint
-        # Note: JWKS endpoint is at /auth/v1/.well-known/jwks.json
-        jwks_url = f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
-        _jwks_client = PyJWKClient(jwks_url)
-    return _jwks_client
+    if not jwks_store.url:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="SUPABASE_URL not configured"
+        )
+    kid = jwt.get_unverified_header(token).get("kid")
+    signing_key = jwks_store.get_signing_key(kid)
+    if signing_key is None:
+        # A token from another Supabase project lands here (its kid isn't in our JWKS)
+        issuer_mismatches.record_unverified(token)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unknown token signing key"
+        )
+    return signing_key
+
+
+# Issuer of tokens minted by this Supabase project
+EXPECTED_ISSUER = f"{settings.SUPABASE_URL}/auth/v1"
+
+
+class IssuerMismatchLog:
+    """
+    Counts tokens whose issuer doesn't match SUPABASE_URL and logs them at most
+    once per interval, so a misconfigured client can't flood the logs.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.count = 0
+        self.last_issuer: Optional[str] = None
+        self._suppressed = 0
+        self._last_logged: Optional[float] = None
+
+    def record(self, actual_issuer: Optional[str]) -> None:
+        self.count += 1
+        self.last_issuer = actual_issuer
+        now = time.monotonic()
+        if self._last_logged is not None and now - self._last_logged < self.interval:
+            self._suppressed += 1
+            return
+        logger.warning(
+            "JWT issuer mismatch: expected=%s actual=%s suppressed=%d "
+            "(make sure EXPO_PUBLIC_SUPABASE_URL matches SUPABASE_URL exactly)",
+            EXPECTED_ISSUER, actual_issuer, self._suppressed,
+            extra={
+                "expected_issuer": EXPECTED_ISSUER,
+                "actual_issuer": actual_issuer,
+                "suppressed": self._suppressed,
+            },
+        )
+        self._suppressed = 0
+        self._last_logged = now
+
+    def record_unverified(self, token: str) -> None:
+        """
+        Record a mismatch for a token that failed before the issuer check
+        (unknown key, bad signature, expired), reading `iss` without verifying.
+        """
+        try:
+            actual_issuer = jwt.decode(token, options={"verify_signature": False}).get("iss")
+        except jwt.InvalidTokenError:
+            return
+        if actual_issuer and actual_issuer != EXPECTED_ISSUER:
+            self.record(actual_issuer)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        return {"count": self.count, "last_issuer": self.last_issuer}
+
+
+issuer_mismatches = IssuerMismatchLog(interval=settings.AUTH_ISSUER_MISMATCH_LOG_INTERVAL_SECONDS)
+
+
+# Verified claims keyed by the token's SHA-256 digest (never the raw token).
+# Entries expire at the token's exp, so an expired token is re-verified and rejected.
+claims_cache = TTLCache(
+    maxsize=settings.AUTH_CLAIMS_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_CLAIMS_CACHE_TTL_SECONDS,
+)
+
+
+# Called after every token decode with (seconds, cache_hit, ok)
+VerificationHook = Callable[[float, bool, bool], None]
+_verification_hooks: List[VerificationHook] = []
 
 
-def decode_jwt_token(token: str) -> dict:
+def add_verification_hook(hook: VerificationHook) -> None:
+    """Register a callback that times token verification (e.g. for metrics/tracing)."""
+    _verification_hooks.append(hook)
+
+
+class VerificationTimer:
+    """Aggregates token verification timings for /metrics."""
+
+    def __init__(self):
+        self.verified = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def __call__(self, seconds: float, cache_hit: bool, ok: bool) -> None:
+        if cache_hit:
+            self.cache_hits += 1
+            return
+        if not ok:
+            self.failures += 1
+        self.verified += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring (durations of full verifications, in ms)."""
+        return {
+            "verified": self.verified,
+            "cache_hits": self.cache_hits,
+            "failures": self.failures,
+            "avg_ms": round(self.total_seconds / self.verified * 1000, 3) if self.verified else None,
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+
+
+verification_timer = VerificationTimer()
+add_verification_hook(verification_timer)
+
+
+def _report_verification(started: float, cache_hit: bool, ok: bool) -> None:
+    elapsed = time.perf_counter() - started
+    for hook in _verification_hooks:
+        hook(elapsed, cache_hit, ok)
+
+
+def _cache_claims(digest: str, claims: Dict[str, Any]) -> None:
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            claims_cache.set(digest, claims, ttl=remaining)
+
+
+def decode_jwt_token(token: str) -> Dict[str, Any]:
+    """
+    Decode a Supabase JWT token, verifying it once per token.
+    
+    Claims of a verified token are cached until its exp, so repeated calls
+    (and repeated requests with the same token) skip signature verification.
+    The returned dict is shared - treat it as read-only.
+    
+    Verification runs on the calling thread; request handlers should use
+    decode_jwt_token_async (via get_token_claims) instead.
+    
+    Args:
+        token: The JWT token string (with or without 'Bearer ' prefix)
+        
+    Returns:
+        Decoded token payload
+        
+    Raises:
+        HTTPException: If token is invalid or expired
+    """
+    # Remove 'Bearer ' prefix if present
+    if token.startswith("Bearer "):
+        token = token[7:]
+    
+    started = time.perf_counter()
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    found, claims = claims_cache.get(digest)
+    if found:
+        _report_verification(started, cache_hit=True, ok=True)
+        return claims
+    
+    try:
+        claims = verify_jwt_token(token)
+    except HTTPException:
+        _report_verification(started, cache_hit=False, ok=False)
+        raise
+    _report_verification(started, cache_hit=False, ok=True)
+    _cache_claims(digest, claims)
+    return claims
+
+
+# Dedicated pool for signature verification (AUTH_VERIFY_IN_THREADPOOL), created lazily
+_verify_executor: Optional[ThreadPoolExecutor] = None
+# Verifications in flight, keyed by token digest - concurrent requests carrying
+# the same token (e.g. an app firing several calls right after login) share one
+_inflight_verifications: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+
+def get_verify_executor() -> ThreadPoolExecutor:
+    """Thread pool that bounds how many verifications run at once."""
+    global _verify_executor
+    if _verify_executor is None:
+        _verify_executor = ThreadPoolExecutor(
+            max_workers=settings.AUTH_VERIFY_MAX_WORKERS,
+            thread_name_prefix="jwt-verify",
+        )
+    return _verify_executor
+
+
+def shutdown_verify_executor() -> None:
+    """Stop the verification pool (call from app lifespan shutdown)."""
+    global _verify_executor
+    if _verify_executor is not None:
+        _verify_executor.shutdown(wait=False, cancel_futures=True)
+        _verify_executor = None
+
+
+async def decode_jwt_token_async(token: str) -> Dict[str, Any]:
+    """
+    Async version of decode_jwt_token for request handlers.
+    
+    With AUTH_VERIFY_IN_THREADPOOL, cache misses are verified on a dedicated
+    thread pool (AUTH_VERIFY_MAX_WORKERS threads) so the RSA/EC math doesn't
+    block the event loop; extra verifications queue for a free thread and
+    identical tokens already being verified are awaited, not verified again.
+    Cache hits never leave the event loop.
+    
+    Raises:
+        HTTPException: If token is invalid or expired
+    """
+    if not settings.AUTH_VERIFY_IN_THREADPOOL:
+        return decode_jwt_token(token)
+    
+    # Remove 'Bearer ' prefix if present
+    if token.startswith("Bearer "):
+        token = token[7:]
+    
+    started = time.perf_counter()
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    found, claims = claims_cache.get(digest)
+    if found:
+        _report_verification(started, cache_hit=True, ok=True)
+        return claims
+    
+    pending = _inflight_verifications.get(digest)
+    if pending is not None:
+        # Reported as a cache hit: no verification work was done for this call
+        claims = await asyncio.shield(pending)
+        _report_verification(started, cache_hit=True, ok=True)
+        return claims
+    
+    future = asyncio.get_running_loop().run_in_executor(get_verify_executor(), verify_jwt_token, token)
+    _inflight_verifications[digest] = future
+    try:
+        claims = await asyncio.shield(future)
+    except HTTPException:
+        _report_verification(started, cache_hit=False, ok=False)
+        raise
+    finally:
+        _inflight_verifications.pop(digest, None)
+    _report_verification(started, cache_hit=False, ok=True)
+    _cache_claims(digest, claims)
+    return claims
+
+
+def verify_jwt_token(token: str) -> Dict[str, Any]:
     """
     Decode and verify a Supabase JWT token using JWKS (JSON Web Key Set).
     
     Supabase now uses RS256 (RSA) signing with JWKS instead of the legacy
-    HS256 secret. This method fetches the public keys from Supabase's JWKS
-    endpoint and verifies the token signature.
+    HS256 secret. This method verifies the token signature with the public
+    keys prefetched from Supabase's JWKS endpoint (see jwks_store).
     
     Args:
         token: The JWT token string (with or without 'Bearer ' prefix)
@@ -50,56 +311,57 @@ def decode_jwt_token(token: str) -> dict:
         if token.startswith("Bearer "):
             token = token[7:]
         
-        # Decode without verification first to check issuer (for debugging)
-        unverified = jwt.decode(token, options={"verify_signature": False})
-        expected_issuer = f"{settings.SUPABASE_URL}/auth/v1"
-        actual_issuer = unverified.get("iss", "not found")
-        
-        if actual_issuer != expected_issuer:
-            print(f"⚠️ Issuer mismatch detected!")
-            print(f"   Expected: {expected_issuer}")
-            print(f"   Actual:   {actual_issuer}")
-            print(f"   Backend SUPABASE_URL: {settings.SUPABASE_URL}")
-            print(f"   Make sure EXPO_PUBLIC_SUPABASE_URL matches exactly!")
-        
-        # Get JWKS client and signing key
-        jwks_client = get_jwks_client()
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        # Get signing key from the prefetched JWKS
+        signing_key = get_signing_key(token)
         
         # Decode and verify token using the public key from JWKS
         # Supabase can use RS256 (RSA) or ES256 (Elliptic Curve) algorithms
         # The algorithm is determined by the signing key in JWKS
+        # The issuer is compared below (same parse) so mismatches can be diagnosed
         decoded = jwt.decode(
             token,
             signing_key.key,
             algorithms=["RS256", "ES256"],  # Support both RSA and EC algorithms
             audience="authenticated",  # Supabase user tokens have this audience
-            issuer=f"{settings.SUPABASE_URL}/auth/v1",  # Verify issuer matches Supabase
             options={
                 "verify_signature": True,
                 "verify_exp": True,
                 "verify_aud": True,
-                "verify_iss": True,
+                "verify_iss": False,
                 "verify_iat": True,
             },
             leeway=60  # Allow 60 seconds of clock skew for iat and exp
         )
+        
+        # Verify issuer matches Supabase
+        actual_issuer = decoded.get("iss")
+        if actual_issuer != EXPECTED_ISSUER:
+            issuer_mismatches.record(actual_issuer)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token: Invalid issuer"
+            )
         return decoded
     except jwt.ExpiredSignatureError:
+        issuer_mismatches.record_unverified(token)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired"
         )
     except jwt.InvalidSignatureError:
+        issuer_mismatches.record_unverified(token)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token signature"
         )
     except jwt.InvalidTokenError as e:
+        issuer_mismatches.record_unverified(token)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid token: {str(e)}"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -107,54 +369,80 @@ def decode_jwt_token(token: str) -> dict:
         )
 
 
-def get_user_id_from_token(token: str) -> str:
+async def get_token_claims(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
     """
-    Extract user ID from JWT token.
+    FastAPI dependency: verified claims of the request's bearer token.
     
-    Args:
-        token: The JWT token string
-        
-    Returns:
-        User ID (sub claim from token)
+    FastAPI resolves a dependency once per request, so every dependency of a
+    route that uses it shares a single decode.
     """
-    decoded = decode_jwt_token(token)
-    return decoded.get("sub", "")
+    if not authorization:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing authorization"
+        )
+    return await decode_jwt_token_async(authorization)
+
 
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user of a request, built from verified token claims."""
+    id: str
+    email: Optional[str]
+    name: Optional[str]
+    expires_at: Optional[datetime]
+    
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> "Principal":
+        exp = claims.get("exp")
+        return cls(
+            id=claims.get("sub", ""),
+            email=user_email_from_claims(claims),
+            name=user_name_from_claims(claims),
+            expires_at=datetime.fromtimestamp(exp, tz=timezone.utc) if isinstance(exp, (int, float)) else None,
+        )
 
-def get_user_email_from_token(token: str) -> Optional[str]:
+
+async def get_current_principal(claims: Dict[str, Any] = Depends(get_token_claims)) -> Principal:
     """
-    Extract user email from JWT token.
+    FastAPI dependency: the authenticated user of the request.
     
-    Args:
-        token: The JWT token string
-        
-    Returns:
-        User email address, or None if not found
+    Verified once per request and shared by every dependency that needs it.
+    
+    Raises:
+        HTTPException: 401 if the token is missing, invalid or has no subject
     """
-    decoded = decode_jwt_token(token)
-    return decoded.get("email")
+    principal = Principal.from_claims(claims)
+    if not principal.id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token: missing subject"
+        )
+    return principal
+
+
+async def get_current_user_id(principal: Principal = Depends(get_current_principal)) -> str:
+    """FastAPI dependency: ID of the authenticated user."""
+    return principal.id
+
 
+def user_email_from_claims(claims: Dict[str, Any]) -> Optional[str]:
+    """User email address from verified claims, or None if not found."""
+    return claims.get("email")
 
-def get_user_name_from_token(token: str) -> Optional[str]:
+
+def user_name_from_claims(claims: Dict[str, Any]) -> Optional[str]:
     """
-    Extract user name from JWT token.
+    User name from verified claims.
     Falls back to email username if name is not available.
-    
-    Args:
-        token: The JWT token string
-        
-    Returns:
-        User name, email username, or None
     """
-    decoded = decode_jwt_token(token)
     # Try to get name from various possible claims
-    name = decoded.get("name") or decoded.get("full_name") or decoded.get("user_metadata", {}).get("name")
+    name = claims.get("name") or claims.get("full_name") or claims.get("user_metadata", {}).get("name")
     
     # If no name, try to extract username from email
     if not name:
-        email = decoded.get("email", "")
+        email = claims.get("email", "")
         if email:
             name = email.split("@")[0]
     
     return name
-
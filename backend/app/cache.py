@@ -0,0 +1,109 @@
+"""In-process response caching for read-mostly endpoints."""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a fixed TTL.
+
+    Not thread-safe: meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a key.
+
+        Returns:
+            (found, value) - value is None when not found or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            ttl: Seconds until this entry expires, capped at the cache TTL
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)."""
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class VersionedCache(TTLCache):
+    """
+    TTLCache tied to an external data version (e.g. the card catalog version).
+
+    The version is re-read at most every `check_interval` seconds; when it
+    changes the whole cache is dropped. Between checks, hits never touch the
+    version source.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, check_interval: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__(maxsize, ttl, clock)
+        self.check_interval = check_interval
+        self.version: Optional[int] = None
+        self._checked_at: Optional[float] = None
+
+    def needs_version_check(self) -> bool:
+        """True when the cached version is older than check_interval."""
+        return self._checked_at is None or self._clock() - self._checked_at >= self.check_interval
+
+    def observe_version(self, version: int) -> None:
+        """Record the current data version, clearing the cache if it moved."""
+        if self.version is not None and version != self.version:
+            self.clear()
+        self.version = version
+        self._checked_at = self._clock()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["version"] = self.version
+        return stats
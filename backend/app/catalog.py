@@ -0,0 +1,69 @@
+"""Card catalog versioning and derived data maintained by the card sync."""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Cards per set that qualify for the default "relevance" ordering
+SET_RANK_LIMIT = 10
+
+# Recompute pokemon_cards.set_rank: position by price within the card's set,
+# stored only for the top SET_RANK_LIMIT priced cards (NULL otherwise).
+# Rows whose rank didn't change are left untouched to keep WAL small.
+REFRESH_SET_RANKS_SQL = f"""
+UPDATE pokemon_cards AS c
+SET set_rank = ranked.set_rank
+FROM (
+    SELECT p.id, r.set_rank
+    FROM pokemon_cards AS p
+    LEFT JOIN (
+        SELECT id, row_number() OVER (
+            PARTITION BY set_name
+            ORDER BY market_price DESC, id
+        ) AS set_rank
+        FROM pokemon_cards
+        WHERE set_name IS NOT NULL
+          AND market_price IS NOT NULL
+          AND market_price > 0
+    ) AS r ON r.id = p.id AND r.set_rank <= {SET_RANK_LIMIT}
+) AS ranked
+WHERE c.id = ranked.id
+  AND c.set_rank IS DISTINCT FROM ranked.set_rank
+"""
+
+BUMP_CATALOG_VERSION_SQL = """
+INSERT INTO catalog_state (id, version, updated_at)
+VALUES (1, 1, now() AT TIME ZONE 'utc')
+ON CONFLICT (id) DO UPDATE
+SET version = catalog_state.version + 1, updated_at = EXCLUDED.updated_at
+"""
+
+
+async def bump_catalog_version(session: AsyncSession) -> None:
+    """
+    Mark the card catalog as changed so API processes drop cached card responses.
+
+    Does not commit: call it inside the transaction that writes the card
+    changes so the version moves exactly when they become visible.
+    """
+    await session.execute(text(BUMP_CATALOG_VERSION_SQL))
+
+
+async def get_catalog_version(session: AsyncSession) -> int:
+    """Current catalog version (0 before the first sync)."""
+    result = await session.execute(text("SELECT version FROM catalog_state WHERE id = 1"))
+    return result.scalar() or 0
+
+
+async def refresh_set_ranks(session: AsyncSession) -> int:
+    """
+    Recompute the per-set price ranking used by /cards/search relevance sort.
+
+    Call after a sync has committed its price changes. Commits on success.
+
+    Returns:
+        Number of cards whose rank changed
+    """
+    result = await session.execute(text(REFRESH_SET_RANKS_SQL))
+    if result.rowcount:
+        await bump_catalog_version(session)
+    await session.commit()
+    return result.rowcount
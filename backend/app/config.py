@@ -12,13 +12,61 @@ class Settings:
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_PUBLISHABLE_KEY: str = os.getenv("SUPABASE_PUBLISHABLE_KEY", "")
     SUPABASE_SECRET_KEY: str = os.getenv("SUPABASE_SECRET_KEY", "")
+    # Public keys for JWT verification (defaults to the project's auth JWKS endpoint)
+    SUPABASE_JWKS_URL: str = os.getenv(
+        "SUPABASE_JWKS_URL",
+        f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else "",
+    )
+    # Scheduled JWKS refresh, and the minimum gap between refreshes triggered by unknown key ids
+    JWKS_REFRESH_INTERVAL_SECONDS: float = float(os.getenv("JWKS_REFRESH_INTERVAL_SECONDS", "600"))
+    JWKS_MIN_REFRESH_INTERVAL_SECONDS: float = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL_SECONDS", "30"))
+    JWKS_FETCH_TIMEOUT_SECONDS: float = float(os.getenv("JWKS_FETCH_TIMEOUT_SECONDS", "5"))
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    # How DATABASE_URL is reached:
+    #   transaction - Supabase transaction pooler (port 6543): no app-side pool
+    #   session     - Supabase session pooler (port 5432): bounded app-side pool
+    #   direct      - direct Postgres connection: bounded app-side pool
+    DATABASE_POOL_MODE: str = os.getenv("DATABASE_POOL_MODE", "transaction").lower()
+    # App-side pool limits (session/direct modes only)
+    DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+    DATABASE_MAX_OVERFLOW: int = int(os.getenv("DATABASE_MAX_OVERFLOW", "5"))
+    DATABASE_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DATABASE_POOL_TIMEOUT_SECONDS", "30"))
+    DATABASE_POOL_RECYCLE_SECONDS: int = int(os.getenv("DATABASE_POOL_RECYCLE_SECONDS", "1800"))
+    # Reuse prepared statements per connection (session/direct modes only -
+    # transaction-mode poolers hand each statement a different connection)
+    DATABASE_STATEMENT_CACHE: bool = os.getenv("DATABASE_STATEMENT_CACHE", "False").lower() == "true"
+    DATABASE_STATEMENT_CACHE_SIZE: int = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "100"))
     
     # Pokemon TCG API Configuration
     POKEMON_TCG_API_URL: str = os.getenv("POKEMON_TCG_API_URL", "")
     POKEMON_TCG_API_KEY: str = os.getenv("POKEMON_TCG_API_KEY", "")
+    # Card sync: parallel page fetches and initial request rate (adapts to 429/504s)
+    POKEMON_TCG_SYNC_CONCURRENCY: int = int(os.getenv("POKEMON_TCG_SYNC_CONCURRENCY", "4"))
+    POKEMON_TCG_REQUESTS_PER_SECOND: float = float(os.getenv("POKEMON_TCG_REQUESTS_PER_SECOND", "2"))
+    # Stop resuming an unfinished sync run once a page failed this many attempts or the run is this old
+    POKEMON_TCG_SYNC_MAX_PAGE_ATTEMPTS: int = int(os.getenv("POKEMON_TCG_SYNC_MAX_PAGE_ATTEMPTS", "18"))
+    POKEMON_TCG_SYNC_MAX_RUN_AGE_HOURS: float = float(os.getenv("POKEMON_TCG_SYNC_MAX_RUN_AGE_HOURS", "24"))
+    
+    # Card response cache (popular cards, card details, empty-query search)
+    CARD_CACHE_TTL_SECONDS: float = float(os.getenv("CARD_CACHE_TTL_SECONDS", "300"))
+    CARD_CACHE_MAX_ENTRIES: int = int(os.getenv("CARD_CACHE_MAX_ENTRIES", "1024"))
+    # How often the API re-reads the catalog version bumped by the card sync
+    CATALOG_VERSION_CHECK_SECONDS: float = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "5"))
+    
+    # Verified JWT claims cache (entries also expire at the token's exp)
+    AUTH_CLAIMS_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CLAIMS_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_CLAIMS_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_CLAIMS_CACHE_TTL_SECONDS", "3600"))
+    # Verify JWT signatures on a dedicated thread pool instead of the event loop
+    AUTH_VERIFY_IN_THREADPOOL: bool = os.getenv("AUTH_VERIFY_IN_THREADPOOL", "False").lower() == "true"
+    AUTH_VERIFY_MAX_WORKERS: int = int(os.getenv("AUTH_VERIFY_MAX_WORKERS", "4"))
+    # Minimum gap between log lines about tokens from the wrong Supabase issuer
+    AUTH_ISSUER_MISMATCH_LOG_INTERVAL_SECONDS: float = float(os.getenv("AUTH_ISSUER_MISMATCH_LOG_INTERVAL_SECONDS", "60"))
+    
+    # Idempotency-Key responses: how long retries are replayed, and how often expired keys are deleted
+    IDEMPOTENCY_KEY_TTL_SECONDS: float = float(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
     
     # App Configuration
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
@@ -28,6 +76,18 @@ class Settings:
     RESEND_API_KEY: str = os.getenv("RESEND_API_KEY", "")
     RESEND_TEMPLATE_ID: str = os.getenv("RESEND_TEMPLATE_ID", "")
     RESEND_FROM_EMAIL: str = os.getenv("RESEND_FROM_EMAIL", "")
+    # Resend HTTP API (point at a local fake server for testing)
+    RESEND_API_URL: str = os.getenv("RESEND_API_URL", "https://api.resend.com")
+    # Email outbox worker: rows claimed per batch, parallel sends, idle poll interval,
+    # attempts before an email is marked failed, and how long shutdown waits for in-flight sends
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+    EMAIL_OUTBOX_CONCURRENCY: int = int(os.getenv("EMAIL_OUTBOX_CONCURRENCY", "4"))
+    EMAIL_OUTBOX_POLL_INTERVAL_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL_SECONDS", "5"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+    EMAIL_OUTBOX_DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_DRAIN_TIMEOUT_SECONDS", "10"))
+    # How long sent/failed outbox rows are kept, and how often older ones are deleted
+    EMAIL_OUTBOX_RETENTION_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_RETENTION_SECONDS", "604800"))
+    EMAIL_OUTBOX_PURGE_INTERVAL_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_PURGE_INTERVAL_SECONDS", "3600"))
 
 
 settings = Settings()
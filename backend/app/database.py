@@ -1,28 +1,99 @@
 from sqlmodel import SQLModel
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from sqlalchemy import text
+from sqlalchemy.engine import make_url
 from supabase import create_client, Client
 from app.config import settings
 
 # 1. Create the Connection Engine (Async)
-# ⚠️ CRITICAL: Use NullPool for Supabase Transaction Mode (Port 6543)
-# Let Supavisor (Supabase's pooler) manage connections, not the app
-# This prevents connection exhaustion and memory issues
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True,
-    poolclass=NullPool,  # Let external pooler manage connections
-    connect_args={
+POOL_MODES = ("transaction", "session", "direct")
+# Supavisor transaction mode - never safe for prepared statements
+SUPABASE_TRANSACTION_POOLER_PORT = 6543
+
+
+def build_engine(
+    database_url: str = None,
+    pool_mode: str = None,
+    echo: bool = None,
+    statement_cache: bool = None,
+) -> AsyncEngine:
+    """
+    Create the async engine for a DATABASE_POOL_MODE.
+    
+    - transaction: ⚠️ NullPool for Supabase Transaction Mode (Port 6543).
+      Let Supavisor (Supabase's pooler) manage connections, not the app.
+      Every session opens a fresh connection to the pooler.
+    - session / direct: the app keeps a bounded pool of open connections
+      (DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW), so requests skip the
+      TCP+TLS+auth handshake. Connections are pinged on checkout and
+      recycled periodically so pooler/server restarts don't surface as errors.
+    
+    With DATABASE_STATEMENT_CACHE (session/direct only), asyncpg keeps hot
+    queries prepared on each connection instead of re-parsing and re-planning
+    them on every call.
+    
+    Raises:
+        ValueError: Unknown pool mode, or the statement cache is enabled for a
+                    transaction-mode connection
+    """
+    database_url = database_url or settings.DATABASE_URL
+    pool_mode = pool_mode or settings.DATABASE_POOL_MODE
+    echo = settings.DEBUG if echo is None else echo
+    statement_cache = settings.DATABASE_STATEMENT_CACHE if statement_cache is None else statement_cache
+    
+    if pool_mode not in POOL_MODES:
+        raise ValueError(f"DATABASE_POOL_MODE must be one of {', '.join(POOL_MODES)} (got '{pool_mode}')")
+    
+    if statement_cache:
+        if pool_mode == "transaction":
+            raise ValueError(
+                "DATABASE_STATEMENT_CACHE requires DATABASE_POOL_MODE=session or direct: "
+                "prepared statements break when a transaction-mode pooler swaps connections"
+            )
+        if make_url(database_url).port == SUPABASE_TRANSACTION_POOLER_PORT:
+            raise ValueError(
+                f"DATABASE_STATEMENT_CACHE is enabled but DATABASE_URL uses port "
+                f"{SUPABASE_TRANSACTION_POOLER_PORT} (Supabase transaction mode); "
+                f"use the session-mode or direct connection string"
+            )
+        cache_size = settings.DATABASE_STATEMENT_CACHE_SIZE
+    else:
         # CRITICAL: Disables statement caching, fixing Transaction Mode conflict
         # Prepared statements don't work with Transaction Mode connection swapping
-        "statement_cache_size": 0,
-        # Ensures asyncpg also respects the cache being disabled
-        "prepared_statement_cache_size": 0,
-    },
-)
+        cache_size = 0
+    
+    connect_args = {
+        "statement_cache_size": cache_size,
+        # Ensures asyncpg also respects the cache being disabled (or sized)
+        "prepared_statement_cache_size": cache_size,
+    }
+    
+    if pool_mode == "transaction":
+        return create_async_engine(
+            database_url,
+            echo=echo,
+            future=True,
+            poolclass=NullPool,  # Let external pooler manage connections
+            connect_args=connect_args,
+        )
+    
+    return create_async_engine(
+        database_url,
+        echo=echo,
+        future=True,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+
+
+engine = build_engine()
 
 # 2. Dependency: Get a Database Session
 # You will use this in every API route: `async def route(session: AsyncSession = Depends(get_session))`
@@ -38,8 +109,12 @@ async def get_session() -> AsyncSession:
 # We run this when the app starts up
 async def init_db():
     """Initialize database tables (create tables if they don't exist)."""
+    from app.migrations import run_migrations
+    
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        # Bring existing tables up to date (columns, indexes, backfills)
+        await run_migrations(conn)
     
     # Check if database is empty and sync if needed (non-blocking)
     async with async_session() as session:
@@ -1,15 +1,16 @@
-"""Email service module for sending emails via Resend."""
+"""Email service module: Resend emails queued in the email outbox (sent by app.email_outbox)."""
 import logging
-from typing import List, Dict, Any, Optional
-import resend
+from decimal import Decimal
+from typing import List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
+from app.models import EmailOutbox
 
 logger = logging.getLogger(__name__)
 
-# Initialize Resend API key
-if settings.RESEND_API_KEY:
-    resend.api_key = settings.RESEND_API_KEY
-else:
+VAULT_CONFIRMATION = "vault_confirmation"
+
+if not settings.RESEND_API_KEY:
     logger.warning("RESEND_API_KEY not configured. Email functionality will be disabled.")
 
 
@@ -30,7 +31,7 @@ def format_collectibles_list(items_details: List[Dict[str, Any]]) -> str:
     
     for item in items_details:
         name = item.get("name", "Unknown Item")
-        value = item.get("value", 0.0)
+        value = Decimal(str(item.get("value") or 0))  # Money string, e.g. "10.10"
         
         # Format condition if available in item_data
         condition_str = ""
@@ -50,23 +51,30 @@ def format_collectibles_list(items_details: List[Dict[str, Any]]) -> str:
     return "".join(html_parts)
 
 
-def send_vault_confirmation_email(
+def queue_vault_confirmation_email(
+    session: AsyncSession,
+    user_id: str,
     to_email: str,
     user_name: str,
     items_details: List[Dict[str, Any]],
     vault_id: str
 ) -> bool:
     """
-    Send vault confirmation email using Resend template.
+    Queue a vault confirmation email (Resend template) in the email outbox.
+    
+    The row is added to the caller's session, so the email is only sent if
+    the caller's transaction commits. Does not commit.
     
     Args:
+        session: Session of the write being confirmed
+        user_id: Supabase user ID
         to_email: Recipient email address
         user_name: User's name (or email username if name not available)
         items_details: List of card/item details with name, value, etc.
         vault_id: Vault ID (transaction ID or submission identifier)
         
     Returns:
-        True if email was sent successfully, False otherwise
+        True if the email was queued, False if email is not configured
     """
     if not settings.RESEND_API_KEY:
         logger.error("Resend API key not configured. Cannot send email.")
@@ -80,29 +88,21 @@ def send_vault_confirmation_email(
         logger.error("RESEND_FROM_EMAIL not configured. Cannot send email.")
         return False
     
-    try:
-        # Format collectibles list
-        collectibles_list = format_collectibles_list(items_details)
-        
-        # Send email using Resend template
-        params = {
-            "from": settings.RESEND_FROM_EMAIL,
-            "to": [to_email],
-            "template": {
-                "id": settings.RESEND_TEMPLATE_ID,
-                "variables": {
-                    "User_Name": user_name,
-                    "Collectibles_List": collectibles_list,
-                    "Vault_ID": vault_id,
-                }
+    # Format collectibles list
+    collectibles_list = format_collectibles_list(items_details)
+    
+    # Resend template request, sent as-is by the outbox worker
+    params = {
+        "from": settings.RESEND_FROM_EMAIL,
+        "to": [to_email],
+        "template": {
+            "id": settings.RESEND_TEMPLATE_ID,
+            "variables": {
+                "User_Name": user_name,
+                "Collectibles_List": collectibles_list,
+                "Vault_ID": vault_id,
             }
         }
-        
-        response = resend.Emails.send(params)
-        
-        logger.info(f"Vault confirmation email sent successfully to {to_email}. Email ID: {response.get('id', 'unknown')}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Failed to send vault confirmation email to {to_email}: {str(e)}", exc_info=True)
-        return False
+    }
+    session.add(EmailOutbox(user_id=user_id, kind=VAULT_CONFIRMATION, params=params))
+    return True
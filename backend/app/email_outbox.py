@@ -0,0 +1,278 @@
+"""
+Background sender for the email outbox.
+
+Endpoints queue emails as `email_outbox` rows in the same transaction as
+the write they confirm (see app.email), so an email exists exactly when its
+write committed and survives restarts. `EmailOutboxWorker` runs in the app
+lifespan and drains the table:
+
+- Due rows are claimed in batches with FOR UPDATE SKIP LOCKED, so several
+  app instances can run workers without sending the same email twice. A
+  claim moves `next_attempt_at` forward by a lease; rows held by a worker
+  that died become due again when the lease runs out.
+- Claimed emails are sent concurrently (bounded by a semaphore) with async
+  HTTP calls to the Resend API - no threads are used. Each row is sent with
+  an `Idempotency-Key`, so Resend drops a resend of an email it accepted.
+- Failures are retried with exponential backoff until
+  EMAIL_OUTBOX_MAX_ATTEMPTS; emails Resend rejects (4xx) fail immediately.
+- On shutdown the worker stops claiming and waits up to
+  EMAIL_OUTBOX_DRAIN_TIMEOUT_SECONDS for in-flight sends. Unsent rows stay
+  in the table for the next start.
+
+Sent and failed rows are kept for EMAIL_OUTBOX_RETENTION_SECONDS (for
+support lookups) and then deleted by `purge_finished_emails_periodically`.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import aiohttp
+from sqlalchemy import delete, literal_column, select, update
+from app.config import settings
+from app.database import async_session
+from app.models import EmailOutbox, EmailOutboxStatus
+
+logger = logging.getLogger(__name__)
+
+SEND_TIMEOUT_SECONDS = 15
+# Longer than a whole batch of sends, so a live worker never loses its claim
+CLAIM_LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+# Client errors that are worth retrying (timeout, idempotent request in progress, rate limit)
+RETRYABLE_CLIENT_STATUSES = {408, 409, 429}
+# Inlined as a SQL literal rather than a bound parameter, so the planner can
+# match the `status = 'pending'` / `status <> 'pending'` partial indexes
+PENDING_SQL = literal_column(f"'{EmailOutboxStatus.PENDING.value}'")
+
+
+class PermanentSendError(Exception):
+    """Resend rejected the email; retrying won't help."""
+
+
+def retry_delay(attempts: int, base: float = RETRY_BASE_SECONDS) -> float:
+    """Backoff before the next attempt: exponential with jitter, capped."""
+    delay = min(base * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class EmailOutboxWorker:
+    """Claims due outbox rows and sends them through the Resend API."""
+
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str,
+        batch_size: int = 20,
+        concurrency: int = 4,
+        poll_interval: float = 5,
+        max_attempts: int = 8,
+        retry_base: float = RETRY_BASE_SECONDS,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the background worker (no-op without a Resend API key)."""
+        if not self.api_key:
+            logger.warning("RESEND_API_KEY not configured. Email outbox worker not started.")
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self) -> None:
+        """Wake the worker now (call after committing a queued email) instead of at the next poll."""
+        self._wake.set()
+
+    async def stop(self, drain_timeout: float = 10) -> None:
+        """Stop claiming new emails and wait up to `drain_timeout` for in-flight sends."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Email outbox drain timed out; unsent emails are retried after the next start")
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        timeout = aiohttp.ClientTimeout(total=SEND_TIMEOUT_SECONDS)
+        async with aiohttp.ClientSession(timeout=timeout) as http:
+            while not self._stopping:
+                self._wake.clear()
+                try:
+                    claimed = await self.process_batch(http)
+                except Exception as e:
+                    logger.error(f"Email outbox batch failed: {e}")
+                    claimed = 0
+                if claimed < self.batch_size:
+                    # Queue is drained: sleep until notified or the next poll
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+
+    async def process_batch(self, http: aiohttp.ClientSession) -> int:
+        """
+        Claim up to `batch_size` due emails, send them and record the results.
+
+        Returns:
+            Number of emails claimed
+        """
+        rows = await self._claim()
+        if not rows:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(row: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._send(http, row)
+
+        results = await asyncio.gather(*(send(row) for row in rows))
+        async with async_session() as session:
+            # Bulk UPDATE by primary key: one executemany for the batch
+            await session.execute(update(EmailOutbox), results)
+            await session.commit()
+        return len(rows)
+
+    async def _claim(self) -> List[Dict[str, Any]]:
+        now = datetime.utcnow()
+        due = (
+            select(EmailOutbox.id)
+            .where(
+                EmailOutbox.status == PENDING_SQL,
+                EmailOutbox.next_attempt_at <= now,
+            )
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with async_session() as session:
+            result = await session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(due.scalar_subquery()))
+                .values(
+                    attempts=EmailOutbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS),
+                )
+                .returning(EmailOutbox.id, EmailOutbox.params, EmailOutbox.attempts)
+                .execution_options(synchronize_session=False)
+            )
+            rows = [dict(row) for row in result.mappings()]
+            await session.commit()
+        return rows
+
+    async def _send(self, http: aiohttp.ClientSession, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one claimed email; returns the row's column updates."""
+        update_values = {
+            "id": row["id"],
+            "status": EmailOutboxStatus.PENDING,
+            "next_attempt_at": datetime.utcnow(),
+            "last_error": None,
+            "resend_id": None,
+            "sent_at": None,
+        }
+        try:
+            update_values["resend_id"] = await self._post_email(http, row)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            update_values["last_error"] = error
+            if isinstance(e, PermanentSendError) or row["attempts"] >= self.max_attempts:
+                self.failed += 1
+                update_values["status"] = EmailOutboxStatus.FAILED
+                logger.error(f"Email {row['id']} failed after {row['attempts']} attempt(s): {error}")
+            else:
+                self.retried += 1
+                delay = retry_delay(row["attempts"], self.retry_base)
+                update_values["next_attempt_at"] += timedelta(seconds=delay)
+                logger.warning(f"Email {row['id']} attempt {row['attempts']} failed, retrying in {delay:.1f}s: {error}")
+            return update_values
+
+        self.sent += 1
+        update_values["status"] = EmailOutboxStatus.SENT
+        update_values["sent_at"] = datetime.utcnow()
+        return update_values
+
+    async def _post_email(self, http: aiohttp.ClientSession, row: Dict[str, Any]) -> Optional[str]:
+        """POST the email to Resend; returns the Resend email ID."""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            # Stable per row, so a retry of an accepted email isn't sent twice
+            "Idempotency-Key": f"email-outbox-{row['id']}",
+        }
+        async with http.post(f"{self.api_url}/emails", json=row["params"], headers=headers) as response:
+            body = await response.text()
+            if response.status < 300:
+                try:
+                    return (await response.json(content_type=None)).get("id")
+                except ValueError:
+                    return None
+            message = f"Resend returned {response.status}: {body[:500]}"
+            if 400 <= response.status < 500 and response.status not in RETRYABLE_CLIENT_STATUSES:
+                raise PermanentSendError(message)
+            raise RuntimeError(message)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+async def purge_finished_emails() -> int:
+    """Delete sent and failed emails past the retention period; returns how many were deleted."""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.EMAIL_OUTBOX_RETENTION_SECONDS)
+    async with async_session() as session:
+        result = await session.execute(
+            delete(EmailOutbox).where(
+                EmailOutbox.status != PENDING_SQL,
+                EmailOutbox.created_at <= cutoff,
+            )
+        )
+        await session.commit()
+        return result.rowcount
+
+
+async def purge_finished_emails_periodically() -> None:
+    """Background task (started from the app lifespan) evicting old sent/failed emails."""
+    while True:
+        await asyncio.sleep(settings.EMAIL_OUTBOX_PURGE_INTERVAL_SECONDS)
+        try:
+            deleted = await purge_finished_emails()
+            if deleted:
+                logger.info(f"Purged {deleted} finished outbox emails")
+        except Exception as e:
+            logger.error(f"Failed to purge finished outbox emails: {e}")
+
+
+email_outbox_worker = EmailOutboxWorker(
+    api_url=settings.RESEND_API_URL,
+    api_key=settings.RESEND_API_KEY,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    concurrency=settings.EMAIL_OUTBOX_CONCURRENCY,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+)
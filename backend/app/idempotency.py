@@ -0,0 +1,170 @@
+"""
+Idempotency-Key support for mutating endpoints.
+
+Clients retry POSTs on flaky networks. When a request carries an
+`Idempotency-Key` header, its key is claimed by inserting a row into
+`idempotency_keys` in the same database transaction as the endpoint's
+writes, and the response is stored in that row before the commit. A retry
+with the same key gets the stored response back without running the
+endpoint again:
+
+- Retry after the original committed: the stored response is replayed.
+- Retry while the original is still running: the claim waits on the
+  primary key until the original commits (then replays) or rolls back
+  (then runs normally).
+- Failed requests (errors raised before the commit) roll the claim back,
+  so the client can retry them.
+
+Keys are scoped per user and expire after IDEMPOTENCY_KEY_TTL_SECONDS.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from fastapi import Depends, Header, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import get_current_user_id
+from app.config import settings
+from app.database import async_session, get_session
+from app.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# Set on replayed responses so clients (and logs) can tell them apart
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotentRequest:
+    """
+    Idempotency state of one request (see `get_idempotent_request`).
+
+    Endpoints return `replay` when it is set, and call `save()` with their
+    response right before committing.
+    """
+
+    def __init__(self, session: AsyncSession, user_id: str, key: Optional[str], request_hash: str):
+        self.session = session
+        self.user_id = user_id
+        self.key = key
+        self.request_hash = request_hash
+        self.replay: Optional[JSONResponse] = None
+
+    async def claim(self) -> None:
+        """
+        Claim the key in the session's transaction, or load the stored response into `replay`.
+
+        Expired keys are claimed again as if they were new.
+        """
+        if self.key is None:
+            return
+
+        now = datetime.utcnow()
+        stmt = pg_insert(IdempotencyKey).values(
+            user_id=self.user_id,
+            key=self.key,
+            request_hash=self.request_hash,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "key"],
+            set_={
+                "request_hash": stmt.excluded.request_hash,
+                "status_code": None,
+                "response_body": None,
+                "created_at": stmt.excluded.created_at,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at <= now,
+        ).returning(IdempotencyKey.key)
+        result = await self.session.execute(stmt)
+        if result.scalar_one_or_none() is not None:
+            return  # Claimed - run the endpoint
+
+        result = await self.session.execute(
+            select(IdempotencyKey).where(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key,
+            )
+        )
+        stored = result.scalar_one()
+        if stored.request_hash != self.request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"
+            )
+        if stored.status_code is None:
+            # Only possible if an endpoint committed without calling save()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with this {IDEMPOTENCY_KEY_HEADER} has no stored response"
+            )
+        self.replay = JSONResponse(
+            status_code=stored.status_code,
+            content=stored.response_body,
+            headers={IDEMPOTENT_REPLAY_HEADER: "true"},
+        )
+
+    async def save(self, response: Any, status_code: int = status.HTTP_200_OK) -> None:
+        """Store the response in the claimed row (in the caller's transaction, which commits it)."""
+        if self.key is None:
+            return
+        await self.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == self.user_id, IdempotencyKey.key == self.key)
+            .values(status_code=status_code, response_body=jsonable_encoder(response))
+        )
+
+
+async def get_idempotent_request(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER),
+    session: AsyncSession = Depends(get_session),
+    user_id: str = Depends(get_current_user_id),
+) -> IdempotentRequest:
+    """
+    FastAPI dependency: claim the request's Idempotency-Key (optional header).
+
+    Shares the endpoint's session, so the claim commits or rolls back with
+    the endpoint's writes.
+    """
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_KEY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"
+        )
+
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode())
+    digest.update(await request.body())
+    idempotent_request = IdempotentRequest(session, user_id, idempotency_key, digest.hexdigest())
+    await idempotent_request.claim()
+    return idempotent_request
+
+
+async def purge_expired_keys() -> int:
+    """Delete expired idempotency keys; returns how many were deleted."""
+    async with async_session() as session:
+        result = await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+        )
+        await session.commit()
+        return result.rowcount
+
+
+async def purge_expired_keys_periodically() -> None:
+    """Background task (started from the app lifespan) evicting expired keys."""
+    while True:
+        await asyncio.sleep(settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+        try:
+            deleted = await purge_expired_keys()
+            if deleted:
+                logger.info(f"Purged {deleted} expired idempotency keys")
+        except Exception as e:
+            logger.error(f"Failed to purge expired idempotency keys: {e}")
@@ -0,0 +1,51 @@
+"""Bulk inventory item writes shared by the routers."""
+from typing import List, Sequence
+from sqlalchemy import Row, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Inventory
+from app.valuation import ITEM_PRICE_SQL
+
+
+# Delete the user's items and subtract the vaulted ones from the vault
+# summary in one statement; the deleted rows are returned for transaction
+# details
+DELETE_ITEMS_SQL = f"""
+WITH deleted AS (
+    DELETE FROM inventory
+    WHERE id = ANY(:item_ids) AND user_id = :user_id
+    RETURNING *
+), summary AS (
+    INSERT INTO vault_summaries (user_id, item_count, total_value, updated_at)
+    SELECT
+        CAST(:user_id AS VARCHAR),
+        -count(*),
+        -COALESCE(sum({ITEM_PRICE_SQL}), 0),
+        now() AT TIME ZONE 'utc'
+    FROM deleted AS i
+    WHERE i.status = 'VAULTED'
+    HAVING count(*) > 0
+    ON CONFLICT (user_id) DO UPDATE
+    SET item_count = vault_summaries.item_count + EXCLUDED.item_count,
+        total_value = vault_summaries.total_value + EXCLUDED.total_value,
+        updated_at = EXCLUDED.updated_at
+)
+SELECT name, image_url, item_data FROM deleted
+"""
+
+
+async def delete_items(session: AsyncSession, user_id: str, item_ids: List[int]) -> Sequence[Row]:
+    """
+    Delete the user's items with the given IDs, keeping the vault summary in step.
+
+    IDs that don't exist or belong to another user are skipped, so callers
+    compare the number of returned rows with `item_ids` to check ownership
+    (and roll back on a mismatch). Does not commit.
+
+    Returns:
+        (name, image_url, item_data) of each deleted item
+    """
+    result = await session.execute(
+        text(DELETE_ITEMS_SQL).columns(Inventory.name, Inventory.image_url, Inventory.item_data),
+        {"user_id": user_id, "item_ids": list(item_ids)},
+    )
+    return result.all()
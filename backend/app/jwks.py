@@ -0,0 +1,160 @@
+"""
+Async JWKS key store for Supabase token verification.
+
+Keys are fetched at startup and refreshed in the background - on a schedule
+and when a token carries an unknown `kid` (key rotation). Lookups on the
+request path only read the in-memory key set and never touch the network.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+import aiohttp
+import jwt
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeyStore:
+    """
+    In-memory signing keys from a JWKS endpoint.
+
+    Concurrent refresh requests share one in-flight fetch (single-flight), and
+    refreshes triggered by unknown kids are throttled so tokens with random
+    kids can't be used to hammer the JWKS endpoint.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        refresh_interval: float = 600,
+        min_refresh_interval: float = 30,
+        timeout: float = 5,
+    ):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._last_attempt: Optional[float] = None
+        self.last_refreshed_at: Optional[float] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.unknown_kids = 0
+
+    def get_signing_key(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        """
+        Look up a signing key without network I/O.
+
+        An unknown kid schedules a background refresh and returns None; the
+        token is rejected now and accepted once the rotated key has loaded.
+        """
+        key = self._keys.get(kid)
+        if key is None:
+            self.unknown_kids += 1
+            self.request_refresh()
+        return key
+
+    async def refresh(self) -> bool:
+        """
+        Fetch the key set now, joining a refresh that is already in flight.
+
+        Returns:
+            True if the keys were loaded
+        """
+        self._loop = asyncio.get_running_loop()
+        if self._refresh_task is None or self._refresh_task.done():
+            self._last_attempt = time.monotonic()
+            self._refresh_task = asyncio.create_task(self._fetch())
+        return await asyncio.shield(self._refresh_task)
+
+    def request_refresh(self) -> None:
+        """
+        Schedule a background refresh (throttled, single-flight).
+
+        Safe to call from worker threads as well as from the event loop.
+        """
+        if self._loop is None or self._loop.is_closed():
+            try:
+                self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # No event loop yet - start() will load the keys
+        self._loop.call_soon_threadsafe(self._start_throttled_refresh)
+
+    def _start_throttled_refresh(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if self._last_attempt is not None and time.monotonic() - self._last_attempt < self.min_refresh_interval:
+            return
+        self._last_attempt = time.monotonic()
+        self._refresh_task = asyncio.create_task(self._fetch())
+
+    async def _fetch(self) -> bool:
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(self.url) as response:
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+            self.load(data)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Failed to refresh JWKS from {self.url}: {e}")
+            return False
+        return True
+
+    def load(self, data: Dict[str, Any]) -> int:
+        """
+        Replace the key set with a JWKS document ({"keys": [...]}).
+
+        Returns:
+            Number of usable keys loaded
+
+        Raises:
+            jwt.PyJWKSetError: If the document has no usable keys
+        """
+        keys = {key.key_id: key for key in jwt.PyJWKSet.from_dict(data).keys}
+        # Swap the whole set so readers never see a partial update
+        self._keys = keys
+        self.refreshes += 1
+        self.last_refreshed_at = time.time()
+        return len(keys)
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self) -> None:
+        """Prefetch the keys and start the scheduled refresh (call from app lifespan)."""
+        if not self.url:
+            logger.warning("JWKS URL not configured. Token verification will fail.")
+            return
+        if not await self.refresh():
+            logger.warning("JWKS prefetch failed - retrying in the background")
+        self._scheduler_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        """Cancel background refresh tasks."""
+        for task in (self._scheduler_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._scheduler_task = None
+        self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        return {
+            "keys": len(self._keys),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "unknown_kids": self.unknown_kids,
+            "last_refreshed_at": self.last_refreshed_at,
+        }
@@ -1,18 +1,32 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.routers import wallet, inventory, trade, cards, transactions, oauth_callback
-from app.database import init_db, get_supabase_client
-from app import models  # Import models so SQLModel knows about them
+from app.database import engine, init_db, get_supabase_client
+from app.pagination import NEXT_CURSOR_HEADER
+from app.idempotency import IDEMPOTENT_REPLAY_HEADER, purge_expired_keys_periodically
+from app.email_outbox import email_outbox_worker, purge_finished_emails_periodically
+from app import auth, models  # Import models so SQLModel knows about them
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🔥 Bonfire is heating up...")
+    await auth.jwks_store.start()  # Prefetch token signing keys, refresh in background
     await init_db()  # Creates tables in Supabase automatically
+    idempotency_purge = asyncio.create_task(purge_expired_keys_periodically())  # Evict expired Idempotency-Key rows
+    email_outbox_worker.start()  # Send queued emails in the background
+    email_outbox_purge = asyncio.create_task(purge_finished_emails_periodically())  # Evict old sent/failed emails
     yield
     print("🧊 Bonfire is cooling down...")
+    idempotency_purge.cancel()
+    email_outbox_purge.cancel()
+    await email_outbox_worker.stop(settings.EMAIL_OUTBOX_DRAIN_TIMEOUT_SECONDS)  # Finish in-flight sends
+    await auth.jwks_store.stop()
+    auth.shutdown_verify_executor()
+    await engine.dispose()  # Close pooled connections (session/direct pool modes)
 
 
 app = FastAPI(
@@ -29,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, IDEMPOTENT_REPLAY_HEADER],  # Pagination cursor, replayed retries
 )
 
 # Include routers
@@ -51,3 +66,16 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+
+@app.get("/metrics")
+async def metrics():
+    """In-process counters (cache hit rates etc.) for monitoring."""
+    return {
+        "card_cache": cards.card_cache.stats(),
+        "auth_claims_cache": auth.claims_cache.stats(),
+        "auth_verification": auth.verification_timer.stats(),
+        "auth_issuer_mismatches": auth.issuer_mismatches.stats(),
+        "jwks": auth.jwks_store.stats(),
+        "email_outbox": email_outbox_worker.stats(),
+    }
+
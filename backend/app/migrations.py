@@ -0,0 +1,240 @@
+"""
+Ordered, idempotent schema migrations applied at startup.
+
+`SQLModel.metadata.create_all` only creates missing tables - it never adds
+columns, indexes or extensions to tables that already exist. Each entry in
+MIGRATIONS is applied once (tracked in `schema_migrations`) after create_all,
+so existing databases pick up schema changes and backfills as well.
+
+Statements should stay idempotent (IF NOT EXISTS etc.) because a fresh
+database already has the columns/indexes declared on the models.
+"""
+from typing import List, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.catalog import REFRESH_SET_RANKS_SQL
+from app.models import CARD_SEARCH_VECTOR_SQL
+from app.valuation import REFRESH_VAULT_SUMMARIES_SQL
+
+# Arbitrary constant used to serialize concurrent startups (multiple workers)
+MIGRATION_LOCK_ID = 7_202_611
+
+# (version, statements) - append only, never edit an applied migration
+MIGRATIONS: List[Tuple[str, List[str]]] = [
+    (
+        "0001_card_search_index",
+        [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            # Generated column: Postgres maintains it on every write and
+            # backfills all existing rows when the column is added
+            f"""
+            ALTER TABLE pokemon_cards
+            ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS ({CARD_SEARCH_VECTOR_SQL}) STORED
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_pokemon_cards_search_vector
+            ON pokemon_cards USING gin (search_vector)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_pokemon_cards_name_trgm
+            ON pokemon_cards USING gin (name gin_trgm_ops)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_pokemon_cards_set_name_trgm
+            ON pokemon_cards USING gin (set_name gin_trgm_ops)
+            """,
+        ],
+    ),
+    (
+        "0002_keyset_pagination_indexes",
+        [
+            # /cards/popular and the default relevance ordering
+            """
+            CREATE INDEX IF NOT EXISTS ix_pokemon_cards_price_created_id
+            ON pokemon_cards (market_price DESC NULLS LAST, created_at DESC NULLS LAST, id DESC)
+            WHERE market_price > 0
+            """,
+            # /cards/search?sort_by=price
+            """
+            CREATE INDEX IF NOT EXISTS ix_pokemon_cards_price_id
+            ON pokemon_cards (market_price DESC NULLS LAST, id DESC)
+            """,
+            # /transactions history, with and without a type filter
+            """
+            CREATE INDEX IF NOT EXISTS ix_transactions_user_created_id
+            ON transactions (user_id, created_at DESC, id DESC)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_transactions_user_type_created_id
+            ON transactions (user_id, transaction_type, created_at DESC, id DESC)
+            """,
+        ],
+    ),
+    (
+        "0003_card_set_rank",
+        [
+            "ALTER TABLE pokemon_cards ADD COLUMN IF NOT EXISTS set_rank INTEGER",
+            REFRESH_SET_RANKS_SQL,
+            # Default relevance ordering: range scan over the top cards of each set
+            """
+            CREATE INDEX IF NOT EXISTS ix_pokemon_cards_set_rank_price
+            ON pokemon_cards (market_price DESC NULLS LAST, created_at DESC NULLS LAST, id DESC)
+            WHERE set_rank IS NOT NULL
+            """,
+        ],
+    ),
+    (
+        "0004_card_content_hash",
+        [
+            "ALTER TABLE pokemon_cards ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+        ],
+    ),
+    (
+        "0005_unique_wallet_per_user",
+        [
+            # Block wallet writes from running instances until the merge commits
+            "LOCK TABLE wallets IN SHARE ROW EXCLUSIVE MODE",
+            # Merge duplicate wallets (from concurrent first requests) into the
+            # oldest one; balances are summed so no deposited money is lost
+            """
+            UPDATE wallets AS w
+            SET balance = d.total_balance, updated_at = now() AT TIME ZONE 'utc'
+            FROM (
+                SELECT user_id, min(id) AS keep_id, sum(balance) AS total_balance
+                FROM wallets
+                GROUP BY user_id
+                HAVING count(*) > 1
+            ) AS d
+            WHERE w.id = d.keep_id
+            """,
+            """
+            DELETE FROM wallets AS w
+            USING (
+                SELECT user_id, min(id) AS keep_id
+                FROM wallets
+                GROUP BY user_id
+                HAVING count(*) > 1
+            ) AS d
+            WHERE w.user_id = d.user_id AND w.id <> d.keep_id
+            """,
+            # Replace the plain index with a unique one (target of ON CONFLICT (user_id))
+            "DROP INDEX IF EXISTS ix_wallets_user_id",
+            "CREATE UNIQUE INDEX ix_wallets_user_id ON wallets (user_id)",
+        ],
+    ),
+    (
+        "0006_decimal_money",
+        [
+            # Float balances become exact cents; rounding once here drops the
+            # binary drift accumulated by earlier float arithmetic
+            """
+            ALTER TABLE wallets
+            ALTER COLUMN balance TYPE NUMERIC(12, 2) USING round(balance::numeric, 2)
+            """,
+            """
+            ALTER TABLE transactions
+            ALTER COLUMN amount TYPE NUMERIC(12, 2),
+            ALTER COLUMN balance_after TYPE NUMERIC(12, 2)
+            """,
+        ],
+    ),
+    (
+        "0007_inventory_search_indexes",
+        [
+            # /inventory/search: per-user listing by status, newest first
+            """
+            CREATE INDEX IF NOT EXISTS ix_inventory_user_status_created_id
+            ON inventory (user_id, status, created_at DESC, id DESC)
+            """,
+            # Substring and similarity matching on item names
+            """
+            CREATE INDEX IF NOT EXISTS ix_inventory_name_trgm
+            ON inventory USING gin (name gin_trgm_ops)
+            """,
+            # item_data @> '{"set": ...}' filters (set, rarity, condition)
+            """
+            CREATE INDEX IF NOT EXISTS ix_inventory_item_data
+            ON inventory USING gin ((item_data::jsonb) jsonb_path_ops)
+            """,
+        ],
+    ),
+    (
+        "0008_vault_keyset_index",
+        [
+            # /inventory/vault pages, most recently vaulted first
+            """
+            CREATE INDEX IF NOT EXISTS ix_inventory_user_status_vaulted_id
+            ON inventory (user_id, status, vaulted_at DESC NULLS LAST, id DESC)
+            """,
+        ],
+    ),
+    (
+        "0009_vault_summaries_backfill",
+        [
+            # Table comes from create_all; seed it from the existing vaults
+            REFRESH_VAULT_SUMMARIES_SQL,
+        ],
+    ),
+    (
+        "0010_email_outbox_due_index",
+        [
+            # Outbox worker claims: due pending emails, oldest first
+            """
+            CREATE INDEX IF NOT EXISTS ix_email_outbox_pending_due
+            ON email_outbox (next_attempt_at, id)
+            WHERE status = 'pending'
+            """,
+        ],
+    ),
+    (
+        "0011_inventory_search_nulls_last",
+        [
+            # /inventory/search orders created_at DESC NULLS LAST; rebuild the
+            # 0007 index (created_at DESC, i.e. NULLS FIRST) to match
+            "DROP INDEX IF EXISTS ix_inventory_user_status_created_id",
+            """
+            CREATE INDEX ix_inventory_user_status_created_id
+            ON inventory (user_id, status, created_at DESC NULLS LAST, id DESC)
+            """,
+        ],
+    ),
+    (
+        "0012_email_outbox_finished_index",
+        [
+            # Retention purge: sent/failed emails by age
+            """
+            CREATE INDEX IF NOT EXISTS ix_email_outbox_finished_created
+            ON email_outbox (created_at)
+            WHERE status <> 'pending'
+            """,
+        ],
+    ),
+]
+
+
+async def run_migrations(conn: AsyncConnection) -> None:
+    """Apply any pending migrations inside the caller's transaction."""
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+    await conn.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(100) PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """
+    ))
+
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    applied = {row[0] for row in result}
+
+    for version, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        print(f"🛠️  Applying migration {version}...")
+        for statement in statements:
+            await conn.execute(text(statement))
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version) VALUES (:version)"),
+            {"version": version},
+        )
@@ -1,7 +1,9 @@
 from sqlmodel import SQLModel, Field, Column
-from sqlalchemy import Enum, JSON, Numeric, ARRAY, Text, String
+from sqlalchemy import Enum, JSON, Numeric, ARRAY, Text, String, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from decimal import Decimal
 import enum
 
 
@@ -10,8 +12,12 @@ class Wallet(SQLModel, table=True):
     __tablename__ = "wallets"
     
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: str = Field(index=True, description="Supabase user ID")
-    balance: float = Field(default=0.0, description="Current wallet balance")
+    user_id: str = Field(index=True, unique=True, description="Supabase user ID (one wallet per user)")
+    balance: Decimal = Field(
+        default=Decimal("0.00"),
+        sa_column=Column(Numeric(12, 2), nullable=False),
+        description="Current wallet balance"
+    )
     created_at: Optional[datetime] = Field(
         default_factory=lambda: datetime.utcnow(),
         description="Timestamp when wallet was created"
@@ -107,6 +113,16 @@ class Inventory(SQLModel, table=True):
     )
 
 
+# Weighted search document for pokemon_cards: name > set > number > rarity.
+# 'simple' config because card names are proper nouns (no stemming/stop words).
+CARD_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(set_name, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(number, '')), 'C') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(rarity, '')), 'D')"
+)
+
+
 class PokemonCard(SQLModel, table=True):
     """Pokemon card model with full-text search support."""
     __tablename__ = "pokemon_cards"
@@ -148,6 +164,10 @@ class PokemonCard(SQLModel, table=True):
     price_source: Optional[str] = Field(default=None, description="Source: tcgplayer, ebay, custom, etc.")
     price_updated_at: Optional[datetime] = Field(default=None)
     
+    # Price rank within the set (1 = most expensive), only stored for the top
+    # cards per set. Refreshed after each sync by app.catalog.refresh_set_ranks
+    set_rank: Optional[int] = Field(default=None, description="Price rank within set (top N only)")
+    
     # Full price data (JSON for flexibility)
     tcgplayer_data: Optional[Dict[str, Any]] = Field(
         default=None,
@@ -162,6 +182,16 @@ class PokemonCard(SQLModel, table=True):
         description="Complete API response from pokemontcg.io"
     )
     
+    # Hash of the API payload: lets the sync skip rows that didn't change
+    content_hash: Optional[str] = Field(default=None, description="SHA-256 of the source API card JSON")
+    
+    # Full-text search document (generated by Postgres, GIN indexed - see app/migrations.py)
+    search_vector: Optional[str] = Field(
+        default=None,
+        sa_column=Column(TSVECTOR, Computed(CARD_SEARCH_VECTOR_SQL, persisted=True)),
+        description="Weighted tsvector over name, set, number and rarity"
+    )
+    
     # Timestamps
     created_at: Optional[datetime] = Field(
         default_factory=lambda: datetime.utcnow()
@@ -171,6 +201,89 @@ class PokemonCard(SQLModel, table=True):
     )
 
 
+class CatalogState(SQLModel, table=True):
+    """Single-row table holding the card catalog version."""
+    __tablename__ = "catalog_state"
+    
+    id: int = Field(default=1, primary_key=True)
+    version: int = Field(default=0, description="Bumped whenever a sync commits card changes")
+    updated_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.utcnow(),
+        description="When the version was last bumped"
+    )
+
+
+class SyncSetCheckpoint(SQLModel, table=True):
+    """Last synced version of each card set (for incremental card syncs)."""
+    __tablename__ = "sync_set_checkpoints"
+    
+    set_id: str = Field(primary_key=True, description="Set ID from API")
+    set_updated_at: str = Field(description="Set 'updatedAt' value from the API when last synced")
+    synced_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.utcnow(),
+        description="When the set's cards were last synced"
+    )
+
+
+class SyncRunStatus(str, enum.Enum):
+    """Status of a card sync run."""
+    RUNNING = "running"  # In progress (or interrupted)
+    PARTIAL = "partial"  # Finished with failed pages - resumed by the next sync
+    COMPLETED = "completed"  # Every page synced
+    ABANDONED = "abandoned"  # Superseded by a new run started with --restart
+    INCOMPLETE = "incomplete"  # Gave up on failed pages (attempt cap or run age) - not resumed
+
+
+class SyncPageStatus(str, enum.Enum):
+    """Status of one page within a card sync run."""
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class SyncRun(SQLModel, table=True):
+    """One run of scripts/sync_cards.py; unfinished runs are resumed."""
+    __tablename__ = "sync_runs"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    mode: str = Field(sa_column=Column(String(20)), description="full or incremental")
+    status: SyncRunStatus = Field(
+        default=SyncRunStatus.RUNNING,
+        sa_column=Column(String(20)),
+        description="Run status"
+    )
+    total_count: int = Field(default=0, description="Cards the API reported for this run (0 if unknown)")
+    started_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.utcnow(),
+        description="When the run was started"
+    )
+    finished_at: Optional[datetime] = Field(default=None, description="When the run last finished a pass")
+
+
+class SyncRunPage(SQLModel, table=True):
+    """Progress of a single API page within a sync run."""
+    __tablename__ = "sync_run_pages"
+    
+    run_id: int = Field(foreign_key="sync_runs.id", primary_key=True)
+    query: str = Field(default="", primary_key=True, description="API search query ('' for the whole catalog)")
+    page: int = Field(primary_key=True, description="API page number")
+    status: SyncPageStatus = Field(
+        default=SyncPageStatus.PENDING,
+        sa_column=Column(String(20)),
+        description="Page status"
+    )
+    source_updated_at: Optional[str] = Field(default=None, description="Set 'updatedAt' the page was planned for (incremental runs)")
+    content_hash: Optional[str] = Field(default=None, description="Hash of the page's card hashes")
+    card_count: int = Field(default=0, description="Cards returned by the API")
+    changed_count: int = Field(default=0, description="Cards inserted or changed")
+    attempts: int = Field(default=0, description="Fetch/write attempts so far")
+    error: Optional[str] = Field(default=None, sa_column=Column(Text), description="Last error")
+    updated_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.utcnow(),
+        description="Last status change"
+    )
+
+
 class TransactionType(str, enum.Enum):
     """Type of transaction."""
     TRADE = "trade"  # Trade/swap transaction
@@ -196,15 +309,15 @@ class Transaction(SQLModel, table=True):
     description: str = Field(description="Human-readable description of the transaction")
     
     # Money amounts
-    amount: float = Field(
-        default=0.0,
-        sa_column=Column(Numeric(10, 2)),
+    amount: Decimal = Field(
+        default=Decimal("0.00"),
+        sa_column=Column(Numeric(12, 2)),
         description="Transaction amount (positive for deposits/received, negative for withdrawals/given)"
     )
     
     # Balance after transaction
-    balance_after: float = Field(
-        sa_column=Column(Numeric(10, 2)),
+    balance_after: Decimal = Field(
+        sa_column=Column(Numeric(12, 2)),
         description="Wallet balance after this transaction"
     )
     
@@ -225,3 +338,77 @@ class Transaction(SQLModel, table=True):
     )
 
 
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """Stored response of a mutating request, replayed when a client retries it with the same Idempotency-Key."""
+    __tablename__ = "idempotency_keys"
+    
+    user_id: str = Field(primary_key=True, description="Supabase user ID (keys are scoped per user)")
+    key: str = Field(primary_key=True, max_length=255, description="Client-supplied Idempotency-Key header")
+    request_hash: str = Field(description="SHA-256 of method, path and body of the original request")
+    status_code: Optional[int] = Field(default=None, description="Status code of the stored response")
+    response_body: Optional[Any] = Field(
+        default=None,
+        sa_column=Column(JSON),
+        description="Stored JSON response body"
+    )
+    created_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.utcnow(),
+        description="Timestamp when the key was first used"
+    )
+    expires_at: datetime = Field(index=True, description="After this the key can be reused and is purged")
+
+
+class VaultSummary(SQLModel, table=True):
+    """Per-user vault count and value at current card prices (maintained by app.valuation)."""
+    __tablename__ = "vault_summaries"
+    
+    user_id: str = Field(primary_key=True, description="Supabase user ID")
+    item_count: int = Field(default=0, description="Number of VAULTED items")
+    total_value: Decimal = Field(
+        default=Decimal("0.00"),
+        sa_column=Column(Numeric(14, 2), nullable=False),
+        description="Sum of the items' current market prices"
+    )
+    updated_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.utcnow(),
+        description="Last change to the summary"
+    )
+
+
+class EmailOutboxStatus(str, enum.Enum):
+    """Delivery status of a queued email."""
+    PENDING = "pending"  # Waiting to be sent (or retried)
+    SENT = "sent"  # Accepted by Resend
+    FAILED = "failed"  # Rejected, or out of attempts
+
+
+class EmailOutbox(SQLModel, table=True):
+    """Email queued in the same transaction as the write it confirms (sent by app.email_outbox)."""
+    __tablename__ = "email_outbox"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(index=True, description="Supabase user ID")
+    kind: str = Field(sa_column=Column(String(50)), description="Email type, e.g. vault_confirmation")
+    params: Dict[str, Any] = Field(
+        sa_column=Column(JSON, nullable=False),
+        description="Resend send-email request body"
+    )
+    status: EmailOutboxStatus = Field(
+        default=EmailOutboxStatus.PENDING,
+        sa_column=Column(String(20), nullable=False),
+        description="Delivery status"
+    )
+    attempts: int = Field(default=0, description="Send attempts so far")
+    next_attempt_at: datetime = Field(
+        default_factory=lambda: datetime.utcnow(),
+        description="When the email is next due; pushed forward while a worker holds it"
+    )
+    last_error: Optional[str] = Field(default=None, sa_column=Column(Text), description="Last send error")
+    resend_id: Optional[str] = Field(default=None, description="Email ID returned by Resend")
+    created_at: Optional[datetime] = Field(
+        default_factory=lambda: datetime.utcnow(),
+        description="When the email was queued"
+    )
+    sent_at: Optional[datetime] = Field(default=None, description="When Resend accepted the email")
@@ -0,0 +1,126 @@
+"""
+Keyset (cursor) pagination helpers.
+
+List endpoints keep returning plain JSON arrays; the cursor for the next page
+is sent in the X-Next-Cursor response header. Clients pass it back as
+`?cursor=...` to continue after the last row instead of using OFFSET, so deep
+pages cost the same as the first one and rows don't shift while the catalog
+is being rewritten.
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any) -> Any:
+    """JSON default hook: tag types that JSON can't round-trip exactly."""
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Unsupported cursor value: {type(value).__name__}")
+
+
+def _decode_value(obj: dict) -> Any:
+    """JSON object hook: reverse of _encode_value."""
+    if "$dec" in obj:
+        return Decimal(obj["$dec"])
+    if "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def encode_cursor(kind: str, values: Sequence[Any]) -> str:
+    """
+    Encode the sort key of the last row on a page into an opaque cursor.
+
+    Args:
+        kind: Identifies the ordering the cursor belongs to (e.g. "cards:price")
+        values: Sort key values of the last row, ending with its id
+    """
+    payload = json.dumps({"k": kind, "v": list(values)}, default=_encode_value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed or was issued for a different ordering
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()), object_hook=_decode_value)
+        values = payload["v"]
+        if payload["k"] != kind or not isinstance(values, list):
+            raise ValueError("cursor kind mismatch")
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return values
+
+
+def seek_after(keys: Sequence[Tuple[ColumnElement, Any]], nullable: bool = False) -> ColumnElement:
+    """
+    WHERE clause that resumes a descending ordering after the given row.
+
+    Args:
+        keys: (column, last_value) pairs, most significant first. The last key
+              must be unique and non-null (the primary key).
+        nullable: False when no key can be NULL - emits a row comparison
+                  `(a, b, id) < (x, y, z)` that a matching composite btree index
+                  serves as a single range scan. True for `DESC NULLS LAST`
+                  orderings over nullable columns.
+    """
+    if not nullable:
+        return tuple_(*(column for column, _ in keys)) < tuple_(*(value for _, value in keys))
+
+    column, value = keys[-1]
+    condition = column < value
+    for column, value in reversed(keys[:-1]):
+        if value is None:
+            # NULLs sort last: only NULL rows with a smaller tail remain
+            condition = and_(column.is_(None), condition)
+        else:
+            condition = or_(column < value, column.is_(None), and_(column == value, condition))
+    return condition
+
+
+def page_with_cursor(
+    rows: Sequence[Any],
+    limit: int,
+    response: Response,
+    kind: str,
+    sort_key,
+) -> List[Any]:
+    """
+    Trim a `limit + 1` result to `limit` rows and set the next-page cursor header.
+
+    Args:
+        rows: Query results fetched with `.limit(limit + 1)`
+        limit: Page size requested by the client
+        response: Response whose headers receive X-Next-Cursor
+        kind: Cursor kind (see encode_cursor)
+        sort_key: Callable returning the sort key values (ending with id) for a row
+    """
+    page = list(rows[:limit])
+    if len(rows) > limit and page:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(kind, sort_key(page[-1]))
+    return page
+
+
+def get_cursor_values(cursor: Optional[str], kind: str) -> Optional[List[Any]]:
+    """Decode an optional cursor query parameter."""
+    if not cursor:
+        return None
+    return decode_cursor(cursor, kind)
@@ -1,14 +1,23 @@
 """Card search router with full-text search."""
-from fastapi import APIRouter, Query, Depends, HTTPException
+import re
+from fastapi import APIRouter, Query, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, or_, case, literal_column
+from sqlalchemy.sql.elements import ColumnElement
 from sqlmodel import SQLModel
-from typing import Optional, List
+from typing import Any, Hashable, Optional, List, Tuple
+from app.cache import VersionedCache
+from app.config import settings
 from app.database import get_session
+from app.catalog import SET_RANK_LIMIT, get_catalog_version
 from app.models import PokemonCard
+from app.pagination import NEXT_CURSOR_HEADER, get_cursor_values, page_with_cursor, seek_after
 
 router = APIRouter(prefix="/cards", tags=["cards"])
 
+# Same text search config used to build pokemon_cards.search_vector
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
 
 class CardResponse(SQLModel):
     """Response model for card search."""
@@ -28,106 +37,199 @@ class CardResponse(SQLModel):
     price_source: Optional[str]
 
 
+# Responses that are identical for every user until the next card sync.
+# Dropped as a whole when scripts/sync_cards.py bumps the catalog version.
+card_cache = VersionedCache(
+    maxsize=settings.CARD_CACHE_MAX_ENTRIES,
+    ttl=settings.CARD_CACHE_TTL_SECONDS,
+    check_interval=settings.CATALOG_VERSION_CHECK_SECONDS,
+)
+
+
+async def get_cached(session: AsyncSession, key: Hashable) -> Tuple[bool, Any]:
+    """
+    Look up a cached card response.
+    
+    Re-reads the catalog version at most every CATALOG_VERSION_CHECK_SECONDS;
+    other hits are served without touching the database.
+    """
+    if card_cache.needs_version_check():
+        card_cache.observe_version(await get_catalog_version(session))
+    return card_cache.get(key)
+
+
+def cache_page(key: Hashable, cards: List[Any], response: Response) -> List[CardResponse]:
+    """Cache a page of cards along with its next-page cursor header."""
+    page = [CardResponse.model_validate(card) for card in cards]
+    card_cache.set(key, (page, response.headers.get(NEXT_CURSOR_HEADER)))
+    return page
+
+
+def replay_page(cached: Tuple[List[CardResponse], Optional[str]], response: Response) -> List[CardResponse]:
+    """Return a cached page, restoring its next-page cursor header."""
+    page, next_cursor = cached
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return page
+
+
+def build_card_search(q: str) -> Tuple[ColumnElement, ColumnElement]:
+    """
+    Build the WHERE clause and relevance score for a search term.
+    
+    - Every word is matched as a prefix against the GIN-indexed search_vector
+      ("char 4" -> 'char:* & 4:*'), so results update as the user types
+    - pg_trgm similarity on the name catches typos ("charzard")
+    - Exact card number match ("4/102") since the parser splits numbers
+    
+    Returns:
+        (condition, rank) where rank is ts_rank plus name similarity and number bonus
+    """
+    term = q.strip()
+    # Exact number hits ("4/102") outrank partial token matches ("24/102")
+    base_score = func.similarity(PokemonCard.name, term) + case((PokemonCard.number == term, 1.0), else_=0.0)
+    conditions = [
+        PokemonCard.name.op("%")(term),  # Served by the name trigram index
+        PokemonCard.number == term,
+    ]
+    rank = base_score
+    
+    words = re.findall(r"\w+", term.lower())
+    if words:
+        ts_query = func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{word}:*" for word in words))
+        conditions.insert(0, PokemonCard.search_vector.op("@@")(ts_query))
+        rank = func.ts_rank(PokemonCard.search_vector, ts_query) + base_score
+    
+    return or_(*conditions), rank
+
+
 @router.get("/search", response_model=List[CardResponse])
 async def search_cards(
+    response: Response,
     q: str = Query("", description="Search query"),
     language: Optional[str] = Query(None, description="Filter by language: en, ja"),
     sort_by: str = Query("relevance", description="Sort by: relevance, price"),
     limit: int = Query(50, ge=1, le=100, description="Number of results"),
-    offset: int = Query(0, ge=0, description="Pagination offset"),
+    offset: int = Query(0, ge=0, description="Pagination offset (ignored when cursor is given)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     session: AsyncSession = Depends(get_session)
 ):
     """
     Search Pokemon cards using full-text search.
     
     Supports:
-    - Full-text search across name, set, number, rarity
+    - Full-text prefix search across name, set, number, rarity (tsvector + GIN)
+    - Typo-tolerant name matching (pg_trgm)
     - Filtering by language
-    - Sorting by relevance or price
+    - Sorting by relevance (ts_rank) or price
+    - Keyset pagination: pass the X-Next-Cursor response header back as `cursor`
+    
+    Results without a search term are served from the card cache.
     """
+    cache_key = None
+    if not q.strip():
+        cache_key = (
+            "search", language, "price" if sort_by == "price" else "relevance",
+            limit, cursor, 0 if cursor else offset,
+        )
+        found, cached = await get_cached(session, cache_key)
+        if found:
+            return replay_page(cached, response)
+    
     query = select(PokemonCard)
     
     # Language filter
     if language:
         query = query.where(PokemonCard.language == language)
     
-    # Search - use simple ILIKE for MVP (works reliably)
+    search_rank = None
     if q and q.strip():
-        search_term = f"%{q.strip()}%"
-        query = query.where(
-            (PokemonCard.name.ilike(search_term)) |
-            (PokemonCard.set_name.ilike(search_term)) |
-            (PokemonCard.number.ilike(search_term)) |
-            (PokemonCard.rarity.ilike(search_term))
-        )
+        search_condition, search_rank = build_card_search(q)
+        query = query.where(search_condition)
+    
+    # Rows are (card, search_rank) tuples when ordering by relevance score
+    ranked_rows = False
     
     # Sort: prioritize rarest cards from recent/popular sets
+    # Every ordering ends with id so the cursor identifies a unique position
     if sort_by == "price":
-        query = query.order_by(PokemonCard.market_price.desc().nulls_last())
-    else:  # relevance (default)
-        # Use window function to get top 10 most expensive cards per set
-        # Only rank cards that have a set name and a valid price
-        # Create window function: rank cards by price within each set
-        row_number = func.row_number().over(
-            partition_by=PokemonCard.set_name,
-            order_by=desc(PokemonCard.market_price).nulls_last()
-        ).label('row_num')
-        
-        # Build the ranked query with filters and window function
-        ranked_query = select(
-            PokemonCard.id.label('card_id'),
-            row_number
-        ).where(
-            PokemonCard.set_name.isnot(None),  # Must have a set name
-            PokemonCard.market_price.isnot(None),  # Must have a price
-            PokemonCard.market_price > 0  # Price must be positive
-        )
-        
-        # Apply the same filters
-        if language:
-            ranked_query = ranked_query.where(PokemonCard.language == language)
-        if q and q.strip():
-            search_term = f"%{q.strip()}%"
-            ranked_query = ranked_query.where(
-                (PokemonCard.name.ilike(search_term)) |
-                (PokemonCard.set_name.ilike(search_term)) |
-                (PokemonCard.number.ilike(search_term)) |
-                (PokemonCard.rarity.ilike(search_term))
-            )
-        
-        # Convert to subquery
-        ranked_subquery = ranked_query.subquery()
-        
-        # Filter to top 10 per set and get card IDs
-        top_10_ids = select(ranked_subquery.c.card_id).where(
-            ranked_subquery.c.row_num <= 10
+        cursor_kind = "cards:price"
+        sort_key = lambda card: [card.market_price, card.id]
+        after = get_cursor_values(cursor, cursor_kind)
+        if after:
+            query = query.where(seek_after(
+                [(PokemonCard.market_price, after[0]), (PokemonCard.id, after[1])],
+                nullable=True,
+            ))
+        query = query.order_by(PokemonCard.market_price.desc().nulls_last(), PokemonCard.id.desc())
+    elif search_rank is not None:  # relevance with a search term
+        cursor_kind = "cards:rank"
+        ranked_rows = True
+        search_rank = search_rank.label("search_rank")
+        query = query.add_columns(search_rank)
+        sort_key = lambda row: [row.search_rank, row.PokemonCard.market_price, row.PokemonCard.id]
+        after = get_cursor_values(cursor, cursor_kind)
+        if after:
+            query = query.where(seek_after(
+                [(search_rank.element, after[0]), (PokemonCard.market_price, after[1]), (PokemonCard.id, after[2])],
+                nullable=True,
+            ))
+        query = query.order_by(
+            search_rank.desc(),
+            PokemonCard.market_price.desc().nulls_last(),
+            PokemonCard.id.desc(),
         )
+    else:  # relevance (default) without a search term
+        cursor_kind = "cards:relevance"
+        sort_key = lambda card: [card.market_price, card.created_at, card.id]
         
-        # Select the actual cards that are in top 10 per set
-        # Order by price first (most expensive overall), then by recency
-        query = select(PokemonCard).where(
-            PokemonCard.id.in_(top_10_ids)
+        # Top 10 most expensive cards per set, precomputed after each sync
+        # (see app.catalog.refresh_set_ranks) and served by a partial index
+        query = query.where(
+            PokemonCard.set_rank <= SET_RANK_LIMIT
         ).order_by(
             PokemonCard.market_price.desc().nulls_last(),  # Most expensive cards first
-            PokemonCard.created_at.desc().nulls_last()    # Then most recent sets
+            PokemonCard.created_at.desc().nulls_last(),   # Then most recent sets
+            PokemonCard.id.desc(),
         )
+        after = get_cursor_values(cursor, cursor_kind)
+        if after:
+            query = query.where(seek_after([
+                (PokemonCard.market_price, after[0]),
+                (PokemonCard.created_at, after[1]),
+                (PokemonCard.id, after[2]),
+            ]))
     
-    # Pagination
-    query = query.limit(limit).offset(offset)
+    # Pagination: fetch one extra row to know whether another page exists
+    query = query.limit(limit + 1)
+    if not cursor:
+        query = query.offset(offset)
     
     # Execute
     result = await session.execute(query)
-    cards = result.scalars().all()
+    rows = result.all() if ranked_rows else result.scalars().all()
     
-    return cards
+    page = page_with_cursor(rows, limit, response, cursor_kind, sort_key)
+    if ranked_rows:
+        return [row.PokemonCard for row in page]
+    if cache_key:
+        return cache_page(cache_key, page, response)
+    return page
 
 
 @router.get("/popular", response_model=List[CardResponse])
 async def get_popular_cards(
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     session: AsyncSession = Depends(get_session)
 ):
     """Get popular cards: top N by market price (only cards with valid price and set)."""
+    cache_key = ("popular", limit, cursor)
+    found, cached = await get_cached(session, cache_key)
+    if found:
+        return replay_page(cached, response)
+    
     # Simple, robust query: top cards by price (with set_name to avoid fully empty results)
     query = (
         select(PokemonCard)
@@ -136,12 +238,24 @@ async def get_popular_cards(
         .order_by(
             PokemonCard.market_price.desc().nulls_last(),
             PokemonCard.created_at.desc().nulls_last(),
+            PokemonCard.id.desc(),
         )
-        .limit(limit)
+        .limit(limit + 1)
     )
+    after = get_cursor_values(cursor, "cards:popular")
+    if after:
+        query = query.where(seek_after([
+            (PokemonCard.market_price, after[0]),
+            (PokemonCard.created_at, after[1]),
+            (PokemonCard.id, after[2]),
+        ]))
     result = await session.execute(query)
     cards = result.scalars().all()
-    return cards
+    page = page_with_cursor(
+        cards, limit, response, "cards:popular",
+        lambda card: [card.market_price, card.created_at, card.id],
+    )
+    return cache_page(cache_key, page, response)
 
 
 @router.get("/{card_id}", response_model=CardResponse)
@@ -150,6 +264,11 @@ async def get_card(
     session: AsyncSession = Depends(get_session)
 ):
     """Get a single card by ID."""
+    cache_key = ("card", card_id)
+    found, cached = await get_cached(session, cache_key)
+    if found:
+        return cached
+    
     result = await session.execute(
         select(PokemonCard).where(PokemonCard.id == card_id)
     )
@@ -158,4 +277,6 @@ async def get_card(
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
     
+    card = CardResponse.model_validate(card)
+    card_cache.set(cache_key, card)
     return card
@@ -1,28 +1,32 @@
 """Inventory router for search and vault endpoints."""
-import asyncio
-import logging
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import case, cast, func, insert, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import SQLModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from app.database import get_session
-from app.models import Inventory, Status, Transaction, TransactionType, Wallet
-from app.auth import get_user_id_from_token, get_user_email_from_token, get_user_name_from_token
-from app.email import send_vault_confirmation_email
-
-logger = logging.getLogger(__name__)
+from app.models import Inventory, Status, Transaction, TransactionType, VaultSummary
+from app.auth import Principal, get_current_principal, get_current_user_id
+from app.email import queue_vault_confirmation_email
+from app.email_outbox import email_outbox_worker
+from app.idempotency import IdempotentRequest, get_idempotent_request
+from app.inventory_items import delete_items
+from app.pagination import get_cursor_values, page_with_cursor, seek_after
+from app.valuation import apply_vault_delta
+from app.wallets import ZERO, get_or_create_wallet, money_str
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
+# item_data is a json column; attribute filters use jsonb containment (@>),
+# served by the GIN expression index on (item_data::jsonb)
+ITEM_DATA_JSONB = cast(Inventory.item_data, JSONB)
+
 
-# Auth helper
-async def get_user_id(authorization: Optional[str] = Header(None)) -> str:
-    """Get user ID from Authorization header."""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization")
-    return get_user_id_from_token(authorization)
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input matches literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 # Request/Response models
@@ -57,39 +61,56 @@ class InventoryItemResponse(SQLModel):
     created_at: Optional[datetime]
 
 
-# Get or create wallet helper (reused from wallet router)
-async def get_wallet(session: AsyncSession, user_id: str, commit: bool = False) -> Wallet:
-    """
-    Get wallet, create if doesn't exist.
-    
-    Args:
-        session: Database session
-        user_id: User ID
-        commit: If True, commit immediately (for standalone use). 
-                If False, add to session without committing (for use in transactions)
-    """
-    result = await session.execute(select(Wallet).where(Wallet.user_id == user_id))
-    wallet = result.scalar_one_or_none()
-    
-    if not wallet:
-        wallet = Wallet(user_id=user_id, balance=0.0)
-        session.add(wallet)
-        if commit:
-            await session.commit()
-            await session.refresh(wallet)
-    
-    return wallet
+class VaultItemResponse(InventoryItemResponse):
+    """Vault listing row: display fields extracted from item_data, which itself is opt-in."""
+    item_data: Optional[Dict[str, Any]] = None
+    set_name: Optional[str] = None
+    condition: Optional[str] = None
+    market_price: Optional[float] = None
+
+
+class VaultSummaryResponse(SQLModel):
+    """Response model for the vault summary."""
+    item_count: int
+    total_value: float
+    updated_at: Optional[datetime]
+
+
+# Vault listing columns: everything but the item_data blob. market_price is
+# only taken when it is a JSON number, so odd values can't break the cast.
+VAULT_SUMMARY_COLUMNS = [
+    Inventory.id,
+    Inventory.user_id,
+    Inventory.name,
+    Inventory.image_url,
+    Inventory.status,
+    Inventory.collectible_type,
+    Inventory.external_id,
+    Inventory.external_api,
+    Inventory.submitted_at,
+    Inventory.vaulted_at,
+    Inventory.created_at,
+    Inventory.item_data["set"].as_string().label("set_name"),
+    Inventory.item_data["condition"].as_string().label("condition"),
+    case(
+        (func.json_typeof(Inventory.item_data["market_price"]) == "number",
+         Inventory.item_data["market_price"].as_float()),
+    ).label("market_price"),
+]
 
 
 @router.post("/items", response_model=List[InventoryItemResponse])
 async def create_inventory_items(
     request: CreateInventoryItemsRequest,
     session: AsyncSession = Depends(get_session),
-    user_id: str = Depends(get_user_id),
-    authorization: Optional[str] = Header(None)
+    principal: Principal = Depends(get_current_principal),
+    idempotency: IdempotentRequest = Depends(get_idempotent_request)
 ):
     """Create multiple inventory items for the authenticated user."""
-    created_items = []
+    if idempotency.replay:
+        return idempotency.replay
+    user_id = principal.id
+    new_items = []
     items_details = []  # Store card details for transaction
     
     for item_data in request.items:
@@ -100,7 +121,7 @@ async def create_inventory_items(
         
         items_details.append({
             "name": item_data.name,
-            "value": float(card_value),
+            "value": money_str(card_value),
             "image_url": item_data.image_url,
         })
         
@@ -117,14 +138,23 @@ async def create_inventory_items(
             submitted_at=datetime.utcnow(),
             vaulted_at=datetime.utcnow(),  # Set vaulted_at immediately
         )
-        session.add(inventory_item)
-        created_items.append(inventory_item)
+        new_items.append(inventory_item.model_dump(exclude={"id"}))
+    
+    # One multi-row INSERT ... RETURNING for the whole batch: the created rows
+    # (with IDs) come back in request order, so nothing has to be reloaded
+    created_items = []
+    if new_items:
+        result = await session.scalars(
+            insert(Inventory).returning(Inventory, sort_by_parameter_order=True),
+            new_items,
+        )
+        created_items = result.all()
+    await apply_vault_delta(session, user_id, [item.id for item in created_items])
     
     # Get wallet for transaction (balance doesn't change, but we need it for transaction record)
-    wallet = await get_wallet(session, user_id, commit=False)
+    wallet = await get_or_create_wallet(session, user_id)
     
     # Create transaction record for submission
-    total_value = sum(item["value"] for item in items_details)
     description = f"Submitted {len(created_items)} item(s) to inventory"
     if len(created_items) == 1:
         description = f"Submitted {created_items[0].name} to inventory"
@@ -133,7 +163,7 @@ async def create_inventory_items(
         user_id=user_id,
         transaction_type=TransactionType.SUBMIT,
         description=description,
-        amount=0.0,  # No money change for submission
+        amount=ZERO,  # No money change for submission
         balance_after=wallet.balance,
         transaction_data={
             "items_count": len(created_items),
@@ -142,89 +172,108 @@ async def create_inventory_items(
     )
     session.add(transaction)
     
-    await session.commit()
+    # Queue the confirmation email in the same transaction, so the outbox
+    # worker sends it if and only if the submission commits
+    email_queued = False
+    if principal.email:
+        # Assign the transaction ID used as the vault ID
+        await session.flush()
+        
+        # Prepare items_details with item_data for email formatting
+        email_items_details = []
+        for i, item_detail in enumerate(items_details):
+            email_item = item_detail.copy()
+            # Add item_data from the corresponding created item if available
+            if i < len(created_items) and created_items[i].item_data:
+                email_item["item_data"] = created_items[i].item_data
+            email_items_details.append(email_item)
+        
+        email_queued = queue_vault_confirmation_email(
+            session,
+            user_id,
+            principal.email,
+            principal.name or "User",
+            email_items_details,
+            f"VLT-{transaction.id}",
+        )
     
-    # Refresh all items and transaction to get their IDs
-    for item in created_items:
-        await session.refresh(item)
-    await session.refresh(transaction)
+    # Store the response for retries in the same commit
+    await idempotency.save([InventoryItemResponse.model_validate(item) for item in created_items])
+    await session.commit()
     
-    # Send confirmation email (non-blocking - don't fail request if email fails)
-    if authorization:
-        try:
-            user_email = get_user_email_from_token(authorization)
-            user_name = get_user_name_from_token(authorization) or "User"
-            
-            # Generate vault ID from transaction ID
-            vault_id = f"VLT-{transaction.id}" if transaction.id else f"VLT-{user_id[:8]}"
-            
-            # Prepare items_details with item_data for email formatting
-            email_items_details = []
-            for i, item_detail in enumerate(items_details):
-                email_item = item_detail.copy()
-                # Add item_data from the corresponding created item if available
-                if i < len(created_items) and created_items[i].item_data:
-                    email_item["item_data"] = created_items[i].item_data
-                email_items_details.append(email_item)
-            
-            # Send email asynchronously (fire and forget)
-            # Run in background thread to avoid blocking the response
-            asyncio.create_task(
-                asyncio.to_thread(
-                    send_vault_confirmation_email,
-                    user_email,
-                    user_name,
-                    email_items_details,
-                    vault_id
-                )
-            )
-        except Exception as e:
-            # Log error but don't fail the request
-            logger.error(f"Failed to send vault confirmation email: {str(e)}", exc_info=True)
+    if email_queued:
+        email_outbox_worker.notify()
     
     return created_items
 
 
-@router.get("/vault", response_model=List[InventoryItemResponse])
+@router.get("/vault", response_model=List[VaultItemResponse])
 async def get_vault(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100, description="Number of results"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    include_data: bool = Query(False, description="Include the full item_data JSON"),
     session: AsyncSession = Depends(get_session),
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_current_user_id)
 ):
-    """Get user's vault items (items with VAULTED status)."""
-    result = await session.execute(
-        select(Inventory).where(
-            Inventory.user_id == user_id,
-            Inventory.status == Status.VAULTED
-        ).order_by(Inventory.vaulted_at.desc())
+    """
+    Get user's vault items (items with VAULTED status), most recently vaulted first.
+    
+    Returns a summary of each item - set, condition and market price are
+    extracted from item_data in SQL - and the full item_data only with
+    include_data=true. Keyset paginated on (vaulted_at, id): pass the
+    X-Next-Cursor response header back as `cursor`.
+    """
+    columns = VAULT_SUMMARY_COLUMNS + ([Inventory.item_data] if include_data else [])
+    query = select(*columns).where(
+        Inventory.user_id == user_id,
+        Inventory.status == Status.VAULTED
+    )
+    
+    # Resume after the last row of the previous page
+    after = get_cursor_values(cursor, "inventory:vault")
+    if after:
+        query = query.where(seek_after(
+            [(Inventory.vaulted_at, after[0]), (Inventory.id, after[1])],
+            nullable=True,
+        ))
+    
+    # Served by the (user_id, status, vaulted_at, id) index; fetch one extra row
+    # to know whether another page exists
+    query = query.order_by(
+        Inventory.vaulted_at.desc().nulls_last(),
+        Inventory.id.desc(),
+    ).limit(limit + 1)
+    
+    result = await session.execute(query)
+    rows = result.mappings().all()
+    
+    return page_with_cursor(
+        rows, limit, response, "inventory:vault",
+        lambda row: [row["vaulted_at"], row["id"]],
     )
-    items = result.scalars().all()
-    return items
 
 
 @router.delete("/items", response_model=Dict[str, Any])
 async def delete_inventory_items(
     item_ids: str = Query(..., alias="item_ids", description="Comma-separated list of item IDs"),
     session: AsyncSession = Depends(get_session),
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_current_user_id)
 ):
     """Delete multiple inventory items for the authenticated user."""
     # Parse comma-separated item IDs
     try:
-        parsed_ids = [int(id_str.strip()) for id_str in item_ids.split(',') if id_str.strip()]
+        # Deduplicated (order kept) so repeated IDs don't fail the count check below
+        parsed_ids = list(dict.fromkeys(int(id_str.strip()) for id_str in item_ids.split(',') if id_str.strip()))
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid item IDs format")
     
     if not parsed_ids:
         raise HTTPException(status_code=400, detail="No item IDs provided")
     
-    # Verify all items belong to the user
-    result = await session.execute(
-        select(Inventory).where(
-            Inventory.id.in_(parsed_ids),
-            Inventory.user_id == user_id
-        )
-    )
-    items = result.scalars().all()
+    # One DELETE for all items; ownership is checked by the row count
+    # (nothing is committed on a mismatch)
+    items = await delete_items(session, user_id, parsed_ids)
     
     if len(items) != len(parsed_ids):
         raise HTTPException(
@@ -232,7 +281,7 @@ async def delete_inventory_items(
             detail="One or more items not found or do not belong to user"
         )
     
-    # Store card details before deletion for transaction
+    # Card details from the deleted rows for the transaction
     items_details = []
     for item in items:
         card_value = 0.0
@@ -241,12 +290,12 @@ async def delete_inventory_items(
         
         items_details.append({
             "name": item.name,
-            "value": float(card_value),
+            "value": money_str(card_value),
             "image_url": item.image_url,
         })
     
     # Get wallet for transaction (balance doesn't change, but we need it for transaction record)
-    wallet = await get_wallet(session, user_id, commit=False)
+    wallet = await get_or_create_wallet(session, user_id)
     
     # Create transaction record for redemption
     description = f"Redeemed {len(items)} item(s) from inventory"
@@ -258,7 +307,7 @@ async def delete_inventory_items(
             user_id=user_id,
             transaction_type=TransactionType.REDEEM,
             description=description,
-            amount=0.0,  # No money change for redemption
+            amount=ZERO,  # No money change for redemption
             balance_after=wallet.balance,
             transaction_data={
                 "items_count": len(items),
@@ -266,11 +315,6 @@ async def delete_inventory_items(
             }
         )
         session.add(transaction)
-        
-        # Delete all items
-        for item in items:
-            await session.delete(item)
-        
         await session.commit()
     except Exception as e:
         await session.rollback()
@@ -282,10 +326,89 @@ async def delete_inventory_items(
     return {"message": f"Successfully deleted {len(items)} item(s)", "deleted_count": len(items)}
 
 
-@router.get("/search")
-async def search_items():
-    """Search inventory items."""
-    # TODO: Implement search logic
-    return {"items": []}
+@router.get("/summary", response_model=VaultSummaryResponse)
+async def get_vault_summary(
+    session: AsyncSession = Depends(get_session),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Get the number of vaulted items and their total value at current card prices.
+    
+    Served from the precomputed per-user summary (see app.valuation).
+    """
+    summary = await session.get(VaultSummary, user_id)
+    if summary is None:
+        return VaultSummaryResponse(item_count=0, total_value=0.0, updated_at=None)
+    return summary
 
 
+@router.get("/search", response_model=List[InventoryItemResponse])
+async def search_items(
+    response: Response,
+    q: Optional[str] = Query(None, description="Name search: substring/prefix, typo-tolerant"),
+    item_status: Optional[Status] = Query(None, alias="status", description="Filter by status, e.g. vaulted"),
+    collectible_type: Optional[str] = Query(None, description="Filter by collectible type, e.g. card"),
+    set_name: Optional[str] = Query(None, alias="set", description="Filter by item_data set"),
+    rarity: Optional[str] = Query(None, description="Filter by item_data rarity"),
+    condition: Optional[str] = Query(None, description="Filter by item_data condition"),
+    limit: int = Query(50, ge=1, le=100, description="Number of results"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_session),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Search the user's inventory items, newest first.
+    
+    Supports:
+    - Name matching by substring/prefix or trigram similarity (typos), served
+      by the name trigram index
+    - Exact filters on status and collectible_type (composite
+      (user_id, status, created_at, id) index)
+    - Exact item_data attributes (set, rarity, condition) via jsonb
+      containment on the GIN-indexed item_data
+    - Keyset pagination: pass the X-Next-Cursor response header back as `cursor`
+    """
+    query = select(Inventory).where(Inventory.user_id == user_id)
+    
+    if item_status:
+        query = query.where(Inventory.status == item_status)
+    if collectible_type:
+        query = query.where(Inventory.collectible_type == collectible_type)
+    
+    attributes = {
+        key: value
+        for key, value in (("set", set_name), ("rarity", rarity), ("condition", condition))
+        if value
+    }
+    if attributes:
+        query = query.where(ITEM_DATA_JSONB.contains(attributes))
+    
+    if q and q.strip():
+        term = q.strip()
+        query = query.where(or_(
+            Inventory.name.ilike(f"%{escape_like(term)}%", escape="\\"),
+            Inventory.name.op("%")(term),  # pg_trgm similarity: "charzard" finds "Charizard"
+        ))
+    
+    # Resume after the last row of the previous page
+    after = get_cursor_values(cursor, "inventory:search")
+    if after:
+        query = query.where(seek_after(
+            [(Inventory.created_at, after[0]), (Inventory.id, after[1])],
+            nullable=True,
+        ))
+    
+    # Newest first (id breaks ties, rows without created_at last); fetch one
+    # extra row to know whether another page exists
+    query = query.order_by(
+        Inventory.created_at.desc().nulls_last(),
+        Inventory.id.desc(),
+    ).limit(limit + 1)
+    
+    result = await session.execute(query)
+    items = result.scalars().all()
+    
+    return page_with_cursor(
+        items, limit, response, "inventory:search",
+        lambda item: [item.created_at, item.id],
+    )
@@ -1,25 +1,20 @@
 """Trade router for atomic swap engine."""
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from sqlmodel import SQLModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from app.database import get_session
-from app.models import Inventory, Wallet, Status, Transaction, TransactionType
-from app.auth import get_user_id_from_token
+from app.models import Inventory, Status, Transaction, TransactionType
+from app.auth import get_current_user_id
+from app.idempotency import IdempotentRequest, get_idempotent_request
+from app.inventory_items import delete_items
+from app.valuation import apply_vault_delta
+from app.wallets import ZERO, InsufficientBalanceError, MoneyAmount, change_balance, money_str
 
 router = APIRouter(prefix="/trade", tags=["trade"])
 
 
-# Auth helper
-async def get_user_id(authorization: Optional[str] = Header(None)) -> str:
-    """Get user ID from Authorization header."""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization")
-    return get_user_id_from_token(authorization)
-
-
 # Request models
 class ReceiveItem(SQLModel):
     """Item being received in trade."""
@@ -33,8 +28,8 @@ class SwapRequest(SQLModel):
     """Request model for atomic swap."""
     give_items: List[int]  # List of inventory item IDs to remove
     receive_items: List[ReceiveItem]  # List of items to add
-    give_money: float = 0.0  # Money being given
-    receive_money: float = 0.0  # Money being received
+    give_money: MoneyAmount = ZERO  # Money being given
+    receive_money: MoneyAmount = ZERO  # Money being received
 
 
 class SwapResponse(SQLModel):
@@ -42,38 +37,15 @@ class SwapResponse(SQLModel):
     message: str
     removed_items_count: int
     added_items_count: int
-    wallet_balance: float
-
-
-# Get or create wallet helper (reused from wallet router)
-async def get_wallet(session: AsyncSession, user_id: str, commit: bool = False) -> Wallet:
-    """
-    Get wallet, create if doesn't exist.
-    
-    Args:
-        session: Database session
-        user_id: User ID
-        commit: If True, commit immediately (for standalone use). 
-                If False, add to session without committing (for use in transactions)
-    """
-    result = await session.execute(select(Wallet).where(Wallet.user_id == user_id))
-    wallet = result.scalar_one_or_none()
-    
-    if not wallet:
-        wallet = Wallet(user_id=user_id, balance=0.0)
-        session.add(wallet)
-        if commit:
-            await session.commit()
-            await session.refresh(wallet)
-    
-    return wallet
+    wallet_balance: float  # Serialized as a JSON number; the stored balance is exact
 
 
 @router.post("/swap", response_model=SwapResponse)
 async def atomic_swap(
     request: SwapRequest,
     session: AsyncSession = Depends(get_session),
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_current_user_id),
+    idempotency: IdempotentRequest = Depends(get_idempotent_request)
 ):
     """
     Execute an atomic swap (demo version).
@@ -82,7 +54,12 @@ async def atomic_swap(
     - Removes items being given from user's inventory
     - Adds items being received to user's inventory
     - Updates wallet balance (subtracts give_money, adds receive_money)
+    
+    A retry with the same Idempotency-Key returns the first response instead of swapping again.
     """
+    if idempotency.replay:
+        return idempotency.replay
+    
     # Validate request
     if not request.give_items and not request.receive_items and request.give_money == 0 and request.receive_money == 0:
         raise HTTPException(
@@ -98,25 +75,22 @@ async def atomic_swap(
     
     # Step 1: Verify and remove items being given
     removed_count = 0
-    give_items_details = []  # Store card details before deletion
-    if request.give_items:
-        # Verify all items belong to the user
-        result = await session.execute(
-            select(Inventory).where(
-                Inventory.id.in_(request.give_items),
-                Inventory.user_id == user_id
-            )
-        )
-        items_to_remove = result.scalars().all()
+    give_items_details = []  # Card details of the deleted items
+    # Deduplicated (order kept) so repeated IDs don't fail the count check below
+    give_item_ids = list(dict.fromkeys(request.give_items))
+    if give_item_ids:
+        # One DELETE for all items; ownership is checked by the row count
+        # (the transaction is rolled back on a mismatch)
+        removed_items = await delete_items(session, user_id, give_item_ids)
         
-        if len(items_to_remove) != len(request.give_items):
+        if len(removed_items) != len(give_item_ids):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="One or more items not found or do not belong to user"
             )
         
-        # Store card details before deletion
-        for item in items_to_remove:
+        # Card details from the deleted rows
+        for item in removed_items:
             card_value = 0.0
             if item.item_data and isinstance(item.item_data, dict):
                 # Try to get market_price from item_data
@@ -124,14 +98,14 @@ async def atomic_swap(
             
             give_items_details.append({
                 "name": item.name,
-                "value": float(card_value),
+                "value": money_str(card_value),
                 "image_url": item.image_url,
             })
-            await session.delete(item)
-        removed_count = len(items_to_remove)
+        removed_count = len(removed_items)
     
     # Step 2: Add items being received
     added_count = 0
+    received_items = []
     receive_items_details = []  # Store card details
     if request.receive_items:
         for receive_item in request.receive_items:
@@ -142,7 +116,7 @@ async def atomic_swap(
             
             receive_items_details.append({
                 "name": receive_item.name,
-                "value": float(card_value),
+                "value": money_str(card_value),
                 "image_url": receive_item.image_url,
             })
             
@@ -160,26 +134,28 @@ async def atomic_swap(
                 vaulted_at=datetime.utcnow(),
             )
             session.add(new_item)
+            received_items.append(new_item)
             added_count += 1
+        
+        # Assign IDs, then add the received items to the vault summary
+        await session.flush()
+        await apply_vault_delta(session, user_id, [item.id for item in received_items])
     
     # Step 3: Update wallet balance
-    # Don't commit wallet creation separately - include in main transaction
-    wallet = await get_wallet(session, user_id, commit=False)
-    
-    # Validate sufficient balance for money being given
-    if request.give_money > 0:
-        if wallet.balance < request.give_money:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient balance. Current: ${wallet.balance:.2f}, Required: ${request.give_money:.2f}"
-            )
-        wallet.balance -= request.give_money
-    
-    # Add money being received
-    if request.receive_money > 0:
-        wallet.balance += request.receive_money
-    
-    wallet.updated_at = datetime.utcnow()
+    # One atomic UPDATE in the main transaction: the balance check for
+    # give_money can't race with a concurrent withdrawal or swap
+    try:
+        wallet_balance = await change_balance(
+            session,
+            user_id,
+            request.receive_money - request.give_money,
+            required=request.give_money,
+        )
+    except InsufficientBalanceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Insufficient balance. Current: ${e.balance:.2f}, Required: ${request.give_money:.2f}"
+        )
     
     # Step 4: Create transaction record
     # Calculate net money change
@@ -210,23 +186,30 @@ async def atomic_swap(
         transaction_type=TransactionType.TRADE,
         description=description,
         amount=net_money_change,  # Positive if received more, negative if gave more
-        balance_after=wallet.balance,
+        balance_after=wallet_balance,
         transaction_data={
-            "give_items": request.give_items,
+            "give_items": give_item_ids,
             "give_items_details": give_items_details,  # Card names, values, images
             "receive_items_count": added_count,
             "receive_items_details": receive_items_details,  # Card names, values, images
-            "give_money": request.give_money,
-            "receive_money": request.receive_money,
+            "give_money": money_str(request.give_money),
+            "receive_money": money_str(request.receive_money),
             "removed_items_count": removed_count,
         }
     )
     session.add(transaction)
     
-    # Commit all changes atomically
+    response = SwapResponse(
+        message="Swap completed successfully",
+        removed_items_count=removed_count,
+        added_items_count=added_count,
+        wallet_balance=wallet_balance
+    )
+    
+    # Commit all changes atomically (with the stored response for retries)
     try:
+        await idempotency.save(response)
         await session.commit()
-        await session.refresh(wallet)
     except Exception as e:
         await session.rollback()
         raise HTTPException(
@@ -234,11 +217,6 @@ async def atomic_swap(
             detail=f"Failed to complete swap: {str(e)}"
         )
     
-    return SwapResponse(
-        message="Swap completed successfully",
-        removed_items_count=removed_count,
-        added_items_count=added_count,
-        wallet_balance=wallet.balance
-    )
+    return response
 
 
@@ -1,5 +1,5 @@
 """Transactions router for viewing transaction history."""
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 from sqlmodel import SQLModel
@@ -7,19 +7,12 @@ from typing import Optional, List
 from datetime import datetime
 from app.database import get_session
 from app.models import Transaction, TransactionType
-from app.auth import get_user_id_from_token
+from app.auth import get_current_user_id
+from app.pagination import get_cursor_values, page_with_cursor, seek_after
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 
-# Auth helper
-async def get_user_id(authorization: Optional[str] = Header(None)) -> str:
-    """Get user ID from Authorization header."""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization")
-    return get_user_id_from_token(authorization)
-
-
 # Response models
 class TransactionResponse(SQLModel):
     """Response model for transaction."""
@@ -35,13 +28,15 @@ class TransactionResponse(SQLModel):
 
 @router.get("", response_model=List[TransactionResponse])
 async def get_transactions(
+    response: Response,
     limit: int = Query(50, ge=1, le=100, description="Number of results"),
-    offset: int = Query(0, ge=0, description="Pagination offset"),
+    offset: int = Query(0, ge=0, description="Pagination offset (ignored when cursor is given)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
     transaction_type: Optional[TransactionType] = Query(None, description="Filter by transaction type"),
     session: AsyncSession = Depends(get_session),
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_current_user_id)
 ):
-    """Get user's transaction history."""
+    """Get user's transaction history (keyset paginated on created_at, id)."""
     query = select(Transaction).where(
         Transaction.user_id == user_id
     )
@@ -50,13 +45,26 @@ async def get_transactions(
     if transaction_type:
         query = query.where(Transaction.transaction_type == transaction_type)
     
-    # Order by most recent first
-    query = query.order_by(desc(Transaction.created_at))
+    # Resume after the last row of the previous page
+    after = get_cursor_values(cursor, "transactions")
+    if after:
+        query = query.where(seek_after([
+            (Transaction.created_at, after[0]),
+            (Transaction.id, after[1]),
+        ]))
     
-    # Pagination
-    query = query.limit(limit).offset(offset)
+    # Order by most recent first (id breaks ties between same-timestamp rows)
+    query = query.order_by(desc(Transaction.created_at), desc(Transaction.id))
+    
+    # Pagination: fetch one extra row to know whether another page exists
+    query = query.limit(limit + 1)
+    if not cursor:
+        query = query.offset(offset)
     
     result = await session.execute(query)
     transactions = result.scalars().all()
     
-    return transactions
+    return page_with_cursor(
+        transactions, limit, response, "transactions",
+        lambda transaction: [transaction.created_at, transaction.id],
+    )
@@ -0,0 +1,111 @@
+"""
+Per-user vault value at current catalog prices.
+
+`vault_summaries` holds each user's vaulted item count and total market
+value. Writes that add or remove vaulted items apply a delta for just those
+items in their own transaction (deletes in the DELETE statement itself, see
+app.inventory_items); the card sync recomputes every summary after prices
+change. Reading a vault's value is then a primary key lookup instead of a
+pass over the user's items.
+
+Items are priced by joining `inventory.external_id` to the card catalog:
+the Pokemon TCG API id, or the catalog row id (what the app stores when
+submitting from card search). Items without a priced card count as 0.
+"""
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Current price of inventory item `i`, rounded to cents per item so deltas
+# and full recomputes add up to the same total. The CASE keeps the integer
+# cast away from non-numeric external ids.
+ITEM_PRICE_SQL = """
+round(COALESCE(
+    (SELECT c.market_price FROM pokemon_cards AS c WHERE c.external_id = i.external_id),
+    CASE WHEN i.external_id ~ '^[0-9]{1,9}$' THEN
+        (SELECT c.market_price FROM pokemon_cards AS c WHERE c.id = i.external_id::integer)
+    END,
+    0
+)::numeric, 2)
+"""
+
+# Taken before a recompute. SHARE ROW EXCLUSIVE conflicts with the ROW
+# EXCLUSIVE lock every delta write takes, so it waits for in-flight vault
+# writes to commit and blocks new ones until the recompute commits. Without
+# it a recompute could overwrite a delta committed after its snapshot.
+LOCK_VAULT_SUMMARIES_SQL = "LOCK TABLE vault_summaries IN SHARE ROW EXCLUSIVE MODE"
+
+# Recompute every summary; users whose vault emptied are reset to zero.
+# Rows that didn't change are left untouched to keep WAL small. Run after
+# LOCK_VAULT_SUMMARIES_SQL in the same transaction, as a separate statement
+# so its snapshot includes the writes the lock waited for.
+REFRESH_VAULT_SUMMARIES_SQL = f"""
+WITH totals AS (
+    SELECT i.user_id, count(*) AS item_count, sum({ITEM_PRICE_SQL}) AS total_value
+    FROM inventory AS i
+    WHERE i.status = 'VAULTED'
+    GROUP BY i.user_id
+)
+INSERT INTO vault_summaries (user_id, item_count, total_value, updated_at)
+SELECT
+    COALESCE(t.user_id, s.user_id),
+    COALESCE(t.item_count, 0),
+    COALESCE(t.total_value, 0),
+    now() AT TIME ZONE 'utc'
+FROM totals AS t
+FULL OUTER JOIN vault_summaries AS s ON s.user_id = t.user_id
+ON CONFLICT (user_id) DO UPDATE
+SET item_count = EXCLUDED.item_count,
+    total_value = EXCLUDED.total_value,
+    updated_at = EXCLUDED.updated_at
+WHERE (vault_summaries.item_count, vault_summaries.total_value)
+    IS DISTINCT FROM (EXCLUDED.item_count, EXCLUDED.total_value)
+"""
+
+APPLY_VAULT_DELTA_SQL = f"""
+INSERT INTO vault_summaries (user_id, item_count, total_value, updated_at)
+SELECT
+    CAST(:user_id AS VARCHAR),
+    CAST(:sign AS INTEGER) * count(*),
+    CAST(:sign AS INTEGER) * COALESCE(sum({ITEM_PRICE_SQL}), 0),
+    now() AT TIME ZONE 'utc'
+FROM inventory AS i
+WHERE i.id = ANY(:item_ids) AND i.user_id = :user_id AND i.status = 'VAULTED'
+ON CONFLICT (user_id) DO UPDATE
+SET item_count = vault_summaries.item_count + EXCLUDED.item_count,
+    total_value = vault_summaries.total_value + EXCLUDED.total_value,
+    updated_at = EXCLUDED.updated_at
+"""
+
+
+async def apply_vault_delta(session: AsyncSession, user_id: str, item_ids: List[int], sign: int = 1) -> None:
+    """
+    Add (sign=1) or subtract (sign=-1) vaulted items from the user's summary.
+
+    Call after the items are inserted (flushed); deletes go through
+    `app.inventory_items.delete_items`. Only rows that exist and are VAULTED
+    at that point are counted. Does not commit, so the summary changes together with the items.
+    """
+    if not item_ids:
+        return
+    await session.execute(
+        text(APPLY_VAULT_DELTA_SQL),
+        {"user_id": user_id, "item_ids": list(item_ids), "sign": sign},
+    )
+
+
+async def refresh_vault_summaries(session: AsyncSession) -> int:
+    """
+    Recompute all vault summaries at current card prices.
+
+    Call after a sync has committed its price changes. Vault writes wait
+    until the recompute commits. Commits on success.
+
+    Returns:
+        Number of summaries that changed
+    """
+    await session.execute(text(LOCK_VAULT_SUMMARIES_SQL))
+    result = await session.execute(text(REFRESH_VAULT_SUMMARIES_SQL))
+    await session.commit()
+    return result.rowcount
+
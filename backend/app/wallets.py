@@ -0,0 +1,153 @@
+"""Wallet get-or-create and atomic balance updates shared by the routers."""
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Optional
+from pydantic import condecimal
+from sqlalchemy import exists, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Wallet
+
+
+# Money in request bodies: exact decimal with at most 2 decimal places, in the
+# range of the Numeric(12, 2) balance/amount columns. JSON numbers are parsed
+# from their text (10.1 -> Decimal("10.1")), never through binary floats.
+MoneyAmount = condecimal(max_digits=12, decimal_places=2)
+
+ZERO = Decimal("0.00")
+
+
+def money_str(value: Any) -> str:
+    """
+    Money for JSON records such as `transaction_data`: exact cents as a
+    string ("10.10"), so the amount is never rounded through a binary float.
+    Catalog prices (floats in item_data) are converted from their repr.
+    """
+    return str(Decimal(str(value)).quantize(ZERO))
+
+
+class InsufficientBalanceError(Exception):
+    """The wallet balance is lower than the amount being taken out."""
+
+    def __init__(self, balance: Decimal, required: Decimal):
+        super().__init__(f"Insufficient balance: {balance:.2f} < {required:.2f}")
+        self.balance = balance
+        self.required = required
+
+
+async def get_or_create_wallet(session: AsyncSession, user_id: str, commit: bool = False) -> Wallet:
+    """
+    Get the user's wallet, creating an empty one if it doesn't exist.
+    
+    One round trip, race-free thanks to the unique wallets.user_id index:
+    
+        WITH existing AS (SELECT ... WHERE user_id = :user_id),
+             inserted AS (INSERT ... SELECT ... WHERE NOT EXISTS (SELECT FROM existing)
+                          ON CONFLICT (user_id) DO NOTHING RETURNING ...)
+        SELECT * FROM existing UNION ALL SELECT * FROM inserted
+    
+    The INSERT is only attempted when no wallet exists, so the common case
+    doesn't consume id sequence values.
+    
+    Args:
+        session: Database session
+        user_id: User ID
+        commit: If True, commit immediately (for standalone use).
+                If False, leave the insert in the caller's transaction
+    """
+    wallets = Wallet.__table__
+    now = datetime.utcnow()
+    existing = select(wallets).where(wallets.c.user_id == user_id).cte("existing")
+    new_wallet = select(
+        literal(user_id, wallets.c.user_id.type),
+        literal(0, wallets.c.balance.type),
+        literal(now, wallets.c.created_at.type),
+        literal(now, wallets.c.updated_at.type),
+    ).where(~exists(select(existing.c.id)))
+    inserted = (
+        pg_insert(wallets)
+        .from_select(["user_id", "balance", "created_at", "updated_at"], new_wallet)
+        .on_conflict_do_nothing(index_elements=["user_id"])
+        .returning(*wallets.c)
+        .cte("inserted")
+    )
+    stmt = select(existing).union_all(select(inserted))
+    result = await session.execute(select(Wallet).from_statement(stmt))
+    wallet = result.scalars().first()
+    
+    if wallet is None:
+        # Lost a race with a concurrent first request: its wallet committed
+        # after this statement's snapshot was taken, so read it again
+        result = await session.execute(select(Wallet).where(Wallet.user_id == user_id))
+        wallet = result.scalar_one()
+    
+    if commit:
+        await session.commit()
+    return wallet
+
+
+async def adjust_balance(
+    session: AsyncSession,
+    user_id: str,
+    delta: Decimal,
+    required: Decimal = ZERO,
+) -> Optional[Decimal]:
+    """
+    Add `delta` to the user's balance if the balance is at least `required`.
+
+    One `UPDATE wallets SET balance = balance + :delta ... WHERE balance >= :required
+    RETURNING balance` statement: the check and the write can't interleave with
+    another request. Concurrent updates to the same wallet wait for its row lock
+    and re-check the condition against the committed balance; other wallets
+    are unaffected. Does not commit.
+
+    Returns:
+        The new balance, or None if the wallet doesn't exist or holds less than `required`
+    """
+    result = await session.execute(
+        update(Wallet)
+        .where(Wallet.user_id == user_id, Wallet.balance >= required)
+        .values(balance=Wallet.balance + delta, updated_at=datetime.utcnow())
+        .returning(Wallet.balance)
+    )
+    return result.scalar_one_or_none()
+
+
+async def change_balance(
+    session: AsyncSession,
+    user_id: str,
+    delta: Decimal,
+    required: Decimal = ZERO,
+) -> Decimal:
+    """
+    Atomically apply a balance change, creating the wallet on first use.
+
+    Args:
+        delta: Amount to add (negative to take money out)
+        required: Minimum balance before the change (the amount taken out)
+
+    Returns:
+        The new balance
+
+    Raises:
+        InsufficientBalanceError: The balance is lower than `required`
+    """
+    balance = await adjust_balance(session, user_id, delta, required)
+    if balance is not None:
+        return balance
+
+    # Slow path: find out why nothing was updated
+    result = await session.execute(select(Wallet.balance).where(Wallet.user_id == user_id))
+    current = result.scalar_one_or_none()
+    if current is None:
+        if required > 0:
+            raise InsufficientBalanceError(ZERO, required)
+        await get_or_create_wallet(session, user_id)
+    elif current < required:
+        raise InsufficientBalanceError(current, required)
+
+    # New wallet, or the balance changed since the UPDATE - try once more
+    balance = await adjust_balance(session, user_id, delta, required)
+    if balance is None:
+        raise InsufficientBalanceError(current or ZERO, required)
+    return balance
@@ -0,0 +1,146 @@
+"""
+Benchmark event-loop lag caused by JWT verification under a burst of logins.
+
+Fires a burst of concurrent requests carrying distinct, valid tokens (so
+every one is a claims-cache miss) through the get_token_claims dependency,
+while a probe task measures how late the event loop wakes it up. Compares
+verification inline on the event loop with AUTH_VERIFY_IN_THREADPOOL.
+
+Runs fully in-process: a throwaway key pair is generated and loaded into
+the JWKS key store, so no Supabase project or network access is needed.
+
+Usage:
+    python scripts/bench_auth_event_loop.py
+    python scripts/bench_auth_event_loop.py --tokens 2000 --concurrency 200 --alg ES256
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jwt.algorithms import ECAlgorithm, RSAAlgorithm
+from app import auth
+from app.config import settings
+
+BENCH_KID = "bench-key"
+PROBE_INTERVAL = 0.001  # Seconds the lag probe sleeps between samples
+
+
+def make_tokens(alg: str, count: int) -> List[str]:
+    """Load a throwaway public key into the JWKS store and mint `count` distinct tokens."""
+    if alg == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        jwk = json.loads(ECAlgorithm.to_jwk(private_key.public_key()))
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid=BENCH_KID, alg=alg, use="sig")
+
+    # Keys are loaded in-process; the URL only has to be non-empty
+    auth.jwks_store.url = auth.jwks_store.url or "in-process"
+    auth.jwks_store.load({"keys": [jwk]})
+
+    now = int(time.time())
+    return [
+        jwt.encode(
+            {
+                "sub": f"bench-user-{i}",
+                "aud": "authenticated",
+                "iss": f"{settings.SUPABASE_URL}/auth/v1",
+                "iat": now,
+                "exp": now + 3600,
+                "email": f"bench-user-{i}@example.com",
+            },
+            private_key,
+            algorithm=alg,
+            headers={"kid": BENCH_KID},
+        )
+        for i in range(count)
+    ]
+
+
+async def probe_lag(samples: List[float], stop: asyncio.Event) -> None:
+    """Record how much later than requested the loop resumes a short sleep."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - started - PROBE_INTERVAL))
+
+
+async def run_burst(tokens: List[str], concurrency: int) -> Dict[str, float]:
+    """Verify every token with `concurrency` requests in flight."""
+    auth.claims_cache.clear()
+    lag: List[float] = []
+    latencies: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(lag, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 5)
+
+    remaining = iter(tokens)
+
+    async def client() -> None:
+        for token in remaining:
+            started = time.perf_counter()
+            await auth.get_token_claims(f"Bearer {token}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    lag.sort()
+    latencies.sort()
+    return {
+        "verifications_per_second": len(tokens) / elapsed,
+        "request_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "request_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "lag_mean_ms": statistics.fmean(lag) * 1000,
+        "lag_p99_ms": lag[int(len(lag) * 0.99)] * 1000,
+        "lag_max_ms": lag[-1] * 1000,
+        "lag_samples": len(lag),
+    }
+
+
+async def main(tokens: int, concurrency: int, alg: str, workers: int) -> None:
+    print(f"🔑 Minting {tokens} {alg} tokens...")
+    token_list = make_tokens(alg, tokens)
+    settings.AUTH_VERIFY_MAX_WORKERS = workers
+
+    results = {}
+    for label, threadpool in (("event loop", False), (f"threadpool x{workers}", True)):
+        print(f"⏱️  Verifying on the {label}...")
+        settings.AUTH_VERIFY_IN_THREADPOOL = threadpool
+        results[label] = await run_burst(token_list, concurrency)
+    auth.shutdown_verify_executor()
+
+    print(
+        f"\n{'mode':<16} {'verify/s':>9} {'req p50 ms':>11} {'req p99 ms':>11} "
+        f"{'lag mean ms':>12} {'lag p99 ms':>11} {'lag max ms':>11} {'probes':>7}"
+    )
+    for label, stats in results.items():
+        print(
+            f"{label:<16} {stats['verifications_per_second']:>9.0f} {stats['request_p50_ms']:>11.2f} "
+            f"{stats['request_p99_ms']:>11.2f} {stats['lag_mean_ms']:>12.2f} {stats['lag_p99_ms']:>11.2f} "
+            f"{stats['lag_max_ms']:>11.2f} {stats['lag_samples']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure event-loop lag during a burst of JWT verifications")
+    parser.add_argument("--tokens", type=int, default=1000, help="Distinct tokens to verify per mode")
+    parser.add_argument("--concurrency", type=int, default=100, help="Requests in flight at once")
+    parser.add_argument("--alg", choices=["RS256", "ES256"], default="RS256", help="Signing algorithm")
+    parser.add_argument("--workers", type=int, default=settings.AUTH_VERIFY_MAX_WORKERS, help="Verification threads")
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.concurrency, args.alg, args.workers))
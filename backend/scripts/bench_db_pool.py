@@ -0,0 +1,187 @@
+"""
+Benchmark per-request database latency for each DATABASE_POOL_MODE.
+
+Simulates hot request paths (open a session, run the endpoint's query, close
+the session) against DATABASE_URL and reports latency percentiles per
+configuration:
+
+- wallet: /wallet/balance - wallet lookup by user_id
+- vault:  /inventory/vault - first page of a user's vault summaries
+- card:   /cards/{id} - card lookup by id (uncached path)
+
+Configurations are pool modes, optionally with "+cache" to enable the asyncpg
+prepared statement cache (DATABASE_STATEMENT_CACHE). Point DATABASE_URL at a
+local Postgres (or a Supabase session-mode endpoint) - transaction-mode URLs
+only support the plain "transaction" configuration.
+
+Usage:
+    python scripts/bench_db_pool.py
+    python scripts/bench_db_pool.py --requests 500 --concurrency 10 --configs transaction session session+cache
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import POOL_MODES, build_engine
+from app.models import Inventory, PokemonCard, Status, Wallet
+from app.routers.inventory import VAULT_SUMMARY_COLUMNS
+
+BENCH_USER_ID = "bench-db-pool-user"
+BENCH_VAULT_ITEMS = 50
+
+CONFIGS = list(POOL_MODES) + [f"{mode}+cache" for mode in POOL_MODES if mode != "transaction"]
+QUERIES: Dict[str, Callable[[int], object]] = {
+    "wallet": lambda card_id: select(Wallet).where(Wallet.user_id == BENCH_USER_ID),
+    "vault": lambda card_id: (
+        select(*VAULT_SUMMARY_COLUMNS)
+        .where(Inventory.user_id == BENCH_USER_ID, Inventory.status == Status.VAULTED)
+        .order_by(Inventory.vaulted_at.desc().nulls_last(), Inventory.id.desc())
+        .limit(51)
+    ),
+    "card": lambda card_id: select(PokemonCard).where(PokemonCard.id == card_id),
+}
+
+
+def parse_config(config: str) -> Tuple[str, bool]:
+    """'session+cache' -> ('session', True)"""
+    mode, _, cache = config.partition("+")
+    return mode, cache == "cache"
+
+
+async def seed(engine: AsyncEngine) -> int:
+    """
+    Create the benchmark user's wallet and vault items if missing.
+
+    Returns:
+        A card id to look up (0 if the catalog is empty)
+    """
+    async with AsyncSession(engine) as session:
+        result = await session.execute(select(Wallet).where(Wallet.user_id == BENCH_USER_ID))
+        if result.scalar_one_or_none() is None:
+            session.add(Wallet(user_id=BENCH_USER_ID))
+
+        result = await session.execute(
+            select(func.count()).select_from(Inventory).where(Inventory.user_id == BENCH_USER_ID)
+        )
+        for i in range(result.scalar() or 0, BENCH_VAULT_ITEMS):
+            session.add(Inventory(
+                user_id=BENCH_USER_ID,
+                name=f"Bench card {i}",
+                status=Status.VAULTED,
+                collectible_type="card",
+                item_data={"set": "Bench Set", "condition": "Near Mint"},
+                vaulted_at=datetime.utcnow(),
+            ))
+        await session.commit()
+
+        result = await session.execute(select(func.min(PokemonCard.id)))
+        return result.scalar() or 0
+
+
+async def run_requests(engine: AsyncEngine, query, requests: int, concurrency: int) -> List[float]:
+    """Run `requests` queries with `concurrency` in flight; returns latencies in ms."""
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            async with session_factory() as session:
+                result = await session.execute(query)
+                result.all()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Latency percentiles (ms) and throughput for one run."""
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "rps": len(ordered) / elapsed,
+    }
+
+
+async def bench_config(
+    config: str,
+    queries: List[str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Dict[str, Dict[str, float]]:
+    """Benchmark each query with a fresh engine for one configuration."""
+    mode, statement_cache = parse_config(config)
+    engine = build_engine(pool_mode=mode, echo=False, statement_cache=statement_cache)
+    results = {}
+    try:
+        card_id = await seed(engine)
+        for name in queries:
+            query = QUERIES[name](card_id)
+            await run_requests(engine, query, warmup, concurrency)
+            started = time.perf_counter()
+            latencies = await run_requests(engine, query, requests, concurrency)
+            results[name] = summarize(latencies, time.perf_counter() - started)
+    finally:
+        await engine.dispose()
+    return results
+
+
+async def main(configs: List[str], queries: List[str], requests: int, concurrency: int, warmup: int) -> None:
+    print(f"🏁 Benchmarking {', '.join(queries)}: {requests} requests each, concurrency {concurrency}")
+    results = {}
+    for config in configs:
+        print(f"⏱️  Running '{config}'...")
+        results[config] = await bench_config(config, queries, requests, concurrency, warmup)
+
+    print(f"\n{'query':<8} {'config':<16} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for name in queries:
+        for config in configs:
+            stats = results[config][name]
+            print(
+                f"{name:<8} {config:<16} {stats['mean']:>9.2f} {stats['p50']:>9.2f} {stats['p95']:>9.2f} "
+                f"{stats['p99']:>9.2f} {stats['rps']:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-request DB latency across pool modes")
+    parser.add_argument("--requests", type=int, default=300, help="Measured requests per query")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per query")
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        choices=CONFIGS,
+        default=["transaction", "session", "session+cache"],
+        help="Pool modes to compare; '+cache' enables the prepared statement cache",
+    )
+    parser.add_argument(
+        "--queries",
+        nargs="+",
+        choices=list(QUERIES),
+        default=list(QUERIES),
+        help="Request paths to benchmark",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.configs, args.queries, args.requests, args.concurrency, args.warmup))
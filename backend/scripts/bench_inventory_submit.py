@@ -0,0 +1,123 @@
+"""
+Benchmark POST /inventory/items latency by batch size.
+
+Submits batches of 1/10/100 items (configurable) through the real endpoint,
+in-process against DATABASE_URL, and reports latency percentiles and the
+number of SQL statements (database round trips) per submission. With a
+constant number of statements, latency should stay flat as batches grow.
+
+Uses a throwaway user (the auth dependency is overridden, no Supabase token
+needed) whose rows are deleted afterwards.
+
+Usage:
+    python scripts/bench_inventory_submit.py
+    python scripts/bench_inventory_submit.py --sizes 1 10 100 500 --requests 50
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import delete, event
+from app.auth import Principal, get_current_principal
+from app.database import async_session, engine
+from app.main import app
+from app.models import Inventory, Transaction, VaultSummary, Wallet
+
+BENCH_USER_ID = "bench-inventory-submit-user"
+
+
+class StatementCounter:
+    """Counts SQL statements sent by the app's engine."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+    def close(self) -> None:
+        event.remove(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+
+def make_items(size: int) -> List[Dict]:
+    return [
+        {
+            "name": f"Bench card {i}",
+            "image_url": f"https://images.example.com/bench/{i}.png",
+            "external_id": f"bench-{i}",
+            "external_api": "pokemon-tcg",
+            "item_data": {"set": "Bench Set", "rarity": "Rare", "condition": "Near Mint", "market_price": 1.5},
+        }
+        for i in range(size)
+    ]
+
+
+async def bench_size(client: httpx.AsyncClient, counter: StatementCounter, size: int, requests: int, warmup: int) -> Dict[str, float]:
+    """Submit `requests` batches of `size` items one after another."""
+    body = {"items": make_items(size)}
+    for _ in range(warmup):
+        (await client.post("/inventory/items", json=body)).raise_for_status()
+
+    latencies = []
+    counter.count = 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.post("/inventory/items", json=body)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+
+    latencies.sort()
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "statements": counter.count / requests,
+    }
+
+
+async def cleanup() -> None:
+    async with async_session() as session:
+        for model in (Inventory, Transaction, VaultSummary, Wallet):
+            await session.execute(delete(model).where(model.user_id == BENCH_USER_ID))
+        await session.commit()
+
+
+async def main(sizes: List[int], requests: int, warmup: int) -> None:
+    print(f"🏁 Benchmarking /inventory/items: {requests} submissions per batch size")
+    # No email address, so no confirmation emails are sent
+    app.dependency_overrides[get_current_principal] = lambda: Principal(id=BENCH_USER_ID, email=None, name=None, expires_at=None)
+    counter = StatementCounter()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for size in sizes:
+                print(f"⏱️  Submitting {size} item(s) per request...")
+                results[size] = await bench_size(client, counter, size, requests, warmup)
+    finally:
+        counter.close()
+        app.dependency_overrides.pop(get_current_principal, None)
+        await cleanup()
+        await engine.dispose()
+
+    print(f"\n{'items':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'SQL statements':>15}")
+    for size, stats in results.items():
+        print(f"{size:>6} {stats['mean']:>9.2f} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['statements']:>15.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure inventory submission latency by batch size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="Items per submission")
+    parser.add_argument("--requests", type=int, default=30, help="Measured submissions per batch size")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured submissions per batch size")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.requests, args.warmup))
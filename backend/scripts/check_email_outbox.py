@@ -0,0 +1,259 @@
+"""
+End-to-end check of the email outbox against a local fake Resend server.
+
+Submits inventory batches through the real endpoint (in-process, against
+DATABASE_URL) as throwaway users with email addresses, then runs an
+EmailOutboxWorker pointed at a fake Resend API served on localhost. The
+fake server is slow and randomly answers 500/429, and behaves like Resend
+for repeated Idempotency-Keys (returns the first email's ID). Checks that:
+
+- every submission queued exactly one email, with its transaction's vault ID
+- every email ends up SENT, and Resend accepted each one exactly once
+- no more than EMAIL_OUTBOX_CONCURRENCY sends were in flight at a time
+- stopping the worker mid-queue finishes the in-flight sends: every email
+  the fake server accepted is recorded as SENT, the rest stay PENDING
+
+The worker claims any due email in the table, so run this against a
+development database; it refuses to start if other users have emails queued.
+
+Usage:
+    python scripts/check_email_outbox.py
+    python scripts/check_email_outbox.py --submissions 200 --failure-rate 0.5
+"""
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, Set
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from aiohttp import web
+from sqlalchemy import delete, func, select
+from app.auth import Principal, get_current_principal
+from app.config import settings
+from app.database import async_session, engine
+from app.email_outbox import EmailOutboxWorker
+from app.main import app
+from app.models import EmailOutbox, EmailOutboxStatus, Inventory, Transaction, VaultSummary, Wallet
+
+USER_PREFIX = "outbox-check-"
+
+
+class OutboxMismatch(AssertionError):
+    """The outbox or the fake Resend server disagrees with the submissions."""
+
+
+class FakeResend:
+    """Minimal Resend send-email API: flaky, slow, and idempotent per key."""
+
+    def __init__(self, failure_rate: float, delay: float, seed: int):
+        self.failure_rate = failure_rate
+        self.delay = delay
+        self.rng = random.Random(seed)
+        self.accepted: Dict[str, str] = {}  # Idempotency-Key -> email ID
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_email(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if request.headers.get("Authorization") != f"Bearer {settings.RESEND_API_KEY}":
+                return web.json_response({"message": "Invalid API key"}, status=401)
+            body = await request.json()
+            if not body.get("to") or not body.get("template", {}).get("variables", {}).get("Vault_ID"):
+                return web.json_response({"message": "Missing fields"}, status=422)
+            if self.rng.random() < self.failure_rate:
+                status = self.rng.choice([500, 502, 429])
+                return web.json_response({"message": "Try again"}, status=status)
+            key = request.headers["Idempotency-Key"]
+            email_id = self.accepted.setdefault(key, str(uuid.uuid4()))
+            return web.json_response({"id": email_id})
+        finally:
+            self.in_flight -= 1
+
+    async def start(self) -> web.AppRunner:
+        server = web.Application()
+        server.router.add_post("/emails", self.send_email)
+        runner = web.AppRunner(server)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        return runner
+
+
+def server_url(runner: web.AppRunner) -> str:
+    host, port = runner.addresses[0][:2]
+    return f"http://{host}:{port}"
+
+
+async def submit(user_id: str, items: int) -> None:
+    """Submit one inventory batch as `user_id` (auth dependency overridden)."""
+    principal = Principal(id=user_id, email=f"{user_id}@example.com", name="Outbox Check", expires_at=None)
+    app.dependency_overrides[get_current_principal] = lambda: principal
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://outbox-check") as client:
+        body = {"items": [{"name": f"Outbox card {i}", "item_data": {"market_price": 1.25}} for i in range(items)]}
+        response = await client.post("/inventory/items", json=body)
+        response.raise_for_status()
+
+
+async def load_outbox() -> Dict[str, EmailOutbox]:
+    async with async_session() as session:
+        result = await session.execute(select(EmailOutbox).where(EmailOutbox.user_id.startswith(USER_PREFIX)))
+        return {f"email-outbox-{row.id}": row for row in result.scalars()}
+
+
+async def check_vault_ids() -> None:
+    """Every check submission has one email whose vault ID is its transaction."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(Transaction.id, EmailOutbox.params)
+            .join(EmailOutbox, EmailOutbox.user_id == Transaction.user_id, isouter=True)
+            .where(Transaction.user_id.startswith(USER_PREFIX))
+        )
+        rows = result.all()
+    for transaction_id, params in rows:
+        if params is None:
+            raise OutboxMismatch(f"Transaction {transaction_id} queued no email")
+        vault_id = params["template"]["variables"]["Vault_ID"]
+        if vault_id != f"VLT-{transaction_id}":
+            raise OutboxMismatch(f"Transaction {transaction_id} queued an email for {vault_id}")
+
+
+async def wait_until_sent(expected: int, timeout: float) -> Dict[str, EmailOutbox]:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        outbox = await load_outbox()
+        done = [row for row in outbox.values() if row.status != EmailOutboxStatus.PENDING]
+        if len(done) >= expected or asyncio.get_running_loop().time() > deadline:
+            return outbox
+        await asyncio.sleep(0.2)
+
+
+def check_delivered(outbox: Dict[str, EmailOutbox], fake: FakeResend, keys: Set[str]) -> None:
+    """Emails recorded as SENT are exactly the ones the fake server accepted."""
+    sent = {key for key in keys if outbox[key].status == EmailOutboxStatus.SENT}
+    accepted = set(fake.accepted) & keys
+    if sent != accepted:
+        raise OutboxMismatch(
+            f"{len(accepted - sent)} accepted emails not recorded as SENT, "
+            f"{len(sent - accepted)} SENT emails never accepted"
+        )
+    for key in sent:
+        if outbox[key].resend_id != fake.accepted[key]:
+            raise OutboxMismatch(f"{key}: stored Resend ID {outbox[key].resend_id} != {fake.accepted[key]}")
+
+
+async def cleanup() -> None:
+    async with async_session() as session:
+        for model in (EmailOutbox, Inventory, Transaction, VaultSummary, Wallet):
+            await session.execute(delete(model).where(model.user_id.startswith(USER_PREFIX)))
+        await session.commit()
+
+
+async def main(submissions: int, failure_rate: float, delay: float, seed: int, keep: bool) -> None:
+    async with async_session() as session:
+        result = await session.execute(
+            select(func.count()).select_from(EmailOutbox).where(
+                EmailOutbox.status == EmailOutboxStatus.PENDING,
+                EmailOutbox.user_id.notlike(f"{USER_PREFIX}%"),
+            )
+        )
+        if result.scalar_one():
+            print("❌ Other users have pending emails; run this against a development database")
+            sys.exit(1)
+
+    # Emails are only queued when Resend is configured
+    settings.RESEND_API_KEY = settings.RESEND_API_KEY or "re_outbox_check"
+    settings.RESEND_TEMPLATE_ID = settings.RESEND_TEMPLATE_ID or "outbox-check-template"
+    settings.RESEND_FROM_EMAIL = settings.RESEND_FROM_EMAIL or "outbox-check@example.com"
+
+    fake = FakeResend(failure_rate, delay, seed)
+    runner = await fake.start()
+    concurrency = settings.EMAIL_OUTBOX_CONCURRENCY
+    batch_size = settings.EMAIL_OUTBOX_BATCH_SIZE
+
+    def new_worker() -> EmailOutboxWorker:
+        return EmailOutboxWorker(
+            api_url=server_url(runner),
+            api_key=settings.RESEND_API_KEY,
+            batch_size=batch_size,
+            concurrency=concurrency,
+            poll_interval=0.2,
+            max_attempts=50,  # Random failures only; nothing should run out of attempts
+            retry_base=0.05,
+        )
+
+    failed = False
+    try:
+        print(f"📬 Queueing {submissions} confirmation emails...")
+        rng = random.Random(seed)
+        users = [f"{USER_PREFIX}{uuid.uuid4().hex[:12]}" for _ in range(submissions)]
+        for user_id in users:
+            await submit(user_id, rng.randint(1, 5))
+        await check_vault_ids()
+
+        print(f"📤 Sending through a fake Resend ({failure_rate:.0%} failures, {delay * 1000:.0f} ms per call)...")
+        worker = new_worker()
+        worker.start()
+        outbox = await wait_until_sent(submissions, timeout=60)
+        await worker.stop()
+        keys = set(outbox)
+        unsent = [key for key in keys if outbox[key].status != EmailOutboxStatus.SENT]
+        if unsent:
+            raise OutboxMismatch(f"{len(unsent)} emails not sent, e.g. {outbox[unsent[0]].last_error}")
+        check_delivered(outbox, fake, keys)
+        if fake.max_in_flight > concurrency:
+            raise OutboxMismatch(f"{fake.max_in_flight} sends in flight, limit is {concurrency}")
+        print(
+            f"✅ {len(keys)} emails sent once each; {fake.requests} Resend calls, "
+            f"{worker.retried} retries, at most {fake.max_in_flight} in flight"
+        )
+
+        print("🛑 Stopping a worker mid-queue...")
+        for user_id in users[: max(batch_size * 3, 1)]:
+            await submit(user_id, 1)
+        worker = new_worker()
+        worker.start()
+        await asyncio.sleep(delay * 2)
+        await worker.stop(drain_timeout=30)
+        outbox = await load_outbox()
+        new_keys = set(outbox) - keys
+        check_delivered(outbox, fake, new_keys)
+        stuck = [key for key in new_keys if outbox[key].status == EmailOutboxStatus.FAILED]
+        if stuck:
+            raise OutboxMismatch(f"{len(stuck)} emails failed during the drain")
+        sent = sum(outbox[key].status == EmailOutboxStatus.SENT for key in new_keys)
+        print(f"✅ Drained: {sent} in-flight emails recorded as sent, {len(new_keys) - sent} left pending")
+    except OutboxMismatch as e:
+        failed = True
+        print(f"❌ {e} (--seed {seed})")
+    finally:
+        app.dependency_overrides.pop(get_current_principal, None)
+        await runner.cleanup()
+        if not keep:
+            await cleanup()
+        await engine.dispose()
+
+    if failed:
+        sys.exit(1)
+    print("\n🎉 Email outbox consistent")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Email outbox end-to-end check against a fake Resend server")
+    parser.add_argument("--submissions", type=int, default=50, help="Inventory submissions (one email each)")
+    parser.add_argument("--failure-rate", type=float, default=0.3, help="Share of Resend calls that fail")
+    parser.add_argument("--delay", type=float, default=0.02, help="Seconds per fake Resend call")
+    parser.add_argument("--seed", type=int, default=random.randrange(1_000_000), help="Random seed")
+    parser.add_argument("--keep", action="store_true", help="Keep the throwaway users' rows for inspection")
+    args = parser.parse_args()
+    asyncio.run(main(args.submissions, args.failure_rate, args.delay, args.seed, args.keep))
@@ -0,0 +1,248 @@
+"""
+Randomized consistency check for wallet money handling.
+
+Drives random deposit / withdraw / swap sequences through the real wallet
+and trade endpoints (in-process, against DATABASE_URL) and compares every
+response with an exact Decimal model of the wallet:
+
+- each request succeeds or fails with "insufficient balance" exactly when
+  the model says it should, and returns the model's balance
+- the stored balance equals the model to the cent, and equals the sum of
+  the user's transaction amounts
+- every transaction's balance_after matches the running sum of amounts
+- the amounts recorded in each transaction's transaction_data are exact
+  money strings that add up to its amount
+
+A concurrent phase then fires overlapping withdrawals and swaps at a fresh
+wallet and checks the balance never goes negative and still matches its
+transactions. Amounts are random cents such as 0.10 and 0.20, which drift
+when added as binary floats.
+
+Run against a database the app has already initialized (tables and
+migrations). Each run uses throwaway user ids; a failing run prints its
+seed so it can be replayed.
+
+Usage:
+    python scripts/check_wallet_ledger.py
+    python scripts/check_wallet_ledger.py --runs 50 --steps 200 --seed 1234
+"""
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+from decimal import Decimal
+from pathlib import Path
+from typing import Optional
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import get_current_user_id
+from app.database import async_session, engine
+from app.main import app
+from app.models import Inventory, Transaction, TransactionType, Wallet
+
+CENT = Decimal("0.01")
+USER_PREFIX = "ledger-check-"
+
+
+class LedgerMismatch(AssertionError):
+    """The API or the stored ledger disagrees with the Decimal model."""
+
+
+def recorded_money(data: dict, key: str) -> Decimal:
+    """Parse a money amount stored in transaction_data (a string of exact cents)."""
+    value = data.get(key)
+    if not isinstance(value, str):
+        raise LedgerMismatch(f"transaction_data[{key!r}] is {value!r}, expected a money string")
+    amount = Decimal(value)
+    if amount != amount.quantize(CENT):
+        raise LedgerMismatch(f"transaction_data[{key!r}] is {value!r}, expected whole cents")
+    return amount
+
+
+def check_recorded_amounts(transaction_type: TransactionType, amount: Decimal, data: dict) -> None:
+    """The money recorded in transaction_data matches the transaction amount."""
+    if transaction_type == TransactionType.TRADE:
+        recorded = recorded_money(data, "receive_money") - recorded_money(data, "give_money")
+    elif transaction_type == TransactionType.WITHDRAW:
+        recorded = -recorded_money(data, "amount")
+    elif transaction_type == TransactionType.DEPOSIT:
+        recorded = recorded_money(data, "amount")
+    else:
+        return  # Submissions and redemptions move no money
+    if recorded != amount:
+        raise LedgerMismatch(f"{transaction_type.value} transaction_data records {recorded}, amount is {amount}")
+
+
+def random_amount(rng: random.Random, max_cents: int) -> Decimal:
+    return Decimal(rng.randint(1, max_cents)) * CENT
+
+
+def as_user(user_id: str) -> httpx.AsyncClient:
+    """API client authenticated as `user_id` (auth dependency overridden)."""
+    app.dependency_overrides[get_current_user_id] = lambda: user_id
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://ledger-check")
+
+
+async def apply_random_op(
+    client: httpx.AsyncClient,
+    rng: random.Random,
+    balance: Decimal,
+) -> Decimal:
+    """
+    Send one random request and check it against the model.
+
+    Amounts are sent as JSON numbers, like the app does.
+
+    Returns:
+        The new model balance
+    """
+    op = rng.choice(["deposit", "withdraw", "swap"])
+    if op == "swap":
+        give = random_amount(rng, 5000) if rng.random() < 0.7 else Decimal("0")
+        receive = random_amount(rng, 5000) if rng.random() < 0.7 or not give else Decimal("0")
+        response = await client.post("/trade/swap", json={
+            "give_items": [],
+            "receive_items": [],
+            "give_money": float(give),
+            "receive_money": float(receive),
+        })
+        required, delta, key = give, receive - give, "wallet_balance"
+        label = f"swap give={give} receive={receive}"
+    else:
+        amount = random_amount(rng, 10000)
+        response = await client.post(f"/wallet/{op}", json={"amount": float(amount)})
+        required, delta, key = (amount, -amount, "balance") if op == "withdraw" else (Decimal("0"), amount, "balance")
+        label = f"{op} {amount}"
+
+    if balance < required:
+        if response.status_code != 400 or "Insufficient balance" not in response.json()["detail"]:
+            raise LedgerMismatch(f"{label}: expected insufficient balance at {balance}, got {response.status_code}")
+        return balance
+
+    if response.status_code != 200:
+        raise LedgerMismatch(f"{label}: expected success at {balance}, got {response.status_code} {response.text}")
+    balance += delta
+    if Decimal(str(response.json()[key])) != balance:
+        raise LedgerMismatch(f"{label}: API returned {response.json()[key]}, model has {balance}")
+    return balance
+
+
+async def check_stored_ledger(session: AsyncSession, user_id: str, expected: Optional[Decimal] = None) -> Decimal:
+    """Check the stored wallet against its transactions; returns the stored balance."""
+    result = await session.execute(select(Wallet.balance).where(Wallet.user_id == user_id))
+    stored = result.scalar_one()
+    if expected is not None and stored != expected:
+        raise LedgerMismatch(f"Stored balance {stored} != model {expected}")
+    if stored < 0:
+        raise LedgerMismatch(f"Negative balance {stored}")
+
+    result = await session.execute(
+        select(Transaction.amount, Transaction.balance_after, Transaction.transaction_type, Transaction.transaction_data)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.id)
+    )
+    rows = result.all()
+    for amount, _, transaction_type, data in rows:
+        check_recorded_amounts(transaction_type, amount, data)
+    running = Decimal("0")
+    if expected is not None:
+        # Sequential phase: balances were recorded in request order
+        for amount, balance_after, _, _ in rows:
+            running += amount
+            if balance_after != running:
+                raise LedgerMismatch(f"balance_after {balance_after} != running sum {running}")
+    else:
+        running = sum((row.amount for row in rows), Decimal("0"))
+    if running != stored:
+        raise LedgerMismatch(f"Sum of transactions {running} != stored balance {stored}")
+    return stored
+
+
+async def run_sequence(seed: int, steps: int) -> None:
+    """One random sequential run, checked after every request and at the end."""
+    rng = random.Random(seed)
+    user_id = f"{USER_PREFIX}{uuid.uuid4().hex[:12]}"
+    balance = Decimal("0")
+    async with as_user(user_id) as client:
+        for _ in range(steps):
+            balance = await apply_random_op(client, rng, balance)
+    async with async_session() as session:
+        await check_stored_ledger(session, user_id, balance)
+
+
+async def run_concurrent(seed: int, requests: int) -> Decimal:
+    """Overlapping withdrawals and swaps on one wallet; returns the final balance."""
+    rng = random.Random(seed)
+    user_id = f"{USER_PREFIX}{uuid.uuid4().hex[:12]}"
+    async with as_user(user_id) as client:
+        response = await client.post("/wallet/deposit", json={"amount": float(random_amount(rng, 20000))})
+        response.raise_for_status()
+        calls = []
+        for _ in range(requests):
+            amount = float(random_amount(rng, 3000))
+            if rng.random() < 0.5:
+                calls.append(client.post("/wallet/withdraw", json={"amount": amount}))
+            else:
+                calls.append(client.post("/trade/swap", json={
+                    "give_items": [],
+                    "receive_items": [],
+                    "give_money": amount,
+                    "receive_money": float(random_amount(rng, 1000)),
+                }))
+        responses = await asyncio.gather(*calls)
+    unexpected = [r.status_code for r in responses if r.status_code not in (200, 400)]
+    if unexpected:
+        raise LedgerMismatch(f"Unexpected status codes under concurrency: {unexpected}")
+    async with async_session() as session:
+        return await check_stored_ledger(session, user_id)
+
+
+async def cleanup() -> None:
+    """Delete the throwaway users' wallets, transactions and items."""
+    async with async_session() as session:
+        for model in (Transaction, Inventory, Wallet):
+            await session.execute(delete(model).where(model.user_id.startswith(USER_PREFIX)))
+        await session.commit()
+
+
+async def main(runs: int, steps: int, concurrent_requests: int, seed: int, keep: bool) -> None:
+    print(f"🎲 {runs} random runs of {steps} requests (seed {seed})...")
+    failures = 0
+    try:
+        for run in range(runs):
+            run_seed = seed + run
+            try:
+                await run_sequence(run_seed, steps)
+                balance = await run_concurrent(run_seed, concurrent_requests)
+            except LedgerMismatch as e:
+                failures += 1
+                print(f"❌ Run {run} (--seed {run_seed} --runs 1): {e}")
+                continue
+            print(f"✅ Run {run}: {steps} sequential requests match, concurrent phase ended at ${balance}")
+    finally:
+        app.dependency_overrides.pop(get_current_user_id, None)
+        if not keep:
+            await cleanup()
+        await engine.dispose()
+
+    if failures:
+        print(f"\n❌ {failures}/{runs} runs disagreed with the Decimal model")
+        sys.exit(1)
+    print(f"\n🎉 All {runs} runs consistent to the cent")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Randomized deposit/withdraw/swap ledger consistency check")
+    parser.add_argument("--runs", type=int, default=20, help="Random sequences to run")
+    parser.add_argument("--steps", type=int, default=100, help="Sequential requests per run")
+    parser.add_argument("--concurrent", type=int, default=40, help="Overlapping requests per run")
+    parser.add_argument("--seed", type=int, default=random.randrange(1_000_000), help="Seed of the first run")
+    parser.add_argument("--keep", action="store_true", help="Keep the throwaway users' rows for inspection")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.steps, args.concurrent, args.seed, args.keep))
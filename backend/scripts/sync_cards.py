@@ -3,35 +3,119 @@ Script to sync Pokemon cards from pokemontcg.io API to Supabase.
 Run once for initial sync, then schedule for updates.
 
 Usage:
-    python scripts/sync_cards.py
+    python scripts/sync_cards.py                  # full sync (refreshes prices)
+    python scripts/sync_cards.py --incremental    # only new/updated sets
+    python scripts/sync_cards.py --restart        # don't resume an unfinished run
 """
+import argparse
 import asyncio
 import aiohttp
+import hashlib
+import json
 import os
 import sys
-from typing import Dict, Any, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Set, Tuple
 from pathlib import Path
+from urllib.parse import urlencode
 
 # Add parent directory to path to import app modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.pool import NullPool
-from app.models import PokemonCard
+from app.models import PokemonCard, SyncPageStatus, SyncRun, SyncRunPage, SyncRunStatus, SyncSetCheckpoint
 from app.config import settings
-from datetime import datetime
+from app.catalog import bump_catalog_version, refresh_set_ranks
+from app.valuation import refresh_vault_summaries
+from datetime import datetime, timedelta
 
 # Pokemon TCG API configuration (from settings)
 POKEMON_TCG_API_URL = settings.POKEMON_TCG_API_URL
 POKEMON_TCG_API_KEY = settings.POKEMON_TCG_API_KEY
 
+# Concurrency / rate limiting for page fetches
+SYNC_CONCURRENCY = settings.POKEMON_TCG_SYNC_CONCURRENCY
+SYNC_REQUESTS_PER_SECOND = settings.POKEMON_TCG_REQUESTS_PER_SECOND
+
+# Search query used to fetch one set's cards (incremental syncs)
+SET_QUERY_PREFIX = "set.id:"
+
+# When to give up resuming a run with failed pages (see finish_run)
+MAX_PAGE_ATTEMPTS = settings.POKEMON_TCG_SYNC_MAX_PAGE_ATTEMPTS
+MAX_RUN_AGE_HOURS = settings.POKEMON_TCG_SYNC_MAX_RUN_AGE_HOURS
+MAX_RUN_AGE = timedelta(hours=MAX_RUN_AGE_HOURS)
+
+# Safety limit on pages planned when the API doesn't report a total
+MAX_UNKNOWN_TOTAL_PAGES = 500
+
+# Advisory lock held for the whole sync, so overlapping runs (e.g. cron) don't
+# resume the same run twice (migrations use 7_202_611)
+SYNC_LOCK_ID = 7_202_612
+
 # Database setup
 engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by all fetch workers, with an AIMD refill rate.
+    
+    - Healthy responses raise the rate additively (up to max_rate)
+    - 429 / 504 responses halve it (down to min_rate) and drain the bucket,
+      so every worker pauses instead of piling more load on the API
+    """
+    
+    def __init__(
+        self,
+        rate: float = 2.0,
+        min_rate: float = 0.2,
+        max_rate: float = 10.0,
+        burst: int = 4,
+        increase: float = 0.25,
+        decrease: float = 0.5,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+    
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+    
+    def on_success(self) -> None:
+        """Ramp up after a healthy response."""
+        self.rate = min(self.max_rate, self.rate + self.increase)
+    
+    def on_throttle(self) -> None:
+        """Back off after a 429/504."""
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+
+
 def detect_language(card_data: Dict[str, Any]) -> str:
     """Detect language from API response or card data."""
     # First, check if API provides language field directly
@@ -93,6 +177,12 @@ def extract_price(card_data: Dict[str, Any]) -> Dict[str, Optional[float]]:
     return prices
 
 
+def content_hash(card_data: Dict[str, Any]) -> str:
+    """Stable hash of an API card payload (key order independent)."""
+    canonical = json.dumps(card_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
 def transform_card(card_data: Dict[str, Any]) -> Dict[str, Any]:
     """Transform API response to database model."""
     language = detect_language(card_data)
@@ -116,49 +206,111 @@ def transform_card(card_data: Dict[str, Any]) -> Dict[str, Any]:
         'price_updated_at': datetime.utcnow() if prices['market_price'] else None,
         'tcgplayer_data': card_data.get('tcgplayer'),
         'raw_data': card_data,
+        'content_hash': content_hash(card_data),
     }
 
 
+def api_url(resource: str) -> str:
+    """Build a pokemontcg.io v2 endpoint URL (POKEMON_TCG_API_URL may or may not end in /v2)."""
+    base_url = POKEMON_TCG_API_URL.rstrip('/')
+    if not base_url.endswith('/v2'):
+        # If base URL doesn't include /v2, add it
+        return f"{base_url}/v2/{resource}"
+    return f"{base_url}/{resource}"
+
+
+def api_headers() -> Dict[str, str]:
+    """Request headers for the Pokemon TCG API."""
+    headers = {}
+    if POKEMON_TCG_API_KEY:
+        headers['X-Api-Key'] = POKEMON_TCG_API_KEY
+    return headers
+
+
 async def fetch_cards_page(
     session: aiohttp.ClientSession,
     page: int = 1,
     page_size: int = 250,
-    max_retries: int = 5
+    max_retries: int = 5,
+    limiter: Optional[AdaptiveRateLimiter] = None,
+    query: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Fetch a single page of cards from API with retry logic for 504 errors."""
-    headers = {}
-    if POKEMON_TCG_API_KEY:
-        headers['X-Api-Key'] = POKEMON_TCG_API_KEY
-    
-    # Ensure URL ends with /v2/cards (API v2 format)
-    base_url = POKEMON_TCG_API_URL.rstrip('/')
-    if not base_url.endswith('/v2'):
-        # If base URL doesn't include /v2, add it
-        url = f"{base_url}/v2/cards"
-    else:
-        url = f"{base_url}/cards"
+    """
+    Fetch a single page of cards from API with retry logic for 504 errors.
     
+    Args:
+        query: Optional pokemontcg.io search (e.g. "set.id:sv1") to page through
+               a subset of cards instead of the whole catalog
+    """
     # Build query parameters
     params = {
         'page': page,
         'pageSize': page_size,
     }
+    if query:
+        params['q'] = query
     
     # Add select parameter if we want to limit fields (optional, can help with performance)
     # Note: Removing select for now to ensure we get all data needed for language detection
     # The API supports select, but let's fetch all fields to be safe
     # 'select': 'id,name,images,set,number,rarity,subtypes,supertype,tcgplayer,language'
     
+    label = f"page {page} of {query}" if query else f"page {page}"
+    return await fetch_json(session, api_url('cards'), params, label, max_retries, limiter)
+
+
+async def fetch_sets(
+    session: aiohttp.ClientSession,
+    limiter: Optional[AdaptiveRateLimiter] = None
+) -> List[Dict[str, Any]]:
+    """Fetch every set (id, total, updatedAt, ...) from the API."""
+    sets = []
+    page = 1
+    while True:
+        response = await fetch_json(
+            session, api_url('sets'), {'page': page, 'pageSize': 250}, f"sets page {page}", limiter=limiter
+        )
+        data = response.get('data', [])
+        sets.extend(data)
+        if not data or len(sets) >= response.get('totalCount', 0):
+            return sets
+        page += 1
+
+
+async def fetch_json(
+    session: aiohttp.ClientSession,
+    url: str,
+    params: Dict[str, Any],
+    label: str,
+    max_retries: int = 5,
+    limiter: Optional[AdaptiveRateLimiter] = None
+) -> Dict[str, Any]:
+    """
+    GET a JSON resource from the API, retrying 504/404/429 and network errors.
+    
+    When a limiter is given, every attempt waits for a token and reports
+    throttling (429/504) or success back to it.
+    """
+    headers = api_headers()
+    
     for attempt in range(max_retries):
+        if limiter:
+            await limiter.acquire()
         try:
             async with session.get(url, headers=headers, params=params, timeout=aiohttp.ClientTimeout(total=60)) as response:
+                if limiter:
+                    if response.status in (429, 504):
+                        limiter.on_throttle()
+                    elif response.status == 200:
+                        limiter.on_success()
+                
                 if response.status == 200:
                     return await response.json()
                 elif response.status == 504:
                     # Gateway timeout - retry with exponential backoff
                     if attempt < max_retries - 1:
                         wait_time = (2 ** attempt) * 3  # 3s, 6s, 12s, 24s, 48s
-                        print(f"⏳ 504 timeout on page {page}, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
+                        print(f"⏳ 504 timeout on {label}, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
                         await asyncio.sleep(wait_time)
                         continue
                     else:
@@ -170,12 +322,12 @@ async def fetch_cards_page(
                     if attempt < max_retries - 1:
                         # For pages > 1, 404 might be rate limiting - wait longer
                         wait_time = (2 ** attempt) * 5  # 5s, 10s, 20s, 40s, 80s
-                        print(f"⏳ 404 on page {page} (might be rate limiting), retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
+                        print(f"⏳ 404 on {label} (might be rate limiting), retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
                         await asyncio.sleep(wait_time)
                         continue
                     else:
                         # Final attempt failed - this might be a real 404 (past last page)
-                        full_url = f"{url}?page={page}&pageSize={page_size}"
+                        full_url = f"{url}?{urlencode(params)}"
                         error_msg = f"API error: 404 - Page not found. URL: {full_url}"
                         if text:
                             error_msg += f" Response: {text[:200]}"
@@ -185,7 +337,7 @@ async def fetch_cards_page(
                     # Rate limit - wait longer before retry
                     if attempt < max_retries - 1:
                         wait_time = (2 ** attempt) * 10  # 10s, 20s, 40s, 80s, 160s
-                        print(f"⏳ Rate limit (429) on page {page}, waiting {wait_time}s... (attempt {attempt + 1}/{max_retries})")
+                        print(f"⏳ Rate limit (429) on {label}, waiting {wait_time}s... (attempt {attempt + 1}/{max_retries})")
                         await asyncio.sleep(wait_time)
                         continue
                     else:
@@ -198,7 +350,7 @@ async def fetch_cards_page(
             # Network errors - retry
             if attempt < max_retries - 1:
                 wait_time = (2 ** attempt) * 3
-                print(f"⏳ Network error on page {page}, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
+                print(f"⏳ Network error on {label}, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
                 await asyncio.sleep(wait_time)
                 continue
             else:
@@ -207,45 +359,50 @@ async def fetch_cards_page(
             # Timeout errors - retry
             if attempt < max_retries - 1:
                 wait_time = (2 ** attempt) * 3
-                print(f"⏳ Timeout on page {page}, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
+                print(f"⏳ Timeout on {label}, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
                 await asyncio.sleep(wait_time)
                 continue
             else:
                 raise Exception(f"Timeout after {max_retries} attempts")
     
-    raise Exception(f"Failed to fetch page {page} after {max_retries} attempts")
+    raise Exception(f"Failed to fetch {label} after {max_retries} attempts")
 
 
-async def upsert_card(db_session: AsyncSession, card_data: Dict[str, Any]) -> None:
-    """Insert or update a card in the database."""
-    # Check if card exists
-    result = await db_session.execute(
-        select(PokemonCard).where(PokemonCard.external_id == card_data['external_id'])
-    )
-    existing_card = result.scalar_one_or_none()
+async def upsert_cards(db_session: AsyncSession, cards: List[Dict[str, Any]]) -> int:
+    """
+    Insert or update a page of transformed cards in a single statement.
     
-    if existing_card:
-        # Update existing card
-        for key, value in card_data.items():
-            setattr(existing_card, key, value)
-        existing_card.updated_at = datetime.utcnow()
-    else:
-        # Insert new card
-        card = PokemonCard(**card_data)
-        db_session.add(card)
+    Uses INSERT ... ON CONFLICT (external_id) DO UPDATE so a 250-card page is
+    one round trip instead of a SELECT plus INSERT/UPDATE per card. Existing
+    rows whose content_hash matches are skipped entirely (no UPDATE, no WAL).
+    created_at and set_rank of existing rows are preserved.
+    
+    Returns:
+        Number of cards inserted or changed
+    """
+    # A statement can't touch the same row twice - keep the last copy of each card
+    unique_cards = list({card['external_id']: card for card in cards}.values())
+    if not unique_cards:
+        return 0
+    
+    now = datetime.utcnow()
+    rows = [{**card, 'created_at': now, 'updated_at': now} for card in unique_cards]
+    
+    stmt = pg_insert(PokemonCard).values(rows)
+    update_columns = [column for column in rows[0] if column not in ('external_id', 'created_at')]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['external_id'],
+        set_={column: stmt.excluded[column] for column in update_columns},
+        where=PokemonCard.__table__.c.content_hash.is_distinct_from(stmt.excluded.content_hash),
+    )
+    result = await db_session.execute(stmt)
+    return result.rowcount
 
 
 async def test_api_connection(http_session: aiohttp.ClientSession) -> bool:
     """Test if the API endpoint is accessible."""
-    base_url = POKEMON_TCG_API_URL.rstrip('/')
-    if not base_url.endswith('/v2'):
-        url = f"{base_url}/v2/cards"
-    else:
-        url = f"{base_url}/cards"
-    
-    headers = {}
-    if POKEMON_TCG_API_KEY:
-        headers['X-Api-Key'] = POKEMON_TCG_API_KEY
+    url = api_url('cards')
+    headers = api_headers()
     
     try:
         # Test with a simple request (page 1, small page size)
@@ -293,12 +450,473 @@ async def test_api_connection(http_session: aiohttp.ClientSession) -> bool:
         return False
 
 
-async def sync_all_cards():
-    """Main sync function - fetches all cards and syncs to database."""
-    print("🔥 Starting Pokemon card sync...")
+# A unit of fetch work: (optional API search query, page number)
+PageJob = Tuple[Optional[str], int]
+
+
+def describe_job(job: PageJob) -> str:
+    """Human-readable label for log lines."""
+    query, page = job
+    return f"page {page} of {query}" if query else f"page {page}"
+
+
+async def fetch_worker(
+    http_session: aiohttp.ClientSession,
+    limiter: AdaptiveRateLimiter,
+    job_queue: "asyncio.Queue[PageJob]",
+    result_queue: "asyncio.Queue[Tuple[PageJob, Optional[List[Dict[str, Any]]], Optional[Exception]]]",
+    page_size: int,
+) -> None:
+    """Fetch jobs from job_queue and hand (job, cards, error) to the writer."""
+    while True:
+        job = await job_queue.get()
+        query, page = job
+        try:
+            print(f"📄 Fetching {describe_job(job)}...")
+            response = await fetch_cards_page(
+                http_session, page=page, page_size=page_size, limiter=limiter, query=query
+            )
+            await result_queue.put((job, response.get('data', []), None))
+        except Exception as e:
+            await result_queue.put((job, None, e))
+
+
+def page_hash(cards: List[Dict[str, Any]]) -> str:
+    """Fingerprint of a page, derived from its cards' content hashes."""
+    digest = hashlib.sha256()
+    for card in cards:
+        digest.update(card['content_hash'].encode('ascii'))
+    return digest.hexdigest()
+
+
+async def mark_page(db_session: AsyncSession, run_id: int, job: PageJob, **values: Any) -> None:
+    """Update a page's progress row (does not commit)."""
+    query, page = job
+    await db_session.execute(
+        update(SyncRunPage)
+        .where(
+            SyncRunPage.run_id == run_id,
+            SyncRunPage.query == (query or ''),
+            SyncRunPage.page == page,
+        )
+        .values(attempts=SyncRunPage.attempts + 1, updated_at=datetime.utcnow(), **values)
+    )
+
+
+async def mark_page_failed(db_session: AsyncSession, run_id: int, job: PageJob, error: Exception) -> None:
+    """Record a failed page so the next run retries it."""
+    try:
+        await mark_page(db_session, run_id, job, status=SyncPageStatus.FAILED, error=str(error)[:1000])
+        await db_session.commit()
+    except Exception as e:
+        print(f"⚠️  Could not record failure of {describe_job(job)}: {e}")
+        await db_session.rollback()
+
+
+async def sync_pages(
+    http_session: aiohttp.ClientSession,
+    db_session: AsyncSession,
+    limiter: AdaptiveRateLimiter,
+    run_id: int,
+    jobs: List[PageJob],
+    page_size: int,
+    concurrency: int,
+) -> Set[PageJob]:
+    """
+    Fetch pages with a bounded worker pool and write them as they arrive.
+    
+    Workers share the rate limiter; the current coroutine is the single DB
+    writer, so transforms and upserts overlap with in-flight fetches. The
+    result queue is bounded to apply backpressure when writes fall behind.
+    
+    Each page's cards and its "done" progress row are committed together, so
+    an interrupted run never loses or repeats a page's bookkeeping.
+    
+    Returns:
+        Jobs that failed
+    """
+    job_queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        job_queue.put_nowait(job)
+    result_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    
+    workers = [
+        asyncio.create_task(fetch_worker(http_session, limiter, job_queue, result_queue, page_size))
+        for _ in range(min(concurrency, len(jobs)))
+    ]
+    
+    failed_jobs = set()
+    try:
+        for _ in range(len(jobs)):
+            job, cards, error = await result_queue.get()
+            if error is not None:
+                print(f"❌ Error on {describe_job(job)}: {error}")
+                await mark_page_failed(db_session, run_id, job, error)
+                failed_jobs.add(job)
+                continue
+            
+            try:
+                # Transform and upsert cards (one statement per page, unchanged rows skipped)
+                transformed = [transform_card(card_data) for card_data in cards]
+                page_changed = await upsert_cards(db_session, transformed)
+                
+                # Bumping the catalog version invalidates API caches
+                if page_changed:
+                    await bump_catalog_version(db_session)
+                await mark_page(
+                    db_session, run_id, job,
+                    status=SyncPageStatus.DONE,
+                    content_hash=page_hash(transformed),
+                    card_count=len(cards),
+                    changed_count=page_changed,
+                    error=None,
+                )
+                await db_session.commit()
+                if cards:
+                    print(f"✅ Synced {describe_job(job)}: {len(cards)} cards, {page_changed} new/changed (rate: {limiter.rate:.2f} req/s)")
+                else:
+                    print(f"⚠️  {describe_job(job).capitalize()} returned no cards")
+            except Exception as e:
+                print(f"❌ Error writing {describe_job(job)}: {e}")
+                await db_session.rollback()
+                await mark_page_failed(db_session, run_id, job, e)
+                failed_jobs.add(job)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    return failed_jobs
+
+
+async def sync_pages_until_end(
+    http_session: aiohttp.ClientSession,
+    db_session: AsyncSession,
+    limiter: AdaptiveRateLimiter,
+    run_id: int,
+    page_size: int,
+    concurrency: int,
+) -> Set[PageJob]:
+    """
+    Full sync when the API reported no total: plan and sync pages in chunks
+    (one page per worker) until a page comes back short or empty.
+    
+    Only pages up to the last one with cards are kept in the run, so pages
+    past the end of the catalog never linger as pending/failed progress rows.
+    
+    Returns:
+        Jobs that failed
+    """
+    failed_jobs: Set[PageJob] = set()
+    next_page = 1
+    while next_page <= MAX_UNKNOWN_TOTAL_PAGES:
+        chunk = [(None, page) for page in range(next_page, min(next_page + concurrency, MAX_UNKNOWN_TOTAL_PAGES + 1))]
+        await add_run_pages(db_session, run_id, chunk)
+        chunk_failed = await sync_pages(http_session, db_session, limiter, run_id, chunk, page_size, concurrency)
+        failed_jobs |= chunk_failed
+        
+        # First page with fewer cards than a full page is the last one
+        result = await db_session.execute(
+            select(func.min(SyncRunPage.page)).where(
+                SyncRunPage.run_id == run_id,
+                SyncRunPage.status == SyncPageStatus.DONE,
+                SyncRunPage.card_count < page_size,
+            )
+        )
+        last_page = result.scalar_one()
+        if last_page is not None:
+            await db_session.execute(
+                delete(SyncRunPage).where(SyncRunPage.run_id == run_id, SyncRunPage.page > last_page)
+            )
+            await db_session.commit()
+            print(f"🏁 Reached the end of the catalog at page {last_page}")
+            return {job for job in failed_jobs if job[1] <= last_page}
+        
+        if len(chunk_failed) == len(chunk):
+            # Can't tell where the catalog ends; failed pages are retried (or resumed)
+            print(f"⚠️  Every page from {next_page} to {chunk[-1][1]} failed - stopping here")
+            break
+        next_page += len(chunk)
+    
+    return failed_jobs
+
+
+async def plan_incremental_jobs(
+    http_session: aiohttp.ClientSession,
+    db_session: AsyncSession,
+    limiter: AdaptiveRateLimiter,
+    page_size: int,
+) -> Tuple[List[PageJob], Dict[str, str], int]:
+    """
+    Compare the API's sets against stored checkpoints and plan page jobs for
+    new or updated sets only.
+    
+    Returns:
+        (jobs, {query: set updatedAt} for the sets being synced, expected card count)
+    """
+    sets = await fetch_sets(http_session, limiter)
+    result = await db_session.execute(select(SyncSetCheckpoint))
+    checkpoints = {checkpoint.set_id: checkpoint.set_updated_at for checkpoint in result.scalars()}
+    
+    jobs = []
+    changed_sets = {}
+    expected_cards = 0
+    for card_set in sets:
+        set_id = card_set['id']
+        updated_at = card_set.get('updatedAt') or ''
+        if checkpoints.get(set_id) == updated_at:
+            continue
+        total = card_set.get('total') or 0
+        pages = max(1, (total + page_size - 1) // page_size)
+        query = f"{SET_QUERY_PREFIX}{set_id}"
+        jobs.extend((query, page) for page in range(1, pages + 1))
+        changed_sets[query] = updated_at
+        expected_cards += total
+    
+    print(f"📊 {len(changed_sets)} of {len(sets)} sets are new or updated since the last sync")
+    return jobs, changed_sets, expected_cards
+
+
+async def save_set_checkpoints(db_session: AsyncSession, run_id: int) -> Tuple[int, int]:
+    """
+    Record the synced updatedAt for every set of the run whose pages all succeeded.
+    
+    Returns:
+        (sets checkpointed, sets in the run)
+    """
+    result = await db_session.execute(
+        select(
+            SyncRunPage.query,
+            func.max(SyncRunPage.source_updated_at),
+            func.bool_and(SyncRunPage.status == SyncPageStatus.DONE),
+        )
+        .where(SyncRunPage.run_id == run_id)
+        .group_by(SyncRunPage.query)
+    )
+    sets = result.all()
+    
+    now = datetime.utcnow()
+    rows = [
+        {'set_id': query[len(SET_QUERY_PREFIX):], 'set_updated_at': updated_at or '', 'synced_at': now}
+        for query, updated_at, all_done in sets
+        if all_done and query.startswith(SET_QUERY_PREFIX)
+    ]
+    if rows:
+        stmt = pg_insert(SyncSetCheckpoint).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['set_id'],
+            set_={'set_updated_at': stmt.excluded.set_updated_at, 'synced_at': stmt.excluded.synced_at},
+        )
+        await db_session.execute(stmt)
+        await db_session.commit()
+    return len(rows), len(sets)
+
+
+@asynccontextmanager
+async def sync_lock():
+    """
+    Hold SYNC_LOCK_ID for the duration of a sync; yields False if another sync holds it.
+    
+    A transaction-level lock in a transaction kept open on its own connection,
+    so it also works through Supabase's transaction pooler.
+    """
+    async with engine.connect() as lock_conn:
+        result = await lock_conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": SYNC_LOCK_ID}
+        )
+        try:
+            yield result.scalar_one()
+        finally:
+            await lock_conn.rollback()  # Releases the lock
+
+
+async def find_unfinished_run(db_session: AsyncSession, mode: str) -> Optional[SyncRun]:
+    """
+    Latest run of this mode that was interrupted or finished with failed pages.
+    
+    Runs older than MAX_RUN_AGE are closed as incomplete instead of resumed,
+    so the next sync starts fresh.
+    """
+    result = await db_session.execute(
+        select(SyncRun)
+        .where(
+            SyncRun.mode == mode,
+            SyncRun.status.in_([SyncRunStatus.RUNNING, SyncRunStatus.PARTIAL]),
+        )
+        .order_by(SyncRun.id.desc())
+        .limit(1)
+    )
+    run = result.scalar_one_or_none()
+    if run and run.started_at and datetime.utcnow() - run.started_at > MAX_RUN_AGE:
+        print(f"⌛ Unfinished sync run #{run.id} is older than {MAX_RUN_AGE_HOURS:g}h - starting a new run")
+        await close_unfinished_runs(db_session, mode, SyncRunStatus.INCOMPLETE)
+        return None
+    return run
+
+
+async def close_unfinished_runs(
+    db_session: AsyncSession,
+    mode: str,
+    status: SyncRunStatus = SyncRunStatus.ABANDONED,
+) -> None:
+    """Stop resuming earlier unfinished runs of this mode."""
+    await db_session.execute(
+        update(SyncRun)
+        .where(
+            SyncRun.mode == mode,
+            SyncRun.status.in_([SyncRunStatus.RUNNING, SyncRunStatus.PARTIAL]),
+        )
+        .values(status=status, finished_at=datetime.utcnow())
+    )
+    await db_session.commit()
+
+
+async def create_run(
+    db_session: AsyncSession,
+    mode: str,
+    jobs: List[PageJob],
+    total_count: int,
+    set_markers: Optional[Dict[str, str]] = None,
+) -> SyncRun:
+    """Persist a new run with one pending progress row per planned page."""
+    run = SyncRun(mode=mode, total_count=total_count)
+    db_session.add(run)
+    await db_session.flush()
+    await add_run_pages(db_session, run.id, jobs, set_markers)
+    return run
+
+
+async def add_run_pages(
+    db_session: AsyncSession,
+    run_id: int,
+    jobs: List[PageJob],
+    set_markers: Optional[Dict[str, str]] = None,
+) -> None:
+    """Plan more pages for a run (pending progress rows) and commit."""
+    if jobs:
+        await db_session.execute(insert(SyncRunPage), [
+            {
+                'run_id': run_id,
+                'query': query or '',
+                'page': page,
+                'status': SyncPageStatus.PENDING,
+                'source_updated_at': (set_markers or {}).get(query),
+            }
+            for query, page in jobs
+        ])
+    await db_session.commit()
+
+
+async def load_pending_jobs(db_session: AsyncSession, run_id: int) -> List[PageJob]:
+    """Pages of a run that are not done yet (pending or failed)."""
+    result = await db_session.execute(
+        select(SyncRunPage.query, SyncRunPage.page)
+        .where(SyncRunPage.run_id == run_id, SyncRunPage.status != SyncPageStatus.DONE)
+        .order_by(SyncRunPage.query, SyncRunPage.page)
+    )
+    return [(query or None, page) for query, page in result.all()]
+
+
+async def get_run_coverage(db_session: AsyncSession, run_id: int) -> Dict[str, Any]:
+    """Progress and card coverage of a run, aggregated from its page rows."""
+    done = SyncRunPage.status == SyncPageStatus.DONE
+    result = await db_session.execute(
+        select(
+            func.count(),
+            func.count().filter(done),
+            func.count().filter(SyncRunPage.status == SyncPageStatus.FAILED),
+            func.coalesce(func.sum(SyncRunPage.card_count).filter(done), 0),
+            func.coalesce(func.sum(SyncRunPage.changed_count).filter(done), 0),
+        ).where(SyncRunPage.run_id == run_id)
+    )
+    pages, pages_done, pages_failed, cards, changed = result.one()
+    run = await db_session.get(SyncRun, run_id)
+    return {
+        'pages': pages,
+        'pages_done': pages_done,
+        'pages_failed': pages_failed,
+        'pages_pending': pages - pages_done - pages_failed,
+        'cards_synced': cards,
+        'cards_changed': changed,
+        'total_count': run.total_count if run else 0,
+    }
+
+
+async def finish_run(db_session: AsyncSession, run: SyncRun, coverage: Dict[str, Any]) -> SyncRunStatus:
+    """
+    Mark the run completed, or partial so the next sync resumes it.
+    
+    A run with a page that failed MAX_PAGE_ATTEMPTS times, or that is older
+    than MAX_RUN_AGE, is marked incomplete instead: one page that always
+    fails must not keep every later sync from starting a fresh run.
+    """
+    if coverage['pages_done'] == coverage['pages']:
+        status = SyncRunStatus.COMPLETED
+    else:
+        status = SyncRunStatus.PARTIAL
+        result = await db_session.execute(
+            select(func.count()).where(
+                SyncRunPage.run_id == run.id,
+                SyncRunPage.status != SyncPageStatus.DONE,
+                SyncRunPage.attempts >= MAX_PAGE_ATTEMPTS,
+            )
+        )
+        exhausted = result.scalar_one()
+        too_old = run.started_at is not None and datetime.utcnow() - run.started_at > MAX_RUN_AGE
+        if exhausted or too_old:
+            status = SyncRunStatus.INCOMPLETE
+            reason = f"{exhausted} page(s) failed {MAX_PAGE_ATTEMPTS} attempts" if exhausted else f"run is older than {MAX_RUN_AGE_HOURS:g}h"
+            print(f"\n⚠️  Giving up on the missing pages of run #{run.id} ({reason}); the next sync starts a new run")
+    
+    await db_session.execute(
+        update(SyncRun)
+        .where(SyncRun.id == run.id)
+        .values(status=status, finished_at=datetime.utcnow())
+    )
+    await db_session.commit()
+    return status
+
+
+def print_coverage(run_id: int, coverage: Dict[str, Any], failed_jobs: Set[PageJob], status: SyncRunStatus) -> None:
+    """Print a run's persisted coverage stats."""
+    total_count = coverage['total_count']
+    cards_synced = coverage['cards_synced']
+    print(f"\n🎉 Sync run #{run_id} summary:")
+    print(f"   ✅ Successfully synced: {coverage['pages_done']}/{coverage['pages']} pages")
+    print(f"   📦 Total cards synced: {cards_synced:,} ({coverage['cards_changed']:,} new or changed)")
+    if total_count > 0:
+        coverage_pct = (cards_synced / total_count) * 100
+        print(f"   📊 Coverage: {coverage_pct:.1f}% ({cards_synced:,}/{total_count:,} cards)")
+        if cards_synced < total_count:
+            print(f"   ⚠️  Missing: {total_count - cards_synced:,} cards")
+    if failed_jobs:
+        print(f"   ⚠️  {len(failed_jobs)} pages still failed: {sorted(describe_job(job) for job in failed_jobs)}")
+    if coverage['pages_done'] < coverage['pages'] and status == SyncRunStatus.PARTIAL:
+        print(f"   💡 Run the sync again to resume the {coverage['pages'] - coverage['pages_done']} missing pages.")
+
+
+async def sync_all_cards(concurrency: int = SYNC_CONCURRENCY, incremental: bool = False, restart: bool = False):
+    """
+    Main sync function - fetches cards and syncs to database.
+    
+    Progress is stored per page in sync_runs / sync_run_pages. If the last run
+    of the same mode was interrupted or left failed pages, only its missing
+    pages are fetched.
+    
+    Args:
+        concurrency: Number of parallel page fetches
+        incremental: Only pull sets whose updatedAt changed since the last
+                     checkpoint. A full sync (the default) re-reads every page,
+                     which also refreshes prices; unchanged rows are skipped
+                     either way via their content hash.
+        restart: Abandon an unfinished run instead of resuming it
+    """
+    mode = 'incremental' if incremental else 'full'
+    print(f"🔥 Starting Pokemon card sync ({mode})...")
     
     page_size = 250  # Cards per page
     max_retry_rounds = 5  # Maximum number of retry rounds for failed pages
+    limiter = AdaptiveRateLimiter(rate=SYNC_REQUESTS_PER_SECOND)
     
     async with aiohttp.ClientSession() as http_session:
         # Test API connection first
@@ -315,145 +933,131 @@ async def sync_all_cards():
             print("\n💡 If the API key is invalid, get a new one at: https://dev.pokemontcg.io")
             return
         
-        async with async_session() as db_session:
-            # Step 1: Get total count from first page
-            print("\n📊 Fetching first page to get total count...")
-            total_count = 0
-            try:
-                response = await fetch_cards_page(http_session, page=1, page_size=page_size)
-                total_count = response.get('totalCount', 0)
-                
-                if total_count == 0:
-                    print("⚠️  Could not determine total count. Will sync until no more pages.")
-                    max_pages = None
-                else:
-                    max_pages = (total_count + page_size - 1) // page_size
-                    print(f"📊 Found {total_count:,} total cards across {max_pages} pages")
-            except Exception as e:
-                print(f"❌ Error fetching first page: {e}")
-                print(f"💡 Check that POKEMON_TCG_API_URL is set correctly (should be: https://api.pokemontcg.io/v2)")
-                print("⚠️  Will attempt to sync pages sequentially until no more data...")
-                max_pages = None
-                total_count = 0
+        async with sync_lock() as locked, async_session() as db_session:
+            if not locked:
+                print("\n⏭️  Another card sync is running - exiting")
+                return
             
-            # Step 2: Sync all pages systematically
-            total_synced = 0
-            failed_pages = set()  # Use set to avoid duplicates
-            successful_pages = set()
-            
-            # Determine page range to fetch
-            if max_pages:
-                pages_to_fetch = list(range(1, max_pages + 1))
-                print(f"📄 Will attempt to fetch {len(pages_to_fetch)} pages...")
+            run = None
+            discover_pages = False
+            if restart:
+                await close_unfinished_runs(db_session, mode)
             else:
-                # If we don't know total, fetch until we get empty pages
-                pages_to_fetch = []
-                page = 1
-                consecutive_empty = 0
-                while consecutive_empty < 3:  # Stop after 3 consecutive empty pages
-                    pages_to_fetch.append(page)
-                    page += 1
-                    if page > 500:  # Safety limit
-                        break
+                run = await find_unfinished_run(db_session, mode)
             
-            # First pass: try to sync all pages
-            print(f"\n📥 First pass: Fetching {len(pages_to_fetch)} pages...")
-            for page in pages_to_fetch:
+            if run:
+                # Step 1: Resume the interrupted run
+                jobs = await load_pending_jobs(db_session, run.id)
+                print(f"\n⏯️  Resuming sync run #{run.id} (started {run.started_at:%Y-%m-%d %H:%M} UTC): {len(jobs)} pages left")
+            elif incremental:
+                # Step 1: Find sets that changed since their last checkpoint
+                print("\n📊 Comparing sets against the last sync checkpoint...")
                 try:
-                    print(f"📄 Fetching page {page}/{len(pages_to_fetch)}...")
-                    response = await fetch_cards_page(http_session, page=page, page_size=page_size)
-                    
-                    cards = response.get('data', [])
-                    
-                    if not cards:
-                        print(f"⚠️  Page {page} returned no cards")
-                        successful_pages.add(page)  # Mark as "successful" (empty is valid)
-                        continue
-                    
-                    # Transform and upsert cards
-                    page_synced = 0
-                    for card_data in cards:
-                        transformed = transform_card(card_data)
-                        await upsert_card(db_session, transformed)
-                        page_synced += 1
-                    
-                    # Commit batch
-                    await db_session.commit()
-                    total_synced += page_synced
-                    successful_pages.add(page)
-                    print(f"✅ Synced {page_synced} cards from page {page} (total: {total_synced})")
-                    
-                    # Rate limiting - longer delay to avoid 404s/429s
-                    # Increased delay to respect API rate limits
-                    await asyncio.sleep(3.0)
+                    jobs, changed_sets, total_count = await plan_incremental_jobs(
+                        http_session, db_session, limiter, page_size
+                    )
+                except Exception as e:
+                    print(f"❌ Error fetching sets: {e}")
+                    return
+                run = await create_run(db_session, mode, jobs, total_count, changed_sets)
+            else:
+                # Step 1: Get total count from first page
+                print("\n📊 Fetching first page to get total count...")
+                total_count = 0
+                try:
+                    response = await fetch_cards_page(http_session, page=1, page_size=page_size, limiter=limiter)
+                    total_count = response.get('totalCount', 0)
                     
+                    if total_count == 0:
+                        print("⚠️  Could not determine total count. Will sync until no more pages.")
+                        max_pages = None
+                    else:
+                        max_pages = (total_count + page_size - 1) // page_size
+                        print(f"📊 Found {total_count:,} total cards across {max_pages} pages")
                 except Exception as e:
-                    error_msg = str(e)
-                    # If it's a 404 and we're past the expected pages, that's okay
-                    if '404' in error_msg and max_pages and page > max_pages:
-                        print(f"⚠️  Page {page} returned 404 (beyond expected range), stopping...")
-                        break
-                    print(f"❌ Error on page {page}: {e}")
-                    await db_session.rollback()
-                    failed_pages.add(page)
-                    # Longer wait after error to avoid hitting rate limits
-                    await asyncio.sleep(5.0)
+                    print(f"❌ Error fetching first page: {e}")
+                    print(f"💡 Check that POKEMON_TCG_API_URL is set correctly (should be: https://api.pokemontcg.io/v2)")
+                    print("⚠️  Will attempt to sync pages sequentially until no more data...")
+                    max_pages = None
+                    total_count = 0
+                
+                # Without a total, pages are planned as they are fetched (Step 2)
+                jobs = [(None, page) for page in range(1, max_pages + 1)] if max_pages else []
+                discover_pages = not max_pages
+                run = await create_run(db_session, mode, jobs, total_count)
+            
+            # Step 2: Sync all pages with bounded concurrency
+            if jobs:
+                print(f"\n📥 Sync run #{run.id}: Fetching {len(jobs)} pages ({concurrency} workers)...")
+                failed_jobs = await sync_pages(
+                    http_session, db_session, limiter, run.id, jobs, page_size, concurrency
+                )
+            elif discover_pages:
+                print(f"\n📥 Sync run #{run.id}: Fetching pages until the end of the catalog ({concurrency} workers)...")
+                failed_jobs = await sync_pages_until_end(
+                    http_session, db_session, limiter, run.id, page_size, concurrency
+                )
+            else:
+                failed_jobs = set()
             
             # Retry rounds: keep retrying failed pages
             retry_round = 1
-            while failed_pages and retry_round <= max_retry_rounds:
-                print(f"\n🔄 Retry round {retry_round}/{max_retry_rounds}: Retrying {len(failed_pages)} failed pages...")
-                still_failed = set()
-                
-                for retry_page in list(failed_pages):
-                    try:
-                        print(f"📄 Retrying page {retry_page}...")
-                        response = await fetch_cards_page(http_session, page=retry_page, page_size=page_size)
-                        
-                        cards = response.get('data', [])
-                        if not cards:
-                            print(f"⚠️  Page {retry_page} returned no cards on retry")
-                            successful_pages.add(retry_page)
-                            continue
-                        
-                        # Transform and upsert cards
-                        page_synced = 0
-                        for card_data in cards:
-                            transformed = transform_card(card_data)
-                            await upsert_card(db_session, transformed)
-                            page_synced += 1
-                        
-                        # Commit batch
-                        await db_session.commit()
-                        total_synced += page_synced
-                        successful_pages.add(retry_page)
-                        print(f"✅ Successfully synced page {retry_page} on retry ({page_synced} cards, total: {total_synced})")
-                        
-                        # Longer delay between retries
-                        await asyncio.sleep(2.0)
-                        
-                    except Exception as e:
-                        print(f"❌ Still failed on page {retry_page}: {e}")
-                        await db_session.rollback()
-                        still_failed.add(retry_page)
-                        await asyncio.sleep(2.0)
-                
-                failed_pages = still_failed
+            while failed_jobs and retry_round <= max_retry_rounds:
+                print(f"\n🔄 Retry round {retry_round}/{max_retry_rounds}: Retrying {len(failed_jobs)} failed pages...")
+                failed_jobs = await sync_pages(
+                    http_session, db_session, limiter, run.id,
+                    sorted(failed_jobs, key=describe_job), page_size, concurrency
+                )
                 retry_round += 1
+            
+            # Remember which sets are now up to date (incremental mode)
+            if incremental:
+                checkpointed, run_sets = await save_set_checkpoints(db_session, run.id)
+                print(f"\n📌 Checkpointed {checkpointed}/{run_sets} sets")
+            
+            coverage = await get_run_coverage(db_session, run.id)
+            
+            # Step 3: Rebuild the per-set price ranking used by relevance sort
+            # (covers pages written by earlier, interrupted attempts of this run too)
+            if coverage['cards_changed']:
+                try:
+                    ranked = await refresh_set_ranks(db_session)
+                    print(f"\n🏆 Refreshed set rankings ({ranked:,} cards changed rank)")
+                except Exception as e:
+                    print(f"❌ Error refreshing set rankings: {e}")
+                    await db_session.rollback()
+                
+                # Step 4: Revalue every vault at the new prices
+                try:
+                    revalued = await refresh_vault_summaries(db_session)
+                    print(f"💰 Refreshed vault values ({revalued:,} users changed)")
+                except Exception as e:
+                    print(f"❌ Error refreshing vault values: {e}")
+                    await db_session.rollback()
+            
+            status = await finish_run(db_session, run, coverage)
     
-    print(f"\n🎉 Sync complete!")
-    print(f"   ✅ Successfully synced: {len(successful_pages)} pages")
-    print(f"   📦 Total cards synced: {total_synced:,}")
-    if total_count > 0:
-        coverage = (total_synced / total_count) * 100
-        print(f"   📊 Coverage: {coverage:.1f}% ({total_synced:,}/{total_count:,} cards)")
-        if total_synced < total_count:
-            missing = total_count - total_synced
-            print(f"   ⚠️  Missing: {missing:,} cards")
-    if failed_pages:
-        print(f"   ⚠️  {len(failed_pages)} pages still failed after {max_retry_rounds} retry rounds: {sorted(list(failed_pages))}")
-        print(f"   💡 You can run the sync again later to retry these pages.")
+    print_coverage(run.id, coverage, failed_jobs, status)
+    print(f"   🏁 Run status: {status.value}")
 
 
 if __name__ == "__main__":
-    asyncio.run(sync_all_cards())
+    parser = argparse.ArgumentParser(description="Sync Pokemon cards from pokemontcg.io")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only sync sets whose updatedAt changed since the last checkpoint",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Start a new run instead of resuming an unfinished one",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=SYNC_CONCURRENCY,
+        help="Number of parallel page fetches",
+    )
+    args = parser.parse_args()
+    asyncio.run(sync_all_cards(concurrency=args.concurrency, incremental=args.incremental, restart=args.restart))
@@ -142,7 +142,7 @@ export default function ActivityScreen() {
                         {formatDate(transaction.created_at)}
                       </Text>
                       
-                      {/* Display card details for trades */}
+                      {/* Display card details for trades (values are money strings like "2.50"; older records hold numbers) */}
                       {transaction.transaction_type === 'trade' && transaction.transaction_data && (
                         <View className="mt-3 space-y-2">
                           {/* Cards given */}
@@ -156,9 +156,9 @@ export default function ActivityScreen() {
                                   <Text className="text-xs text-foreground flex-1" numberOfLines={1}>
                                     {card.name || 'Unknown Card'}
                                   </Text>
-                                  {card.value > 0 && (
+                                  {Number(card.value) > 0 && (
                                     <Text className="text-xs text-muted-foreground ml-2">
-                                      ${card.value.toFixed(2)}
+                                      ${Number(card.value).toFixed(2)}
                                     </Text>
                                   )}
                                 </View>
@@ -177,9 +177,9 @@ export default function ActivityScreen() {
                                   <Text className="text-xs text-foreground flex-1" numberOfLines={1}>
                                     {card.name || 'Unknown Card'}
                                   </Text>
-                                  {card.value > 0 && (
+                                  {Number(card.value) > 0 && (
                                     <Text className="text-xs text-muted-foreground ml-2">
-                                      ${card.value.toFixed(2)}
+                                      ${Number(card.value).toFixed(2)}
                                     </Text>
                                   )}
                                 </View>
@@ -202,9 +202,9 @@ export default function ActivityScreen() {
                                   <Text className="text-xs text-foreground flex-1" numberOfLines={1}>
                                     {item.name || 'Unknown Item'}
                                   </Text>
-                                  {item.value > 0 && (
+                                  {Number(item.value) > 0 && (
                                     <Text className="text-xs text-muted-foreground ml-2">
-                                      ${item.value.toFixed(2)}
+                                      ${Number(item.value).toFixed(2)}
                                     </Text>
                                   )}
                                 </View>
@@ -227,9 +227,9 @@ export default function ActivityScreen() {
                                   <Text className="text-xs text-foreground flex-1" numberOfLines={1}>
                                     {item.name || 'Unknown Item'}
                                   </Text>
-                                  {item.value > 0 && (
+                                  {Number(item.value) > 0 && (
                                     <Text className="text-xs text-muted-foreground ml-2">
-                                      ${item.value.toFixed(2)}
+                                      ${Number(item.value).toFixed(2)}
                                     </Text>
                                   )}
                                 </View>
@@ -9,7 +9,9 @@ import { ActivityIndicator } from 'react-native';
 import { ArrowDownUp, Gift, Send, X } from 'lucide-react-native';
 import { useRouter } from 'expo-router';
 import { useInventory } from '@/hooks/use-inventory';
+import { useInventorySearch } from '@/hooks/use-inventory-search';
 import { useTrade } from '@/providers/trade-provider';
+import type { UserCard } from '@/types/inventory';
 
 const WALLET_CARD_HEIGHT = 260;
 
@@ -22,7 +24,8 @@ export default function VaultScreen() {
   const [isRedeeming, setIsRedeeming] = useState(false);
   const [redeemingCardIds, setRedeemingCardIds] = useState<Set<number>>(new Set());
   const router = useRouter();
-  const { removeCards, cards } = useInventory();
+  const { removeCards, cards, loadMoreInventory } = useInventory();
+  const search = useInventorySearch({ pageSize: 100 });
   const { getReceiveCardsPayload } = useTrade();
    
   // When inventory has scrolled over wallet, inventory blocks touches
@@ -50,6 +53,7 @@ export default function VaultScreen() {
 
     try {
       await removeCards(Array.from(selectedCardIds));
+      search.removeResults(Array.from(selectedCardIds));
       setSelectedCardIds(new Set());
       setRedeemMode(false);
     } catch (error) {
@@ -88,8 +92,10 @@ export default function VaultScreen() {
   const handleContinueTrade = () => {
     if (selectedCardIds.size === 0) return;
     
-    // Get selected cards data
-    const selectedCardsData = cards.filter(card => selectedCardIds.has(card.id));
+    // Get selected cards data (from the loaded vault pages or search results)
+    const selectedCardsData = Array.from(selectedCardIds)
+      .map(id => cards.find(card => card.id === id) ?? search.getCard(id))
+      .filter((card): card is UserCard => card !== undefined);
     
     // Navigate to trade deck with selected cards and persist receive cards from provider
     const receiveCardsPayload = getReceiveCardsPayload();
@@ -113,6 +119,7 @@ export default function VaultScreen() {
       <View style={{ height: WALLET_CARD_HEIGHT }} />
       {/* Inventory card that scrolls up */}
       <InventoryCard
+        search={search}
         redeemMode={redeemMode}
         tradeMode={tradeMode}
         selectedCardIds={selectedCardIds}
@@ -153,6 +160,9 @@ export default function VaultScreen() {
         }}
         onScroll={handleScroll}
         scrollEventThrottle={16}
+        // Fetch the next vault (or search results) page as the user nears the bottom
+        onEndReached={search.isActive ? search.loadMore : loadMoreInventory}
+        onEndReachedThreshold={0.5}
         style={{ 
           flex: 1,
           zIndex: isInventoryOverWallet ? 10 : 2,
@@ -7,6 +7,7 @@ import { Icon } from '@/components/ui/icon';
 import { Input } from '@/components/ui/input';
 import { X, Search, Check } from 'lucide-react-native';
 import { useInventory } from '@/hooks/use-inventory';
+import { useInventorySearch } from '@/hooks/use-inventory-search';
 import type { UserCard } from '@/types/inventory';
 
 const SCREEN_OPTIONS = {
@@ -18,8 +19,8 @@ export default function SelectInventoryScreen() {
   const router = useRouter();
   const params = useLocalSearchParams();
   const { width } = useWindowDimensions();
-  const { cards: allCards, isLoading } = useInventory();
-  const [searchQuery, setSearchQuery] = useState('');
+  const { cards: allCards, isLoading, loadMoreInventory } = useInventory();
+  const search = useInventorySearch();
   
   // Parse initially selected cards from params
   const initialSelectedCards = useMemo(() => {
@@ -38,19 +39,10 @@ export default function SelectInventoryScreen() {
     new Set(initialSelectedCards.map(card => card.id))
   );
 
-  // Filter cards based on search query
+  // Searches run on the backend over the whole vault, not just the loaded pages
   const filteredCards = useMemo(() => {
-    if (!searchQuery.trim()) {
-      return allCards;
-    }
-    const query = searchQuery.toLowerCase().trim();
-    return allCards.filter(card => {
-      const nameMatch = card.name.toLowerCase().includes(query);
-      const conditionMatch = card.item_data?.condition?.toLowerCase().includes(query);
-      const setMatch = card.item_data?.set?.toLowerCase().includes(query);
-      return nameMatch || conditionMatch || setMatch;
-    });
-  }, [allCards, searchQuery]);
+    return search.isActive ? search.results : allCards;
+  }, [allCards, search.isActive, search.results]);
 
   // Separate selected and unselected cards
   const selectedCards = useMemo(() => {
@@ -85,7 +77,14 @@ export default function SelectInventoryScreen() {
   };
 
   const handleContinue = () => {
-    const selectedCardsData = allCards.filter(card => selectedCardIds.has(card.id));
+    // Selected cards may come from the loaded vault pages, search results or the deck
+    const selectedCardsData = Array.from(selectedCardIds)
+      .map(id =>
+        allCards.find(card => card.id === id) ??
+        search.getCard(id) ??
+        initialSelectedCards.find(card => card.id === id)
+      )
+      .filter((card): card is UserCard => card !== undefined);
     router.push({
       pathname: '/trade/deck',
       params: {
@@ -182,6 +181,17 @@ export default function SelectInventoryScreen() {
             paddingTop: 140,
             paddingBottom: 100,
           }}
+          // Fetch the next vault (or search results) page as the user nears the bottom
+          onScroll={({ nativeEvent: { layoutMeasurement, contentOffset, contentSize } }) => {
+            if (layoutMeasurement.height + contentOffset.y >= contentSize.height - layoutMeasurement.height / 2) {
+              if (search.isActive) {
+                search.loadMore();
+              } else {
+                loadMoreInventory();
+              }
+            }
+          }}
+          scrollEventThrottle={100}
           showsVerticalScrollIndicator={false}>
           
           {/* Search Bar */}
@@ -193,8 +203,8 @@ export default function SelectInventoryScreen() {
               <Input
                 placeholder="Search cards..."
                 className="pl-10 flex-1"
-                value={searchQuery}
-                onChangeText={setSearchQuery}
+                value={search.searchQuery}
+                onChangeText={search.setSearchQuery}
               />
             </View>
           </View>
@@ -222,14 +232,14 @@ export default function SelectInventoryScreen() {
             <Text className="text-lg font-bold mb-4">
               {selectedCards.length > 0 ? 'All Cards' : 'Your Inventory'}
             </Text>
-            {isLoading ? (
+            {(search.isActive ? search.isSearching : isLoading) ? (
               <View className="py-8 items-center">
                 <Text className="text-muted-foreground">Loading cards...</Text>
               </View>
             ) : unselectedCards.length === 0 ? (
               <View className="py-8 items-center">
                 <Text className="text-muted-foreground">
-                  {searchQuery ? 'No cards found' : 'No cards available'}
+                  {search.isActive ? 'No cards found' : 'No cards available'}
                 </Text>
               </View>
             ) : (
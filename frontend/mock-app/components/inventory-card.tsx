@@ -1,14 +1,17 @@
 import { View, FlatList, Image, useWindowDimensions, TouchableOpacity, ActivityIndicator } from 'react-native';
-import { useState, useMemo, useCallback } from 'react';
+import { useMemo, useCallback } from 'react';
 import { Text } from '@/components/ui/text';
 import { Input } from '@/components/ui/input';
 import { Card, CardContent } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { Search, Check } from 'lucide-react-native';
 import { useInventory } from '@/hooks/use-inventory';
+import type { UseInventorySearchReturn } from '@/hooks/use-inventory-search';
 import type { UserCard } from '@/types/inventory';
 
 type InventoryCardProps = {
+  // Owned by the screen, which pages the results as it scrolls
+  search: UseInventorySearchReturn;
   redeemMode?: boolean;
   tradeMode?: boolean;
   selectedCardIds?: Set<number>;
@@ -18,34 +21,25 @@ type InventoryCardProps = {
 };
 
 export function InventoryCard({
+  search,
   redeemMode = false,
   tradeMode = false,
   selectedCardIds: externalSelectedCardIds,
   isRedeeming = false,
   redeemingCardIds: externalRedeemingCardIds,
   onCardSelect,
-}: InventoryCardProps = {}) {
-  const { cards, isLoading } = useInventory();
-  const [searchQuery, setSearchQuery] = useState('');
+}: InventoryCardProps) {
+  const { cards, isLoading, isLoadingMore } = useInventory();
   const { width } = useWindowDimensions();
 
   // Use external props if provided
   const selectedCardIds = externalSelectedCardIds || new Set<number>();
   const redeemingCardIds = externalRedeemingCardIds || new Set<number>();
 
-  // Filter cards based on search query
+  // Searches run on the backend over the whole vault, not just the loaded pages
   const filteredCards = useMemo(() => {
-    if (!searchQuery.trim()) {
-      return cards;
-    }
-    const query = searchQuery.toLowerCase().trim();
-    return cards.filter(card => {
-      const nameMatch = card.name.toLowerCase().includes(query);
-      const conditionMatch = card.item_data?.condition?.toLowerCase().includes(query);
-      const statusMatch = card.status.toLowerCase().includes(query);
-      return nameMatch || conditionMatch || statusMatch;
-    });
-  }, [cards, searchQuery]);
+    return search.isActive ? search.results : cards;
+  }, [cards, search.isActive, search.results]);
 
   const cardWidth = (width - 48 - 16) / 3; // 48px padding, 16px gap
 
@@ -198,8 +192,8 @@ export function InventoryCard({
             <Input
               placeholder="Search Vault"
               className="pl-10 flex-1 rounded-sm"
-              value={searchQuery}
-              onChangeText={setSearchQuery}
+              value={search.searchQuery}
+              onChangeText={search.setSearchQuery}
             />
           </View>
         </View>
@@ -230,7 +224,13 @@ export function InventoryCard({
         )}
 
         {/* Search results message */}
-        {searchQuery.trim() && filteredCards.length === 0 && (
+        {search.isActive && search.isSearching && filteredCards.length === 0 && (
+          <View className="pb-4 items-center">
+            <ActivityIndicator />
+          </View>
+        )}
+
+        {search.isActive && !search.isSearching && filteredCards.length === 0 && (
           <View className="pb-4">
             <Text className="text-muted-foreground text-sm text-center">
               No results found.
@@ -239,7 +239,7 @@ export function InventoryCard({
         )}
 
         {/* Empty state message (only show when no search query) */}
-        {!searchQuery.trim() && cards.length === 0 && !isLoading && (
+        {!search.isActive && cards.length === 0 && !isLoading && (
           <View className="pb-4">
             <Text className="text-muted-foreground text-sm text-center">
               You have no cards in your inventory. Click submit to send in your cards or click trade to purchase a card with your balance.
@@ -263,6 +263,12 @@ export function InventoryCard({
             />
           </View>
         )}
+
+        {(search.isActive ? search.isLoadingMore : isLoadingMore) && (
+          <View className="pb-4 items-center">
+            <ActivityIndicator />
+          </View>
+        )}
       </CardContent>
     </Card>
   );
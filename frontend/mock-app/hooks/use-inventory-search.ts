@@ -0,0 +1,177 @@
+/**
+ * Vault search hook
+ * Searches the whole vault on the backend (GET /inventory/search) instead of
+ * filtering the cards loaded so far, so cards on vault pages that haven't been
+ * fetched yet are found too. Results are paged with the X-Next-Cursor header.
+ */
+import { useState, useEffect, useRef, useCallback } from 'react';
+import type { UserCard } from '@/types/inventory';
+import { useAuthContext } from '@/hooks/use-auth-context';
+
+const API_URL = process.env.EXPO_PUBLIC_API_URL;
+
+export interface UseInventorySearchOptions {
+  debounceMs?: number;
+  pageSize?: number;
+}
+
+export interface UseInventorySearchReturn {
+  searchQuery: string;
+  setSearchQuery: (query: string) => void;
+  /** True while the query is non-empty; show `results` instead of the vault */
+  isActive: boolean;
+  results: UserCard[];
+  isSearching: boolean;
+  isLoadingMore: boolean;
+  hasMore: boolean;
+  /** Fetch the next page of results (call as the user nears the bottom) */
+  loadMore: () => Promise<void>;
+  /** Any card returned by an earlier search (selections outlive the query they came from) */
+  getCard: (cardId: number) => UserCard | undefined;
+  /** Drop cards from the results (e.g. after redeeming them) */
+  removeResults: (cardIds: number[]) => void;
+  clearSearch: () => void;
+}
+
+async function fetchSearchPage(
+  token: string,
+  query: string,
+  pageSize: number,
+  cursor: string | null,
+  signal: AbortSignal,
+): Promise<{ cards: UserCard[]; nextCursor: string | null }> {
+  const params = new URLSearchParams({ q: query, status: 'vaulted', limit: pageSize.toString() });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  const response = await fetch(`${API_URL}/inventory/search?${params}`, {
+    headers: { 'Authorization': `Bearer ${token}` },
+    signal,
+  });
+  if (!response.ok) {
+    throw new Error(`HTTP ${response.status}`);
+  }
+  return { cards: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
+/**
+ * Hook for vault search with debouncing and cursor paging
+ */
+export function useInventorySearch(options: UseInventorySearchOptions = {}): UseInventorySearchReturn {
+  const { debounceMs = 300, pageSize = 50 } = options;
+  const { session } = useAuthContext();
+  const token = session?.access_token;
+
+  const [searchQuery, setSearchQuery] = useState('');
+  const [debouncedQuery, setDebouncedQuery] = useState('');
+  const [results, setResults] = useState<UserCard[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isSearching, setIsSearching] = useState(false);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  // Aborted when the query changes, so stale pages are never shown
+  const abortControllerRef = useRef<AbortController | null>(null);
+  // Guards against overlapping page loads (scroll events fire repeatedly)
+  const loadingMoreRef = useRef(false);
+  const seenCardsRef = useRef(new Map<number, UserCard>());
+
+  useEffect(() => {
+    results.forEach(card => seenCardsRef.current.set(card.id, card));
+  }, [results]);
+
+  // Debounce search query
+  useEffect(() => {
+    const timeoutId = setTimeout(() => {
+      setDebouncedQuery(searchQuery.trim());
+    }, debounceMs);
+
+    return () => clearTimeout(timeoutId);
+  }, [searchQuery, debounceMs]);
+
+  // First page of results for the query
+  useEffect(() => {
+    abortControllerRef.current?.abort();
+    const controller = new AbortController();
+    abortControllerRef.current = controller;
+    loadingMoreRef.current = false;
+    setIsLoadingMore(false);
+    setNextCursor(null);
+
+    if (!debouncedQuery || !token || !API_URL) {
+      setResults([]);
+      setIsSearching(false);
+      return;
+    }
+
+    setIsSearching(true);
+    fetchSearchPage(token, debouncedQuery, pageSize, null, controller.signal)
+      .then(page => {
+        if (controller.signal.aborted) return;
+        setResults(page.cards);
+        setNextCursor(page.nextCursor);
+        setIsSearching(false);
+      })
+      .catch(err => {
+        if (err.name === 'AbortError') return;
+        console.error('Error searching inventory:', err);
+        if (!controller.signal.aborted) {
+          setResults([]);
+          setIsSearching(false);
+        }
+      });
+
+    return () => {
+      controller.abort();
+    };
+  }, [debouncedQuery, token, pageSize]);
+
+  const loadMore = useCallback(async () => {
+    const controller = abortControllerRef.current;
+    if (!token || !nextCursor || !controller || loadingMoreRef.current) {
+      return;
+    }
+
+    loadingMoreRef.current = true;
+    setIsLoadingMore(true);
+    try {
+      const page = await fetchSearchPage(token, debouncedQuery, pageSize, nextCursor, controller.signal);
+      if (controller.signal.aborted) return;
+      setResults(prev => [...prev, ...page.cards]);
+      setNextCursor(page.nextCursor);
+    } catch (err: any) {
+      if (err.name !== 'AbortError') {
+        console.error('Error fetching more search results:', err);
+      }
+    } finally {
+      if (!controller.signal.aborted) {
+        loadingMoreRef.current = false;
+        setIsLoadingMore(false);
+      }
+    }
+  }, [token, debouncedQuery, pageSize, nextCursor]);
+
+  const getCard = useCallback((cardId: number) => seenCardsRef.current.get(cardId), []);
+
+  const removeResults = useCallback((cardIds: number[]) => {
+    cardIds.forEach(id => seenCardsRef.current.delete(id));
+    setResults(prev => prev.filter(card => !cardIds.includes(card.id)));
+  }, []);
+
+  const clearSearch = useCallback(() => {
+    setSearchQuery('');
+  }, []);
+
+  return {
+    searchQuery,
+    setSearchQuery,
+    isActive: searchQuery.trim() !== '',
+    results,
+    isSearching: isSearching || searchQuery.trim() !== debouncedQuery,
+    isLoadingMore,
+    hasMore: nextCursor !== null,
+    loadMore,
+    getCard,
+    removeResults,
+    clearSearch,
+  };
+}
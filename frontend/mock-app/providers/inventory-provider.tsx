@@ -1,10 +1,13 @@
-import { createContext, useContext, useState, useCallback, useEffect, PropsWithChildren } from 'react';
-import type { UserCard } from '@/types/inventory';
+import { createContext, useContext, useState, useCallback, useEffect, useRef, PropsWithChildren } from 'react';
+import type { UserCard, VaultItem } from '@/types/inventory';
 import { useAuthContext } from '@/hooks/use-auth-context';
 
 type InventoryContextType = {
   cards: UserCard[];
   isLoading: boolean;
+  hasMore: boolean;
+  isLoadingMore: boolean;
+  loadMoreInventory: () => Promise<void>;
   addCards: (newCards: UserCard[]) => void;
   removeCard: (cardId: number) => void;
   removeCards: (cardIds: number[]) => Promise<void>;
@@ -14,6 +17,9 @@ type InventoryContextType = {
 const InventoryContext = createContext<InventoryContextType>({
   cards: [],
   isLoading: false,
+  hasMore: false,
+  isLoadingMore: false,
+  loadMoreInventory: async () => {},
   addCards: () => {},
   removeCard: () => {},
   removeCards: async () => {},
@@ -21,6 +27,7 @@ const InventoryContext = createContext<InventoryContextType>({
 });
 
 const API_URL = process.env.EXPO_PUBLIC_API_URL;
+const VAULT_PAGE_SIZE = 100;
 
 async function apiRequest(endpoint: string, method: string, token: string, body?: any) {
   if (!API_URL) {
@@ -59,21 +66,62 @@ async function apiRequest(endpoint: string, method: string, token: string, body?
   }
 }
 
+// Vault rows are summaries: set, condition and market price come extracted
+// from item_data, without the item_data blob itself. The list views only read
+// those fields, so they are mapped into item_data for display.
+function toUserCard({ set_name, condition, market_price, ...item }: VaultItem): UserCard {
+  return {
+    ...item,
+    item_data: item.item_data ?? {
+      ...(set_name != null && { set: set_name }),
+      ...(condition != null && { condition }),
+      ...(market_price != null && { market_price }),
+    },
+  };
+}
+
+// One page of the vault, newest first; nextCursor is null on the last page.
+async function fetchVaultPage(token: string, cursor: string | null): Promise<{ cards: UserCard[]; nextCursor: string | null }> {
+  if (!API_URL) {
+    throw new Error('API URL is not configured. Please set EXPO_PUBLIC_API_URL in your .env file');
+  }
+
+  const params = new URLSearchParams({ limit: String(VAULT_PAGE_SIZE) });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  const response = await fetch(`${API_URL}/inventory/vault?${params}`, {
+    headers: { 'Authorization': `Bearer ${token}` },
+  });
+  if (!response.ok) {
+    throw new Error(`HTTP ${response.status}: ${await response.text()}`);
+  }
+  const items: VaultItem[] = await response.json();
+  return { cards: items.map(toUserCard), nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
 export function InventoryProvider({ children }: PropsWithChildren) {
   const { session, isLoggedIn } = useAuthContext();
   const [cards, setCards] = useState<UserCard[]>([]);
   const [isLoading, setIsLoading] = useState<boolean>(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState<boolean>(false);
+  // Guards against overlapping page loads (scroll events fire repeatedly)
+  const loadingMoreRef = useRef(false);
 
+  // Reload the first page; later pages are fetched as the user scrolls
   const refreshInventory = useCallback(async () => {
     if (!session?.access_token || !isLoggedIn) {
       setCards([]);
+      setNextCursor(null);
       return;
     }
 
     setIsLoading(true);
     try {
-      const data = await apiRequest('/inventory/vault', 'GET', session.access_token);
-      setCards(data || []);
+      const page = await fetchVaultPage(session.access_token, null);
+      setCards(page.cards);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error fetching inventory:', error);
       // Don't throw - keep existing cards on error
@@ -82,12 +130,36 @@ export function InventoryProvider({ children }: PropsWithChildren) {
     }
   }, [session?.access_token, isLoggedIn]);
 
+  const loadMoreInventory = useCallback(async () => {
+    if (!session?.access_token || !nextCursor || loadingMoreRef.current) {
+      return;
+    }
+
+    loadingMoreRef.current = true;
+    setIsLoadingMore(true);
+    try {
+      const page = await fetchVaultPage(session.access_token, nextCursor);
+      // Skip cards already added locally (e.g. submitted while scrolling)
+      setCards(prev => {
+        const known = new Set(prev.map(card => card.id));
+        return [...prev, ...page.cards.filter(card => !known.has(card.id))];
+      });
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching more inventory:', error);
+    } finally {
+      loadingMoreRef.current = false;
+      setIsLoadingMore(false);
+    }
+  }, [session?.access_token, nextCursor]);
+
   // Fetch inventory on mount and when user logs in
   useEffect(() => {
     if (isLoggedIn && session?.access_token) {
       refreshInventory();
     } else {
       setCards([]);
+      setNextCursor(null);
     }
   }, [isLoggedIn, session?.access_token, refreshInventory]);
 
@@ -118,7 +190,18 @@ export function InventoryProvider({ children }: PropsWithChildren) {
   }, [session?.access_token]);
 
   return (
-    <InventoryContext.Provider value={{ cards, isLoading, addCards, removeCard, removeCards, refreshInventory }}>
+    <InventoryContext.Provider
+      value={{
+        cards,
+        isLoading,
+        hasMore: nextCursor !== null,
+        isLoadingMore,
+        loadMoreInventory,
+        addCards,
+        removeCard,
+        removeCards,
+        refreshInventory,
+      }}>
       {children}
     </InventoryContext.Provider>
   );
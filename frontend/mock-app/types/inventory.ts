@@ -17,3 +17,11 @@ export type UserCard = {
   created_at: string | null; // ISO date string
 };
 
+// Row of GET /inventory/vault: display fields extracted from item_data, which
+// is only included with include_data=true
+export type VaultItem = Omit<UserCard, 'item_data'> & {
+  item_data?: UserCard['item_data'];
+  set_name: string | null;
+  condition: string | null;
+  market_price: number | null;
+};